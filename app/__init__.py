@@ -1,15 +1,30 @@
+import os
+
 from flask import Flask
-from config import Config
-from flask_migrate import Migrate
-from flasgger import Swagger
-from app.extension import db
 from flask_restful import Api
-from app.resources.user import Users,User
-from app.resources.teacher import Teachers, Teacher
-from app.resources.student import Students,Student
-from app.resources.enrollment import Enrollments, Enrollment
-from app.resources.fee import Fees,Fee
-from app.resources.course import Courses, Course
+from app.extension import db, cache, metrics, credentials, writer, apispec
+
+# Application factory.
+#
+#     app = create_app()            # Config from config.py
+#     app = create_app(TestConfig)  # any object with config attributes
+#
+# Resource modules, Flask-Migrate (which pulls in alembic) and Flasgger are
+# imported inside create_app rather than at import time, so importing the
+# package stays cheap. Flask-Migrate is only set up under the ``flask``
+# command (for ``flask db``) or when MIGRATIONS_ENABLED is set, so WSGI
+# workers never load alembic; SWAGGER_ENABLED = False skips Flasgger
+# entirely. Flasgger builds the spec on the first /apispec_1.json request
+# and keeps it, unless ``flask spec build`` has written it out ahead of time
+# (app/spec.py).
+#
+# ``from app import app`` still works and builds the default app on first use.
+#
+# The extension objects in app.extension are shared, but everything they
+# keep per app (write queue, response cache, hashing pool, metrics,
+# idempotency counters, autocomplete index) lives in app.extensions and is
+# looked up through current_app, so create_app can build several
+# independent apps in one process.
 
 # swagger configuration
 swagger_config = {
@@ -68,6 +83,10 @@ template = {
             {
                 "name": "Fees",
                 "description": "Operations related to fees"
+            },
+            {
+                "name": "Monitoring",
+                "description": "Operational statistics"
             }
         ]
      
@@ -75,36 +94,100 @@ template = {
             
         
 }
-# 
+#
 
 
-    
+def create_app(config=None):
+    if config is None:
+        from config import Config
+        config = Config
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    db.init_app(app)
+    writer.init_app(app)
+    cache.init_app(app)
+    metrics.init_app(app)
+    metrics.add_collector(app, cache.metrics)
+    credentials.init_app(app)
+    metrics.add_collector(app, credentials.metrics)
+    metrics.add_collector(app, db.pool_metrics)
+    metrics.add_collector(app, writer.metrics)
+    from app.idempotency import idempotency
+    idempotency.init_app(app)
+    metrics.add_collector(app, idempotency.metrics)
+
+    if app.config.get('MIGRATIONS_ENABLED', os.environ.get('FLASK_RUN_FROM_CLI') == 'true'):
+        from flask_migrate import Migrate
+        from app.search import include_name
+        Migrate(app, db, include_name=include_name)
+    if app.config.get('SWAGGER_ENABLED', True):
+        from flasgger import Swagger
+        Swagger(app, config=swagger_config, template=template)
+    apispec.init_app(app)
+
+    register_resources(Api(app))
+    from app.resources.student import student_autocomplete
+    student_autocomplete.init_app(app)
+    return app
+
+
+def register_resources(api):
+    from app.resources.user import Users,User,UsersBulk,Login
+    from app.resources.teacher import Teachers, Teacher, TeacherSearch
+    from app.resources.student import Students,Student,StudentsBulk,StudentTranscript,StudentSearch,StudentAutocomplete
+    from app.resources.enrollment import Enrollments, Enrollment, EnrollmentsExport, EnrollmentsBulk
+    from app.resources.fee import Fees,Fee,FeesExport,FeesBulk,FeeSummary,StudentBalance
+    from app.resources.course import Courses, Course, CourseRoster, CourseAvailability
+    from app.resources.cache import CacheStats
+    from app.resources.database import PoolStats
+    from app.resources.changes import Changes
+    #api endpoints
+    api.add_resource(Users,'/api/users/')
+    api.add_resource(User,'/api/users/<int:id>')
+    api.add_resource(UsersBulk,'/api/users/bulk')
+    api.add_resource(Login,'/api/login')
 
+    api.add_resource(Teachers, '/api/teachers')
+    api.add_resource(Teacher, '/api/teachers/<int:id>')
+    api.add_resource(TeacherSearch, '/api/teachers/search')
 
+    api.add_resource(Students, '/api/students')
+    api.add_resource(Student, '/api/students/<int:id>')
+    api.add_resource(StudentsBulk, '/api/students/bulk')
+    api.add_resource(StudentSearch, '/api/students/search')
+    api.add_resource(StudentAutocomplete, '/api/students/autocomplete')
+    api.add_resource(StudentBalance, '/api/students/<int:id>/balance')
+    api.add_resource(StudentTranscript, '/api/students/<int:id>/transcript')
 
-app = Flask(__name__)
-app.config.from_object(Config)
-db.init_app(app)
-api = Api(app)
-migrate = Migrate(app,db)
-swagger = Swagger(app, config=swagger_config, template=template)
 
- #api endpoints
-api.add_resource(Users,'/api/users/')
-api.add_resource(User,'/api/users/<int:id>')
+    api.add_resource(Courses, '/api/courses')
+    api.add_resource(CourseAvailability, '/api/courses/availability')
+    api.add_resource(Course, '/api/courses/<int:id>')
+    api.add_resource(CourseRoster, '/api/courses/<int:id>/roster')
 
-api.add_resource(Teachers, '/api/teachers')
-api.add_resource(Teacher, '/api/teachers/<int:id>')
+    api.add_resource(Enrollments, '/api/enrollments')
+    api.add_resource(Enrollment, '/api/enrollments/<int:id>')
+    api.add_resource(EnrollmentsExport, '/api/enrollments/export')
+    api.add_resource(EnrollmentsBulk, '/api/enrollments/bulk')
 
-api.add_resource(Students, '/api/students')
-api.add_resource(Student, '/api/students/<int:id>')
+    api.add_resource(Fees, '/api/fees')
+    api.add_resource(Fee, '/api/fees/<int:id>')
+    api.add_resource(FeesExport, '/api/fees/export')
+    api.add_resource(FeesBulk, '/api/fees/bulk')
+    api.add_resource(FeeSummary, '/api/fees/summary')
 
+    api.add_resource(CacheStats, '/api/cache/stats')
+    api.add_resource(PoolStats, '/api/db/pool')
 
-api.add_resource(Courses, '/api/courses')
-api.add_resource(Course, '/api/courses/<int:id>')
+    api.add_resource(Changes, '/api/changes')
 
-api.add_resource(Enrollments, '/api/enrollments')
-api.add_resource(Enrollment, '/api/enrollments/<int:id>')
 
-api.add_resource(Fees, '/api/fees')
-api.add_resource(Fee, '/api/fees/<int:id>')
\ No newline at end of file
+def __getattr__(name):
+    # keeps ``from app import app`` / ``app:app`` working without building
+    # the app when only a submodule is imported
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,286 @@
+import contextlib
+import json
+
+from a2wsgi import WSGIMiddleware
+from flask_restful import abort, marshal
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import QueuePool
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_accept_header
+
+from app import create_app
+from app.database import POOL_SETTINGS, profile_for, profile_options, set_pragmas
+from app.export import EXPORT_BATCH_SIZE, NDJSON_MIMETYPE, wants_ndjson
+from app.extension import db
+from app.filtering import filter_clauses, order_clauses
+from app.models.course import CourseModel
+from app.models.enrollment import EnrollmentModel
+from app.models.fee import FeeModel
+from app.models.student import StudentModel
+from app.models.teacher import TeacherModel
+from app.pagination import is_paginated, page_of, page_window
+from app.resources.course import (availability_fields, availability_filters, course_fields, course_filters, course_sort,
+                                  roster_fields, roster_loader)
+from app.resources.enrollment import enrollment_fields, enrollment_filters, enrollment_sort
+from app.resources.fee import (balance_fields, balance_statement, fee_fields, fee_filters, fee_sort,
+                               summary_page, summary_statement)
+from app.resources.student import (student_fields, student_filters, student_search, student_sort,
+                                   transcript_fields, transcript_loader)
+from app.resources.teacher import teacher_fields, teacher_filters, teacher_search, teacher_sort
+from app.serializers import Serializer, project
+
+# ASGI deployment mode.
+#
+#     uvicorn app.asgi:app --workers 4
+#     app = create_asgi_app(Config)
+#
+# The read routes that reports hammer (collections with their filters, sort,
+# keyset pages and NDJSON exports, single rows, search, transcripts, rosters,
+# course availability, fee summaries and balances) are async views on an
+# AsyncSession, so a request waiting on the database holds no thread. They
+# build the same statements and use the same field maps as app/resources/,
+# so status codes and JSON bodies match the WSGI app. Every other request
+# (writes, users and login, /metrics, /apidocs) goes to the Flask app through
+# a2wsgi, in a pool of ASGI_WSGI_THREADS threads.
+#
+# The async engine follows SQLALCHEMY_DATABASE_URI with the async driver
+# swapped in (aiosqlite, asyncpg) unless ASYNC_DATABASE_URI is set, and takes
+# the same DATABASE_* profile as the sync engine (app/database.py). The async
+# views skip the Flask response cache and are not counted in /metrics.
+#
+# Needs the packages in app/requirements-asgi.txt.
+
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+
+def async_database_url(flask_app):
+    if flask_app.config.get('ASYNC_DATABASE_URI'):
+        return make_url(flask_app.config['ASYNC_DATABASE_URI'])
+    with flask_app.app_context():
+        # the sync engine's URL, with relative SQLite paths already resolved
+        url = db.engine.url
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend!r} databases, set ASYNC_DATABASE_URI")
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def create_engine(flask_app):
+    url = async_database_url(flask_app)
+    profile = profile_for(url, flask_app.config)
+    options = profile_options(url, profile)
+    if not issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        # in-memory SQLite gets a StaticPool, which takes no pool settings
+        for setting in POOL_SETTINGS:
+            options.pop(setting, None)
+    engine = create_async_engine(url, **options)
+    set_pragmas(engine.sync_engine, url, profile)
+    return engine
+
+
+def json_response(data, status=200):
+    # the same bytes flask_restful's output_json writes
+    return Response(json.dumps(data) + '\n', status, media_type='application/json')
+
+
+def query_args(request):
+    return MultiDict(request.query_params.multi_items())
+
+
+def accept_mimetypes(request):
+    return parse_accept_header(request.headers.get('accept'), MIMEAccept)
+
+
+def ndjson_response(sessions, model, fields, clauses, order, batch_size=EXPORT_BATCH_SIZE):
+    """Async counterpart of ``app.export.stream_ndjson``."""
+    serializer = Serializer(model, fields)
+    statement = (serializer.statement().where(*clauses).order_by(*order_clauses(order))
+                 .execution_options(yield_per=batch_size))
+
+    async def generate():
+        # the request's session is closed by the time the body is sent
+        async with sessions() as session:
+            result = await session.stream(statement)
+            async for rows in result.partitions():
+                yield '\n'.join(json.dumps(serializer.dump(row)) for row in rows) + '\n'
+
+    return StreamingResponse(generate(), media_type=NDJSON_MIMETYPE)
+
+
+def collection(model, fields, filters, sortable, missing, ndjson=False):
+    """GET on a collection: the list, a keyset page or (with ``ndjson``) an export."""
+    async def view(request, session):
+        args = query_args(request)
+        clauses, order = filter_clauses(model, filters, sortable, args)
+        shown = project(fields, args)
+        if ndjson and wants_ndjson(accept_mimetypes(request)):
+            return ndjson_response(request.app.state.sessions, model, shown, clauses, order)
+
+        serializer = Serializer(model, shown)
+        if is_paginated(args):
+            limit, after = page_window(order, args)
+            keys = [column for column, _ in order]
+            statement = serializer.statement(*keys).where(*clauses)
+            if after is not None:
+                statement = statement.where(after)
+            rows = (await session.execute(statement.order_by(*order_clauses(order)).limit(limit + 1))).all()
+            return page_of(serializer, rows, limit, len(keys))
+
+        statement = serializer.statement().where(*clauses).order_by(*order_clauses(order))
+        items = serializer.dump_all((await session.execute(statement)).all())
+        if not items:
+            abort(404, message=missing)
+        return items
+    return view
+
+
+def export(model, fields, filters, sortable):
+    async def view(request, session):
+        args = query_args(request)
+        clauses, order = filter_clauses(model, filters, sortable, args)
+        return ndjson_response(request.app.state.sessions, model, project(fields, args), clauses, order)
+    return view
+
+
+def item(model, fields, missing):
+    async def view(request, session):
+        serializer = Serializer(model, project(fields, query_args(request)))
+        statement = serializer.statement().where(model.id == request.path_params['id'])
+        row = (await session.execute(statement)).first()
+        if row is None:
+            abort(404, message=missing)
+        return serializer.dump(row)
+    return view
+
+
+def search(index):
+    async def view(request, session):
+        statement, limit = index.statement(query_args(request), session.bind.dialect.name)
+        return index.page((await session.execute(statement)).all(), limit)
+    return view
+
+
+async def transcript(request, session):
+    student = await session.scalar(
+        select(StudentModel).options(transcript_loader).where(StudentModel.id == request.path_params['id']))
+    if student is None:
+        abort(404, message='Student not found')
+    return marshal(student, transcript_fields)
+
+
+async def roster(request, session):
+    course = await session.scalar(
+        select(CourseModel).options(roster_loader).where(CourseModel.id == request.path_params['id']))
+    if course is None:
+        abort(404, message='Course not found')
+    return marshal(course, roster_fields)
+
+
+async def fee_summary(request, session):
+    statement, column, limit = summary_statement(query_args(request))
+    return summary_page((await session.execute(statement)).all(), column, limit)
+
+
+async def student_balance(request, session):
+    row = (await session.execute(balance_statement(request.path_params['id']))).first()
+    if row is None:
+        abort(404, message='Student not found')
+    return marshal(row._mapping, balance_fields)
+
+
+def endpoint(view):
+    """Run ``view(request, session)`` and render its result like flask_restful would."""
+    async def handle(request):
+        try:
+            async with request.app.state.sessions() as session:
+                result = await view(request, session)
+        except HTTPException as e:
+            return json_response(getattr(e, 'data', None) or {'message': e.description}, e.code)
+        if isinstance(result, Response):
+            return result
+        return json_response(result)
+    return handle
+
+
+async def server_error(request, exc):
+    return json_response({'message': 'Internal Server Error'}, 500)
+
+
+ROUTES = [
+    ('/api/students', collection(StudentModel, student_fields, student_filters, student_sort,
+                                 'Students not found')),
+    ('/api/students/{id:int}', item(StudentModel, student_fields, 'Student not found')),
+    ('/api/students/search', search(student_search)),
+    ('/api/students/{id:int}/transcript', transcript),
+    ('/api/students/{id:int}/balance', student_balance),
+
+    ('/api/teachers', collection(TeacherModel, teacher_fields, teacher_filters, teacher_sort,
+                                 'Teachers not found')),
+    ('/api/teachers/{id:int}', item(TeacherModel, teacher_fields, 'Teacher not found')),
+    ('/api/teachers/search', search(teacher_search)),
+
+    ('/api/courses', collection(CourseModel, course_fields, course_filters, course_sort, 'Courses not found')),
+    ('/api/courses/{id:int}', item(CourseModel, course_fields, 'Course not found')),
+    ('/api/courses/{id:int}/roster', roster),
+    ('/api/courses/availability', collection(CourseModel, availability_fields, availability_filters, course_sort,
+                                             'Courses not found')),
+
+    ('/api/enrollments', collection(EnrollmentModel, enrollment_fields, enrollment_filters, enrollment_sort,
+                                    'Enrollments not found', ndjson=True)),
+    ('/api/enrollments/{id:int}', item(EnrollmentModel, enrollment_fields, 'Enrollment not found')),
+    ('/api/enrollments/export', export(EnrollmentModel, enrollment_fields, enrollment_filters, enrollment_sort)),
+
+    ('/api/fees', collection(FeeModel, fee_fields, fee_filters, fee_sort, 'Fees not found', ndjson=True)),
+    ('/api/fees/{id:int}', item(FeeModel, fee_fields, 'Fee not found')),
+    ('/api/fees/export', export(FeeModel, fee_fields, fee_filters, fee_sort)),
+    ('/api/fees/summary', fee_summary),
+]
+
+
+class AsyncApp:
+    """GET and HEAD on ROUTES run async; everything else is handed to the Flask app."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.engine = create_engine(flask_app)
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config.get('ASGI_WSGI_THREADS', 10))
+
+        @contextlib.asynccontextmanager
+        async def lifespan(app):
+            yield
+            await self.engine.dispose()
+
+        self.reads = Starlette(
+            routes=[Route(path, endpoint(view), methods=['GET']) for path, view in ROUTES],
+            exception_handlers={500: server_error},
+            lifespan=lifespan,
+        )
+        self.reads.state.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        # unmatched paths go to Flask, which also decides about trailing slashes
+        self.reads.router.default = self.wsgi
+        self.reads.router.redirect_slashes = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] not in ('GET', 'HEAD'):
+            await self.wsgi(scope, receive, send)
+        else:
+            await self.reads(scope, receive, send)
+
+
+def create_asgi_app(config=None):
+    return AsyncApp(create_app(config))
+
+
+def __getattr__(name):
+    # ``uvicorn app.asgi:app`` builds the default app on first use
+    if name == 'app':
+        global app
+        app = create_asgi_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,243 @@
+import os
+import threading
+from array import array
+from bisect import bisect_left, insort
+from itertools import chain, islice
+
+import sqlalchemy as sa
+from flask import current_app
+from flask_restful import abort
+
+from app.extension import db
+
+# In-process type-ahead over a few short text columns.
+#
+#     student_autocomplete = Autocomplete(StudentModel, ('first_name', 'last_name', 'student_id', 'email'))
+#     student_autocomplete.complete(['ami', 'ach'], 10)   [(id, first_name, last_name, student_id, email), ...]
+#     student_autocomplete.add(student)          after an INSERT or UPDATE
+#     student_autocomplete.remove(id)            after a DELETE
+#
+# Every value is lower-cased into one sorted list of distinct keys, each with
+# the id (or sorted array('q') of ids) of the rows holding it, so a prefix is
+# two bisects and a walk over the matching keys; the columns themselves are
+# kept per id to build the suggestions. A load stores each repeated value
+# (first and last names) once. Nothing touches the database per keystroke.
+#
+# With several words (``ami ach``) the ids under each word's keys are walked
+# side by side and kept when every word starts one of the row's values, so
+# the cost follows the rarest word. At most MAX_SCAN ids are looked at, so a
+# combination of common words that matches almost nobody can come back short
+# rather than slow; typing more narrows it down.
+#
+# The index is loaded with one SELECT when the app starts (AUTOCOMPLETE_PRELOAD,
+# off under the ``flask`` command so ``flask db upgrade`` doesn't pay for it)
+# or else on first use, and kept current by the write handlers calling add(),
+# remove() and refresh(). Each worker process has its own copy and only sees
+# its own writes, like the response cache; rows written by another process
+# show up after it restarts. Within a process each app has its own index
+# (app.extensions['autocomplete']).
+#
+# Memory is about 38 MiB per 100k students on CPython 3.11, mostly the
+# per-row tuples and the unique emails and student IDs; loading takes about
+# 2 s per 100k rows and an add or remove about 0.3 ms (1.5 ms at 500k, the
+# sorted lists shift on insert). Measured with
+# ``python -m benchmarks.bench_autocomplete``.
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+AUTOCOMPLETE_ARGS = {'prefix', 'limit'}
+MAX_SCAN = 20000
+REFRESH_CHUNK_SIZE = 500
+
+
+def autocomplete_args(args):
+    """``(words, limit)`` from ``?prefix=&limit=``."""
+    unknown = set(args) - AUTOCOMPLETE_ARGS
+    if unknown:
+        abort(400, message=f"Unknown query parameter(s): {', '.join(sorted(unknown))}")
+    words = args.get('prefix', '').lower().split()
+    if not words:
+        abort(400, message="prefix cannot be empty")
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        abort(400, message="limit must be an integer")
+    if limit < 1 or limit > MAX_LIMIT:
+        abort(400, message=f"limit must be between 1 and {MAX_LIMIT}")
+    return words, limit
+
+
+def prefix_end(prefix):
+    """The smallest string greater than every string starting with ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.keys = []      # distinct lower-cased values, sorted
+        self.postings = []  # per key: an id, or an array('q') of ids
+        self.rows = {}      # id -> the column values as stored
+
+    @staticmethod
+    def _keys(values):
+        keys = set()
+        for value in values:
+            if value:
+                key = value.lower()
+                keys.add(value if key == value else key)
+        return keys
+
+    def load(self, rows):
+        """Replace the contents with ``rows`` of ``(id, *values)``."""
+        postings, shared = {}, {}
+        self.rows = {}
+        for id, *values in rows:
+            # names repeat a lot, so keep one copy of each
+            self.rows[id] = tuple(shared.setdefault(value, value) for value in values)
+            for key in self._keys(values):
+                postings.setdefault(shared.setdefault(key, key), []).append(id)
+        self.keys = sorted(postings)
+        self.postings = [ids[0] if len(ids) == 1 else array('q', sorted(ids))
+                         for ids in map(postings.__getitem__, self.keys)]
+
+    def add(self, id, values):
+        self.remove(id)
+        self.rows[id] = tuple(values)
+        for key in self._keys(values):
+            index = bisect_left(self.keys, key)
+            if index == len(self.keys) or self.keys[index] != key:
+                self.keys.insert(index, key)
+                self.postings.insert(index, id)
+            elif isinstance(self.postings[index], int):
+                self.postings[index] = array('q', sorted((self.postings[index], id)))
+            else:
+                insort(self.postings[index], id)
+
+    def remove(self, id):
+        values = self.rows.pop(id, None)
+        if values is None:
+            return
+        for key in self._keys(values):
+            index = bisect_left(self.keys, key)
+            ids = self.postings[index]
+            if isinstance(ids, int):
+                del self.keys[index]
+                del self.postings[index]
+                continue
+            del ids[bisect_left(ids, id)]
+            if len(ids) == 1:
+                self.postings[index] = ids[0]
+
+    def span(self, word):
+        return bisect_left(self.keys, word), bisect_left(self.keys, prefix_end(word))
+
+    def ids(self, start, stop):
+        for index in range(start, stop):
+            ids = self.postings[index]
+            if isinstance(ids, int):
+                yield ids
+            else:
+                yield from ids
+
+    def complete(self, words, limit):
+        """Up to ``limit`` ``(id, *values)`` whose values start with every word."""
+        words = set(words)
+        starts = ['\0' + word for word in words]
+        # every match is under every word's keys, so once the shortest
+        # stream runs out all of them have been seen
+        streams = zip(*(self.ids(*self.span(word)) for word in words))
+        found, seen = [], set()
+        for id in islice(chain.from_iterable(streams), MAX_SCAN):
+            if id in seen:
+                continue
+            seen.add(id)
+            values = self.rows[id]
+            if len(words) == 1 or self.matches(values, starts):
+                found.append((id, *values))
+                if len(found) == limit:
+                    break
+        return found
+
+    @staticmethod
+    def matches(values, starts):
+        # ``starts`` are the words with a leading NUL, which no value holds
+        text = '\0' + '\0'.join(value for value in values if value).lower()
+        return all(start in text for start in starts)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class _AppIndex:
+    """One app's index of one model, loaded on first use."""
+
+    def __init__(self):
+        self.index = None
+        self.lock = threading.Lock()
+
+
+class Autocomplete:
+    def __init__(self, model, columns):
+        self.model = model
+        self.columns = tuple(columns)
+
+    def init_app(self, app):
+        """Drop what ``app`` loaded before and, with AUTOCOMPLETE_PRELOAD, load now."""
+        state = app.extensions.setdefault('autocomplete', {})[self.model.__tablename__] = _AppIndex()
+        if app.config.get('AUTOCOMPLETE_PRELOAD', os.environ.get('FLASK_RUN_FROM_CLI') != 'true'):
+            with app.app_context(), state.lock:
+                # before the first migration there is nothing to load yet
+                if sa.inspect(db.engine).has_table(self.model.__tablename__):
+                    self._loaded(state)
+
+    def _state(self):
+        return current_app.extensions['autocomplete'][self.model.__tablename__]
+
+    def statement(self):
+        return sa.select(self.model.id, *(getattr(self.model, name) for name in self.columns))
+
+    def _loaded(self, state):
+        # with state.lock held
+        if state.index is None:
+            index = PrefixIndex()
+            index.load(db.session.execute(self.statement()))
+            state.index = index
+        return state.index
+
+    def complete(self, words, limit):
+        state = self._state()
+        with state.lock:
+            return self._loaded(state).complete(words, limit)
+
+    def add(self, obj):
+        """Index ``obj`` (new or changed) from its loaded attributes."""
+        values = [getattr(obj, name) for name in self.columns]
+        state = self._state()
+        with state.lock:
+            if state.index is not None:
+                state.index.add(obj.id, values)
+
+    def remove(self, id):
+        state = self._state()
+        with state.lock:
+            if state.index is not None:
+                state.index.remove(id)
+
+    def refresh(self, ids):
+        """Re-read ``ids`` from the database, e.g. after a bulk insert."""
+        ids = list(ids)
+        state = self._state()
+        if not ids or state.index is None:
+            return
+        rows = []
+        for start in range(0, len(ids), REFRESH_CHUNK_SIZE):
+            chunk = ids[start:start + REFRESH_CHUNK_SIZE]
+            rows.extend(db.session.execute(self.statement().where(self.model.id.in_(chunk))))
+        with state.lock:
+            if state.index is not None:
+                for id, *values in rows:
+                    state.index.add(id, values)
+
+    def __len__(self):
+        index = self._state().index
+        return len(index) if index is not None else 0
@@ -0,0 +1,208 @@
+import json
+
+from flask import request
+from flask_restful import abort
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extension import db, writer
+
+# Bulk create support shared by the /bulk endpoints.
+#
+# Rows are validated up front, then the valid ones are inserted with one
+# executemany INSERT ... RETURNING per chunk and one commit per chunk. If a
+# chunk fails (e.g. a unique constraint), it is retried row by row inside
+# savepoints so every row still gets its own result. Each chunk is one job on
+# the write queue (app/write_queue.py). A ``before_insert`` hook runs in the
+# same transaction, so bulk enrollments take their course seats together
+# with the rows that hold them (app/seats.py).
+#
+# bulk_create_ignoring_conflicts is the import flavour: rows that hit a unique
+# constraint are skipped by the database (INSERT ... ON CONFLICT DO NOTHING)
+# instead of being looked up first or failing the chunk.
+
+BULK_CHUNK_SIZE = 500
+MAX_BULK_ROWS = 50000
+
+
+def read_rows():
+    """Read the request body as a JSON array or as NDJSON (one object per line)."""
+    if request.mimetype == 'application/x-ndjson':
+        rows = []
+        for number, line in enumerate(request.get_data(as_text=True).splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                abort(400, message=f"Invalid JSON on line {number}")
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            abort(400, message="Request body must be a JSON array of objects")
+
+    if not rows:
+        abort(400, message="No rows to create")
+    if len(rows) > MAX_BULK_ROWS:
+        abort(413, message=f"At most {MAX_BULK_ROWS} rows can be created per request")
+    return rows
+
+
+def value(row, name, type_=str, required=False, default=None):
+    """Pull ``name`` out of a raw row the way reqparse would, raising ValueError."""
+    raw = row.get(name)
+    if raw is None or raw == '':
+        if required:
+            raise ValueError(f"{name} cannot be empty")
+        return default
+    try:
+        return type_(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be of type {type_.__name__}")
+
+
+def _parse_rows(rows, parse_row, results):
+    valid = []
+    for index, row in enumerate(rows):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("Row must be a JSON object")
+            valid.append((index, parse_row(row)))
+        except (ValueError, OverflowError) as e:
+            results[index] = {'index': index, 'status': 'error', 'message': str(e)}
+    return valid
+
+
+def _group_by_keys(chunk):
+    # executemany needs the same keys in every parameter set; grouping by
+    # key set keeps column defaults for the keys a row leaves out.
+    groups = {}
+    for index, values in chunk:
+        groups.setdefault(frozenset(values), []).append((index, values))
+    return groups.values()
+
+
+def _prepare(valid, prepare, results, status):
+    if prepare is None:
+        return valid
+    dropped = prepare(valid)
+    for index, message in dropped.items():
+        results[index] = {'index': index, 'status': status, 'message': message}
+    return [row for row in valid if row[0] not in dropped]
+
+
+def bulk_create(model, rows, parse_row, chunk_size=BULK_CHUNK_SIZE, before_insert=None, prepare=None):
+    """Validate and insert ``rows``; return ``(summary, status_code)``.
+
+    ``parse_row`` turns one raw row into a dict of column values or raises
+    ValueError with a message for the client. ``prepare(valid)`` sees the
+    valid rows of ``(index, values)`` once, outside any transaction, may
+    fill in their values and returns ``{index: message}`` for rows to
+    reject. ``before_insert(session, chunk)`` runs in each chunk's
+    transaction before its INSERT and returns the same for that chunk.
+    """
+    results = [None] * len(rows)
+    valid = _prepare(_parse_rows(rows, parse_row, results), prepare, results, 'error')
+
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+
+        def insert_chunk(session):
+            rejected = before_insert(session, chunk) if before_insert else {}
+            created = []
+            for group in _group_by_keys([row for row in chunk if row[0] not in rejected]):
+                ids = session.scalars(statement, [values for _, values in group]).all()
+                created.extend(zip((index for index, _ in group), ids))
+            return created, rejected
+
+        try:
+            created, rejected = writer.write(insert_chunk)
+        except SQLAlchemyError:
+            _insert_one_by_one(model, chunk, results, before_insert)
+            continue
+        for index, id in created:
+            results[index] = {'index': index, 'status': 'created', 'id': id}
+        for index, message in rejected.items():
+            results[index] = {'index': index, 'status': 'error', 'message': message}
+
+    failed = sum(1 for result in results if result['status'] == 'error')
+    summary = {'created': len(rows) - failed, 'failed': failed, 'results': results}
+    return summary, 201 if not failed else 207
+
+
+def bulk_create_ignoring_conflicts(model, rows, parse_row, key, chunk_size=BULK_CHUNK_SIZE, prepare=None):
+    """Like bulk_create, but rows violating a unique constraint are skipped.
+
+    ``key`` is a unique column used to tell which rows the database actually
+    inserted; rows repeating a key already seen in the request are skipped
+    without reaching the database. ``prepare`` runs after that, and the rows
+    it drops are reported as skipped. Dialects without ON CONFLICT fall back
+    to bulk_create.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(model)
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(model)
+    else:
+        return bulk_create(model, rows, parse_row, chunk_size, prepare=prepare)
+    statement = statement.on_conflict_do_nothing().returning(model.id, key)
+
+    results = [None] * len(rows)
+    seen = set()
+    valid = []
+    for index, values in _parse_rows(rows, parse_row, results):
+        if values[key.key] in seen:
+            results[index] = {'index': index, 'status': 'skipped',
+                              'message': f"Duplicate {key.key} in request"}
+            continue
+        seen.add(values[key.key])
+        valid.append((index, values))
+    valid = _prepare(valid, prepare, results, 'skipped')
+
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+
+        def insert_chunk(session):
+            created = {}
+            for group in _group_by_keys(chunk):
+                created.update((row[1], row[0]) for row in session.execute(statement, [values for _, values in group]))
+            return created
+
+        try:
+            created = writer.write(insert_chunk)
+        except SQLAlchemyError:
+            _insert_one_by_one(model, chunk, results)
+            continue
+        for index, values in chunk:
+            id = created.get(values[key.key])
+            if id is None:
+                results[index] = {'index': index, 'status': 'skipped', 'message': "Already exists"}
+            else:
+                results[index] = {'index': index, 'status': 'created', 'id': id}
+
+    failed = sum(1 for result in results if result['status'] == 'error')
+    skipped = sum(1 for result in results if result['status'] == 'skipped')
+    summary = {'created': len(rows) - failed - skipped, 'skipped': skipped, 'failed': failed, 'results': results}
+    return summary, 201 if not failed and not skipped else 207
+
+
+def _insert_one_by_one(model, chunk, results, before_insert=None):
+    statement = insert(model).returning(model.id)
+
+    def insert_rows(session):
+        for index, values in chunk:
+            try:
+                with session.begin_nested():
+                    rejected = before_insert(session, [(index, values)]) if before_insert else {}
+                    if index in rejected:
+                        results[index] = {'index': index, 'status': 'error', 'message': rejected[index]}
+                        continue
+                    id = session.scalar(statement, values)
+                results[index] = {'index': index, 'status': 'created', 'id': id}
+            except SQLAlchemyError as e:
+                results[index] = {'index': index, 'status': 'error', 'message': str(getattr(e, 'orig', None) or e)}
+
+    writer.write(insert_rows)
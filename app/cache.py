@@ -0,0 +1,178 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from flask_restful.representations.json import output_json
+from flask_restful.utils import unpack
+from werkzeug.wrappers import Response
+
+# Response cache for read-mostly resources.
+#
+#     @cache.cached('courses')          on Resource.get
+#     @cache.invalidates('courses')     on post/put/patch/delete
+#
+# Cached entries are the serialized JSON body and its strong ETag, keyed by
+# namespace, namespace generation and the request path + query string.
+# Invalidating a namespace bumps its generation, so every entry written
+# before the write becomes unreachable at once and ages out of the LRU.
+#
+# The default backend is an in-process LRU with a TTL. Each worker process
+# has its own, so other workers only see a write once the TTL expires. Pass
+# a shared backend (anything with ``get(key)`` and ``set(key, value)``,
+# e.g. a thin Redis wrapper) through RESPONSE_CACHE_BACKEND to invalidate
+# across processes.
+#
+# The backend and counters belong to the app (app.extensions['response_cache']),
+# so apps built side by side by create_app never share entries.
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _AppCache:
+    """The backend and counters of one app."""
+
+    def __init__(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.backend = app.config.get('RESPONSE_CACHE_BACKEND') or LRUCache(
+            maxsize=app.config.get('RESPONSE_CACHE_SIZE', 1024),
+            ttl=app.config.get('RESPONSE_CACHE_TTL', 300),
+        )
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def generation(self, namespace):
+        return self.backend.get(f'generation:{namespace}') or 0
+
+    def invalidate(self, namespace):
+        # a timestamp rather than a counter, so a generation evicted from the
+        # backend can never come back with the same value
+        self.backend.set(f'generation:{namespace}', time.time_ns())
+        self.count('invalidations')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'invalidations': self.invalidations,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.backend) if hasattr(self.backend, '__len__') else None,
+        }
+
+    def metrics(self):
+        """Prometheus exposition lines for the counters."""
+        lines = []
+        for name in ('hits', 'misses', 'not_modified', 'invalidations'):
+            lines.append(f'# TYPE response_cache_{name}_total counter')
+            lines.append(f'response_cache_{name}_total {getattr(self, name)}')
+        return lines
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['response_cache'] = _AppCache(app)
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['response_cache']
+
+    def invalidate(self, namespace):
+        self._state().invalidate(namespace)
+
+    def cached(self, namespace):
+        """Cache the JSON body of a successful GET and answer If-None-Match."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                state = self._state()
+                if not state.enabled:
+                    return fn(*args, **kwargs)
+
+                key = f'response:{namespace}:{state.generation(namespace)}:{request.full_path}'
+                entry = state.backend.get(key)
+                if entry is None:
+                    state.count('misses')
+                    result = fn(*args, **kwargs)
+                    if isinstance(result, Response):
+                        return result
+                    data, code, headers = unpack(result)
+                    if code != 200:
+                        return result
+                    body = output_json(data, code, headers).get_data()
+                    entry = (body, hashlib.sha256(body).hexdigest())
+                    state.backend.set(key, entry)
+                else:
+                    state.count('hits')
+
+                body, etag = entry
+                response = Response(body, mimetype='application/json')
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                response = response.make_conditional(request)
+                if response.status_code == 304:
+                    state.count('not_modified')
+                return response
+            return wrapper
+        return decorator
+
+    def invalidates(self, *namespaces):
+        """Invalidate ``namespaces`` once the wrapped write handler has run."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    for namespace in namespaces:
+                        self.invalidate(namespace)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return self._state().stats()
+
+    def metrics(self):
+        return self._state().metrics()
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+
+from flask_restful import abort
+from sqlalchemy import and_, or_, select, true
+
+from app.extension import db
+from app.models.versioned import TombstoneModel, utcnow
+from app.pagination import decode_cursor, encode_cursor, page_limit
+from app.serializers import Serializer
+
+# Incremental change feed over the versioned tables (app/models/versioned.py).
+#
+#     change_feed = ChangeFeed([('students', StudentModel, student_fields), ('fees', FeeModel, fee_fields), ...])
+#     change_feed.page(request.args)
+#
+#     GET /api/changes?limit=500                    oldest changes first
+#     GET /api/changes?since=<next>&limit=500       what changed after the last batch
+#     GET /api/changes?since=2024-05-01T00:00:00    ... or after a point in time (UTC)
+#
+# Each row appears once, at its latest version; a deleted row appears as a
+# tombstone (``deleted: true``, no data). Changes are ordered by
+# (updated_at, table, id) across every table, and ``next`` holds that key for
+# the last change served, so each table is read with a keyset WHERE on its
+# updated_at index and a sync fetches only what changed since the previous
+# one. ``next`` is returned on every page, including an empty one; keep
+# polling with it.
+#
+# Changes younger than CHANGES_SETTLE_SECONDS are held back, so a write whose
+# transaction commits a little after it took its timestamp (the write queue
+# batches, a slow request) still shows up after a cursor that has moved past
+# rows written later. Clocks of the writing processes need to agree to well
+# within that window. Tombstones are kept indefinitely.
+
+CHANGES_ARGS = {'since', 'limit', 'tables'}
+SETTLE_SECONDS = 5
+
+
+def parse_since(token, sources):
+    """The ``(updated_at, source, id)`` to continue after, or ``None`` from the start."""
+    if not token:
+        return None
+    try:
+        at = datetime.fromisoformat(token)
+    except ValueError:
+        pass
+    else:
+        if at.tzinfo is not None:
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        # after every source's changes at ``at``: strictly later ones only
+        return at, sources, 0
+    values = decode_cursor(token)
+    try:
+        at, source, id = values
+        return datetime.fromisoformat(at), int(source), int(id)
+    except (TypeError, ValueError):
+        abort(400, message="Invalid cursor")
+
+
+def after(column, id_column, index, position):
+    """WHERE clause for the rows of source ``index`` that sort after ``position``."""
+    if position is None:
+        return true()
+    at, source, id = position
+    if index > source:
+        return column >= at
+    if index < source:
+        return column > at
+    return or_(column > at, and_(column == at, id_column > id))
+
+
+class ChangeFeed:
+    def __init__(self, sources):
+        self.sources = list(sources)
+        self.tables = [name for name, _, _ in self.sources]
+        # tombstones carry the table's own name
+        self.names = {model.__tablename__: name for name, model, _ in self.sources}
+
+    def _selected(self, args):
+        names = [name.strip() for name in args.get('tables', '').split(',') if name.strip()]
+        unknown = set(names) - set(self.tables)
+        if unknown:
+            abort(400, message=f"Unknown table(s): {', '.join(sorted(unknown))}")
+        return names or self.tables
+
+    def page(self, args, settle=SETTLE_SECONDS):
+        """``{'changes': [...], 'next': cursor, 'has_more': bool}`` for ``args``."""
+        unknown = set(args) - CHANGES_ARGS
+        if unknown:
+            abort(400, message=f"Unknown query parameter(s): {', '.join(sorted(unknown))}")
+        limit = page_limit(args)
+        selected = self._selected(args)
+        # the tombstones sort after the tables at the same instant
+        position = parse_since(args.get('since'), len(self.sources) + 1)
+        horizon = utcnow() - timedelta(seconds=settle)
+
+        changes = []
+        for index, (name, model, fields) in enumerate(self.sources):
+            if name not in selected:
+                continue
+            serializer = Serializer(model, fields)
+            statement = (serializer.statement(model.updated_at, model.version, model.id)
+                         .where(model.updated_at <= horizon, after(model.updated_at, model.id, index, position))
+                         .order_by(model.updated_at, model.id)
+                         .limit(limit + 1))
+            for row in db.session.execute(statement):
+                at, version, id = row[-3:]
+                changes.append(((at, index, id), {
+                    'table': name, 'id': id, 'version': version, 'updated_at': at.isoformat(),
+                    'deleted': False, 'data': serializer.dump(row),
+                }))
+
+        index = len(self.sources)
+        statement = (select(TombstoneModel.deleted_at, TombstoneModel.id, TombstoneModel.table_name,
+                            TombstoneModel.row_id, TombstoneModel.version)
+                     .where(TombstoneModel.table_name.in_([model.__tablename__ for name, model, _ in self.sources
+                                                           if name in selected]),
+                            TombstoneModel.deleted_at <= horizon,
+                            after(TombstoneModel.deleted_at, TombstoneModel.id, index, position))
+                     .order_by(TombstoneModel.deleted_at, TombstoneModel.id)
+                     .limit(limit + 1))
+        for at, id, name, row_id, version in db.session.execute(statement):
+            changes.append(((at, index, id), {
+                'table': self.names[name], 'id': row_id, 'version': version, 'updated_at': at.isoformat(),
+                'deleted': True, 'data': None,
+            }))
+
+        changes.sort(key=lambda change: change[0])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if changes:
+            at, source, id = changes[-1][0]
+            next_cursor = encode_cursor([at.isoformat(), source, id])
+        else:
+            next_cursor = args.get('since') or None
+        return {'changes': [change for _, change in changes], 'next': next_cursor, 'has_more': has_more}
@@ -0,0 +1,177 @@
+import hmac
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Password hashing off the request thread.
+#
+#     stored = credentials.hash(password)
+#     ok, rehashed = credentials.verify(stored, password)
+#
+# scrypt / PBKDF2 are deliberately slow, so every hash and verify runs in a
+# bounded pool (threads by default: hashlib releases the GIL while hashing;
+# set PASSWORD_HASH_EXECUTOR = 'process' to use processes instead). At most
+# PASSWORD_HASH_WORKERS jobs run and PASSWORD_HASH_QUEUE more wait; past that
+# a request waits up to PASSWORD_HASH_TIMEOUT seconds for a slot and is then
+# turned away with 503 + Retry-After, so a burst of logins cannot pile up
+# unbounded work behind the workers.
+#
+# PASSWORD_HASH_METHOD is any werkzeug method string, e.g. the default
+# 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'. verify() returns a fresh hash
+# whenever the stored one was made with other parameters (or is a plain text
+# password from before hashing), so raising the cost upgrades users as they
+# log in. Shorthands like 'scrypt' or 'pbkdf2' are compared with werkzeug's
+# defaults filled in, the way they are written into the hash.
+#
+# The pool and its settings belong to the app (app.extensions['credentials']).
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+HASH_PREFIXES = ('scrypt:', 'pbkdf2:')
+
+
+def is_hashed(stored):
+    return stored.startswith(HASH_PREFIXES) and stored.count('$') == 2
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def normalize_method(method):
+    """``method`` as werkzeug writes it at the start of a hash, defaults filled in."""
+    name, *args = method.split(':')
+    try:
+        if name == 'scrypt':
+            n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+            return f'scrypt:{n}:{r}:{p}'
+        if name == 'pbkdf2' and len(args) <= 2:
+            hash_name = args[0] if args else 'sha256'
+            iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+            return f'pbkdf2:{hash_name}:{iterations}'
+    except ValueError:
+        pass
+    return method
+
+
+def _verify(stored, password, method):
+    if is_hashed(stored):
+        ok = check_password_hash(stored, password)
+        current = stored.split('$', 1)[0] == normalize_method(method)
+    else:
+        ok = hmac.compare_digest(stored.encode(), password.encode())
+        current = False
+    if not ok:
+        return False, None
+    return True, None if current else generate_password_hash(password, method=method)
+
+
+class _HashPool:
+    """The executor, admission slots and counters of one app."""
+
+    def __init__(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        self.queue = app.config.get('PASSWORD_HASH_QUEUE', self.workers * 4)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 5.0)
+        self.use_processes = app.config.get('PASSWORD_HASH_EXECUTOR', 'thread') == 'process'
+        self.rejected = 0
+        self.in_flight = 0
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue)
+        self._lock = threading.Lock()
+        self.dummy = None
+
+    def _pool(self):
+        # created on first use so forking servers start their own pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    executor = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                    self._executor = executor(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.rejected += 1
+            raise ServiceUnavailable("Too many password operations in progress, try again shortly",
+                                     retry_after=max(1, round(self.timeout)))
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'queue': self.queue,
+            'in_flight': self.in_flight,
+            'rejected': self.rejected,
+        }
+
+    def metrics(self):
+        return [
+            '# HELP password_hash_in_flight Password hash jobs running or queued',
+            '# TYPE password_hash_in_flight gauge',
+            f'password_hash_in_flight {self.in_flight}',
+            '# HELP password_hash_rejected_total Password hash jobs turned away with 503',
+            '# TYPE password_hash_rejected_total counter',
+            f'password_hash_rejected_total {self.rejected}',
+        ]
+
+
+class Credentials:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['credentials'] = _HashPool(app)
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['credentials']
+
+    def hash(self, password):
+        state = self._state()
+        return state.submit(_hash, password, state.method).result()
+
+    def hash_many(self, passwords):
+        """Hash several passwords in parallel; ``None`` entries are passed through."""
+        state = self._state()
+        futures = [state.submit(_hash, password, state.method) if password else None for password in passwords]
+        return [future.result() if future else None for future in futures]
+
+    def verify(self, stored, password):
+        """Return ``(ok, new_hash)``; ``new_hash`` is set when the stored hash should be replaced."""
+        state = self._state()
+        return state.submit(_verify, stored, password, state.method).result()
+
+    def verify_missing(self, password):
+        """Spend the same work as verify() for an unknown user, then fail."""
+        state = self._state()
+        if state.dummy is None:
+            state.dummy = self.hash(os.urandom(16).hex())
+        self.verify(state.dummy, password)
+        return False, None
+
+    def stats(self):
+        return self._state().stats()
+
+    def metrics(self):
+        return self._state().metrics()
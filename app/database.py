@@ -0,0 +1,235 @@
+import threading
+import time
+
+import sqlalchemy as sa
+from flask import current_app
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Engine profiles and connection pool health.
+#
+# DATABASE_PROFILE picks a set of engine defaults; when unset it follows the
+# database URL ('sqlite-wal' for SQLite files, 'postgres' for PostgreSQL).
+# Every DATABASE_* key below overrides its profile value, and anything set in
+# SQLALCHEMY_ENGINE_OPTIONS wins over both.
+#
+#     DATABASE_POOL_SIZE          connections kept open
+#     DATABASE_MAX_OVERFLOW       extra connections opened under load
+#     DATABASE_POOL_TIMEOUT       seconds to wait for a connection before failing
+#     DATABASE_POOL_RECYCLE       seconds after which a connection is replaced
+#     DATABASE_POOL_PRE_PING      test connections before handing them out
+#     DATABASE_STATEMENT_TIMEOUT  ms a statement may run (PostgreSQL) or wait
+#                                 for a lock (SQLite busy timeout)
+#     DATABASE_SQLITE_PRAGMAS     extra or replacement PRAGMAs run on every new
+#                                 SQLite connection
+#
+# The sqlite-wal profile is meant for production on SQLite: WAL lets readers
+# run alongside the writer, synchronous=NORMAL only fsyncs at checkpoints
+# (safe in WAL mode), and mmap/cache_size keep hot pages in memory. Pair it
+# with DATABASE_WRITE_QUEUE (app/write_queue.py) so writers do not contend.
+#
+# Queue pools are TimedQueuePool, which records how long each checkout waited
+# and how many timed out. db.pool_stats() and db.pool_metrics() report those
+# with the live checked-out / overflow counts.
+
+ENGINE_PROFILES = {
+    'sqlite-wal': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'pool_recycle': -1,
+        'pool_pre_ping': False,
+        'statement_timeout': 30000,
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': 268435456,
+            'cache_size': -65536,
+            'temp_store': 'MEMORY',
+        },
+    },
+    'postgres': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'statement_timeout': 30000,
+    },
+}
+
+POOL_SETTINGS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def profile_for(url, config):
+    name = config.get('DATABASE_PROFILE')
+    if name is None:
+        if url.get_backend_name() == 'sqlite':
+            name = 'sqlite-wal'
+        elif url.get_backend_name() == 'postgresql':
+            name = 'postgres'
+        else:
+            return {}
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE {name!r}, expected one of {sorted(ENGINE_PROFILES)}")
+    profile = dict(ENGINE_PROFILES[name])
+    for setting in POOL_SETTINGS + ('statement_timeout',):
+        key = f'DATABASE_{setting.upper()}'
+        if key in config:
+            profile[setting] = config[key]
+    if 'pragmas' in profile:
+        profile['pragmas'] = {**profile['pragmas'], **config.get('DATABASE_SQLITE_PRAGMAS', {})}
+    return profile
+
+
+class _WaitStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * len(WAIT_BUCKETS)
+        self._lock = threading.Lock()
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            for index, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.buckets[index] += 1
+
+
+class TimedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = _WaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return entry
+
+    def recreate(self):
+        # dispose() swaps in a new pool; keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def profile_options(url, profile):
+    """Engine keyword arguments for ``profile``: pool settings and statement timeout."""
+    options = {setting: profile[setting] for setting in POOL_SETTINGS if setting in profile}
+    timeout = profile.get('statement_timeout')
+    if timeout is not None and url.get_backend_name() == 'postgresql':
+        if url.get_driver_name() == 'asyncpg':
+            options['connect_args'] = {'server_settings': {'statement_timeout': str(int(timeout))}}
+        else:
+            options['connect_args'] = {'options': f'-c statement_timeout={int(timeout)}'}
+    elif timeout is not None and url.get_backend_name() == 'sqlite':
+        options['connect_args'] = {'timeout': timeout / 1000}
+    return options
+
+
+def set_pragmas(engine, url, profile):
+    """Run the profile's PRAGMAs on every new SQLite connection of ``engine``."""
+    pragmas = profile.get('pragmas')
+    if not pragmas or url.get_backend_name() != 'sqlite':
+        return
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    event.listen(engine, 'connect', on_connect)
+
+
+class Database(SQLAlchemy):
+    def _make_engine(self, bind_key, options, app):
+        url = sa.engine.make_url(options['url'])
+        profile = profile_for(url, app.config)
+        engine_options = profile_options(url, profile)
+        if options.get('poolclass', QueuePool) is QueuePool and profile:
+            engine_options['poolclass'] = TimedQueuePool
+        else:
+            for setting in POOL_SETTINGS:
+                engine_options.pop(setting, None)
+
+        options = {**engine_options, **options}
+        if 'connect_args' in engine_options:
+            options['connect_args'] = {**engine_options['connect_args'], **options['connect_args']}
+        engine = super()._make_engine(bind_key, options, app)
+        set_pragmas(engine, url, profile)
+        # the pool settings the engine was actually built with, for pool_stats
+        app.extensions.setdefault('pool_settings', {})[bind_key] = {
+            setting: options[setting] for setting in POOL_SETTINGS if setting in options}
+        return engine
+
+    def pool_stats(self):
+        """Live pool state of every engine bound to the current app."""
+        stats = {}
+        pool_settings = current_app.extensions.get('pool_settings', {})
+        for bind_key, engine in self.engines.items():
+            pool = engine.pool
+            entry = {'pool': type(pool).__name__}
+            if isinstance(pool, QueuePool):
+                entry.update({
+                    'size': pool.size(),
+                    'checked_out': pool.checkedout(),
+                    'checked_in': pool.checkedin(),
+                    'overflow': max(pool.overflow(), 0),
+                    'max_overflow': pool_settings.get(bind_key, {}).get('max_overflow'),
+                    'timeout': pool.timeout(),
+                })
+            if isinstance(pool, TimedQueuePool):
+                timed = pool.stats
+                entry.update({
+                    'checkouts': timed.checkouts,
+                    'timeouts': timed.timeouts,
+                    'wait_seconds_total': timed.wait_total,
+                    'wait_seconds_max': timed.wait_max,
+                    'wait_seconds_avg': timed.wait_total / timed.checkouts if timed.checkouts else 0.0,
+                })
+            stats[bind_key or 'default'] = entry
+        return stats
+
+    def pool_metrics(self):
+        lines = []
+        stats = self.pool_stats()
+        gauges = (
+            ('db_pool_size', 'Connections the pool keeps open', 'size'),
+            ('db_pool_checked_out', 'Connections currently in use', 'checked_out'),
+            ('db_pool_overflow', 'Connections open beyond the pool size', 'overflow'),
+        )
+        for name, help_text, key in gauges:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+            lines += [f'{name}{{bind="{bind}"}} {entry[key]}' for bind, entry in stats.items() if key in entry]
+
+        lines += ['# HELP db_pool_timeouts_total Checkouts that gave up waiting for a connection',
+                  '# TYPE db_pool_timeouts_total counter']
+        lines += [f'db_pool_timeouts_total{{bind="{bind}"}} {entry["timeouts"]}'
+                  for bind, entry in stats.items() if 'timeouts' in entry]
+
+        lines += ['# HELP db_pool_wait_seconds Time spent waiting for a connection',
+                  '# TYPE db_pool_wait_seconds histogram']
+        for bind_key, engine in self.engines.items():
+            if not isinstance(engine.pool, TimedQueuePool):
+                continue
+            timed = engine.pool.stats
+            label = f'bind="{bind_key or "default"}"'
+            for bound, count in zip(WAIT_BUCKETS, timed.buckets):
+                lines.append(f'db_pool_wait_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'db_pool_wait_seconds_bucket{{{label},le="+Inf"}} {timed.checkouts}')
+            lines.append(f'db_pool_wait_seconds_sum{{{label}}} {timed.wait_total}')
+            lines.append(f'db_pool_wait_seconds_count{{{label}}} {timed.checkouts}')
+        return lines
@@ -0,0 +1,49 @@
+from datetime import datetime
+from functools import lru_cache
+
+from dateutil import parser as dateutil_parser
+
+# Date and datetime parsing for request values.
+#
+#     parse_date('2024-09-01')                 date(2024, 9, 1)
+#     parse_datetime('2024-09-01T08:30:00Z')   datetime(2024, 9, 1, 8, 30, tzinfo=timezone.utc)
+#
+# ISO 8601 strings (what the API returns and documents) go through
+# datetime.fromisoformat, which is C code and much faster than dateutil's
+# tokenizer. Results are cached per distinct string (DATE_CACHE_SIZE), since
+# bulk imports repeat the same few values (semester start, enrollment day)
+# thousands of times; dates and datetimes are immutable, so sharing them is
+# safe.
+#
+# Anything else falls back to dateutil, but only when reading it day-first
+# and month-first gives the same answer (or the string starts with the
+# year): '13/02/2024', 'Feb 3 2024' and '2024/02/03' are accepted,
+# '01/02/2024' is rejected as ambiguous instead of silently becoming
+# 2 January. Both paths raise ValueError (or OverflowError from
+# dateutil for absurd years) with a message for the client.
+
+DATE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_datetime(value):
+    """``value`` as a datetime; a date alone gives midnight."""
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        month_first = dateutil_parser.parse(value)
+        day_first = dateutil_parser.parse(value, dayfirst=True)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a date; use YYYY-MM-DD") from None
+    # a leading year (2024/02/03) is read year-month-day either way
+    if month_first != day_first and not value[:4].isdigit():
+        raise ValueError(f"'{value}' is ambiguous; use YYYY-MM-DD")
+    return month_first
+
+
+def parse_date(value):
+    """``value`` as a date, dropping any time of day."""
+    return parse_datetime(value).date()
@@ -0,0 +1,47 @@
+import json
+
+from flask import Response, request, stream_with_context
+
+from app.filtering import order_clauses
+from app.instrumentation import record_rows
+from app.serializers import Serializer
+
+# Streaming NDJSON export for the large collections.
+#
+# Rows are read from the database in batches of EXPORT_BATCH_SIZE with
+# ``yield_per`` (a server-side cursor where the driver supports one) and each
+# batch is written to the socket as soon as it is serialized, so peak memory
+# is one batch no matter how many rows the table holds.
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+EXPORT_BATCH_SIZE = 1000
+
+
+def wants_ndjson(accept_mimetypes=None):
+    accept_mimetypes = request.accept_mimetypes if accept_mimetypes is None else accept_mimetypes
+    best = accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def stream_ndjson(query, model, fields, order=None, batch_size=EXPORT_BATCH_SIZE):
+    """Return a streamed ``application/x-ndjson`` response, one row per line.
+
+    ``order`` is the ``(column, descending)`` list from ``filter_query``;
+    without one the rows come out by primary key.
+    """
+    serializer = Serializer(model, fields)
+    order_by = order_clauses(order) if order else [model.id]
+
+    def generate():
+        lines = []
+        for row in serializer.select(query).order_by(*order_by).yield_per(batch_size):
+            lines.append(json.dumps(serializer.dump(row)))
+            if len(lines) >= batch_size:
+                record_rows(len(lines))
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            record_rows(len(lines))
+            yield '\n'.join(lines) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
@@ -1,3 +1,13 @@
-from flask_sqlalchemy import SQLAlchemy
+from app.cache import ResponseCache
+from app.credentials import Credentials
+from app.database import Database
+from app.instrumentation import Metrics
+from app.spec import PrebuiltSpec
+from app.write_queue import WriteQueue
 
-db = SQLAlchemy()
\ No newline at end of file
+db = Database()
+cache = ResponseCache()
+metrics = Metrics()
+credentials = Credentials()
+writer = WriteQueue()
+apispec = PrebuiltSpec()
\ No newline at end of file
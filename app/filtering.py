@@ -0,0 +1,94 @@
+from datetime import date, datetime
+
+from flask import request
+from flask_restful import abort
+
+# Declarative query-string filtering and sorting for the collection endpoints.
+#
+# Each resource lists the columns it can be filtered on and sorted by, e.g.
+#
+#     fee_filters = ('student_id', 'status', 'semester', 'fee_type')
+#     fee_sort = ('id', 'amount', 'payment_date', 'semester', 'status')
+#
+# ``?status=overdue`` becomes ``WHERE status = 'overdue'`` (repeat the
+# parameter for an IN list) and ``?sort=-amount,id`` becomes
+# ``ORDER BY amount DESC, id``. Any query parameter that is not a declared
+# filter or one of RESERVED_ARGS is rejected with a 400. ``?fields=`` is
+# handled by ``app.serializers.project``.
+
+RESERVED_ARGS = {'limit', 'after', 'sort', 'fields'}
+
+
+def filter_query(model, filters, sortable):
+    """Return ``(query, order)`` for the current request.
+
+    ``order`` is a list of ``(column, descending)`` pairs that always ends with
+    the primary key, so it is a total order usable for keyset pagination.
+    """
+    clauses, order = filter_clauses(model, filters, sortable, request.args)
+    return model.query.filter(*clauses), order
+
+
+def filter_clauses(model, filters, sortable, args):
+    """Return ``(clauses, order)`` for the query-string ``args``: the WHERE
+    clauses of the declared filters, and the order as in ``filter_query``."""
+    unknown = set(args) - set(filters) - RESERVED_ARGS
+    if unknown:
+        abort(400, message=f"Unknown query parameter(s): {', '.join(sorted(unknown))}")
+
+    clauses = []
+    for name in filters:
+        values = args.getlist(name)
+        if not values:
+            continue
+        column = getattr(model, name)
+        values = [coerce(column, name, raw) for raw in values]
+        if len(values) == 1:
+            clauses.append(column == values[0])
+        else:
+            clauses.append(column.in_(values))
+
+    return clauses, parse_sort(model, sortable, args)
+
+
+def parse_sort(model, sortable, args):
+    order = []
+    for name in filter(None, args.get('sort', '').split(',')):
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        if name not in sortable:
+            abort(400, message=f"Cannot sort by '{name}'. Allowed: {', '.join(sortable)}")
+        order.append((getattr(model, name), descending))
+    if not any(column is model.id for column, _ in order):
+        order.append((model.id, False))
+    return order
+
+
+def order_clauses(order):
+    """ORDER BY clauses for ``order``; NULLs sort last on every backend."""
+    clauses = []
+    for column, descending in order:
+        if nullable(column):
+            clauses.append(column.is_(None))
+        clauses.append(column.desc() if descending else column.asc())
+    return clauses
+
+
+def nullable(column):
+    # computed columns such as a search rank have no ``nullable`` and are never NULL
+    return getattr(column, 'nullable', False)
+
+
+def coerce(column, name, raw):
+    """Convert a query-string value (or cursor value) to the column's python type."""
+    if raw is None:
+        return None
+    python_type = column.type.python_type
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(raw)
+        if python_type is date:
+            return date.fromisoformat(raw)
+        return python_type(raw)
+    except (TypeError, ValueError):
+        abort(400, message=f"Invalid value for {name}: {raw}")
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import current_app, request
+from flask_restful import abort
+from flask_restful.representations.json import output_json
+from flask_restful.utils import unpack
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.wrappers import Response
+
+from app.extension import db, writer
+from app.models.idempotency import IdempotencyKeyModel
+
+# Idempotency-Key support for create endpoints.
+#
+#     @idempotency.idempotent            on Resource.post, above the other decorators
+#
+#     POST /api/fees  Idempotency-Key: 3f1c...   201, runs the handler
+#     POST /api/fees  Idempotency-Key: 3f1c...   201, the same body again, Idempotent-Replayed: true
+#
+# A request with the header first claims the key by inserting an
+# idempotency_keys row with no status, then runs the handler and stores its
+# 2xx response on that row (zlib-compressed JSON plus headers such as
+# Location). A retry is one primary-key SELECT and gets the stored response
+# back without parsing, validating or writing anything. The key is scoped to
+# method + path and the row holds a hash of the request body, so reusing a
+# key for a different request is a 422, and a retry that arrives while the
+# first request is still running is a 409 instead of a second insert.
+# Requests that fail (4xx/5xx) before writing anything give the key back so
+# the client can fix the request and send it again with the same key.
+#
+# Stored responses live IDEMPOTENCY_TTL seconds (a day by default) and an
+# unfinished claim IDEMPOTENCY_CLAIM_TIMEOUT seconds, after which the key can
+# be claimed again (e.g. the worker died mid-request). Every
+# IDEMPOTENCY_PURGE_EVERY claims the claiming transaction also deletes the
+# expired rows, through the index on expires_at. The table is shared by all
+# worker processes, unlike the response cache; the settings and counters
+# are per app (app.extensions['idempotency']).
+#
+# While the handler runs, a heartbeat thread pushes the claim's expiry
+# forward every third of the timeout, so a slow request (a large bulk
+# import) keeps its key and a retry still gets the 409. Every write the
+# handler makes (writer.also) also marks the claim applied and gives it the
+# full TTL, in the write's own transaction. If the worker dies after its
+# first commit, before the response is stored, the key is not claimed
+# again: a retry gets a 409 saying the request was applied but its response
+# was lost, rather than running the create a second time.
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def digest(*parts):
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part if isinstance(part, bytes) else part.encode())
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+class _AppKeys:
+    """The settings and counters of one app."""
+
+    def __init__(self, app):
+        self.enabled = app.config.get('IDEMPOTENCY_ENABLED', True)
+        self.ttl = app.config.get('IDEMPOTENCY_TTL', 86400)
+        self.claim_timeout = app.config.get('IDEMPOTENCY_CLAIM_TIMEOUT', 60)
+        self.purge_every = app.config.get('IDEMPOTENCY_PURGE_EVERY', 100)
+        self.claims = 0
+        self.replays = 0
+        self.conflicts = 0
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            return getattr(self, name)
+
+    def metrics(self):
+        """Prometheus exposition lines for the counters."""
+        lines = []
+        for name in ('claims', 'replays', 'conflicts'):
+            lines.append(f'# TYPE idempotency_{name}_total counter')
+            lines.append(f'idempotency_{name}_total {getattr(self, name)}')
+        return lines
+
+
+class IdempotencyKeys:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['idempotency'] = _AppKeys(app)
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['idempotency']
+
+    def idempotent(self, fn):
+        """Replay the stored response for a repeated Idempotency-Key."""
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not self._state().enabled or key is None:
+                return fn(*args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                abort(400, message=f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+
+            id = digest(request.method, request.path, key)
+            replay = self._claim(id, digest(request.get_data()))
+            if replay is not None:
+                return replay
+            heartbeat = self._keep_alive(id)
+            try:
+                with writer.also(self._mark_applied(id)):
+                    result = fn(*args, **kwargs)
+            except BaseException:
+                self._release(id)
+                raise
+            finally:
+                heartbeat.set()
+            if isinstance(result, Response):
+                self._release(id)
+                return result
+            data, code, headers = unpack(result)
+            if not 200 <= code < 300:
+                self._release(id)
+                return result
+            body = output_json(data, code).get_data()
+            self._store(id, code, body, dict(headers or {}))
+            return result
+        return wrapper
+
+    def _claim(self, id, fingerprint, retry=True):
+        """None once the key is ours, or the stored response to replay."""
+        state = self._state()
+        now = utcnow()
+        row = db.session.execute(
+            select(IdempotencyKeyModel.fingerprint, IdempotencyKeyModel.status_code, IdempotencyKeyModel.applied,
+                   IdempotencyKeyModel.body, IdempotencyKeyModel.headers, IdempotencyKeyModel.expires_at)
+            .where(IdempotencyKeyModel.id == id)
+        ).first()
+        # end the read so a SQLite connection doesn't hold its snapshot
+        # while the claim below commits
+        db.session.rollback()
+        if row is not None and row.expires_at > now:
+            if row.fingerprint != fingerprint:
+                abort(422, message=f"{HEADER} was already used for a different request")
+            if row.status_code is None and row.applied:
+                state.count('conflicts')
+                abort(409, message=f"The request with this {HEADER} was applied but its response was lost")
+            if row.status_code is None:
+                state.count('conflicts')
+                abort(409, message=f"A request with this {HEADER} is still in progress")
+            state.count('replays')
+            response = Response(zlib.decompress(row.body), status=row.status_code, mimetype='application/json')
+            response.headers.update(json.loads(row.headers or '{}'))
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        purge = state.count('claims') % state.purge_every == 0
+
+        def claim(session):
+            session.execute(delete(IdempotencyKeyModel).where(IdempotencyKeyModel.id == id,
+                                                              IdempotencyKeyModel.expires_at <= now))
+            session.add(IdempotencyKeyModel(id=id, fingerprint=fingerprint,
+                                            expires_at=now + timedelta(seconds=state.claim_timeout)))
+            session.flush()
+            if purge:
+                session.execute(delete(IdempotencyKeyModel).where(IdempotencyKeyModel.expires_at <= now))
+        try:
+            writer.write(claim)
+        except IntegrityError:
+            # another request claimed the same key first
+            if not retry:
+                raise
+            return self._claim(id, fingerprint, retry=False)
+        return None
+
+    def _keep_alive(self, id):
+        """Keep extending the claim on ``id`` until the returned event is set."""
+        app = current_app._get_current_object()
+        timeout = self._state().claim_timeout
+        stop = threading.Event()
+
+        def extend(session):
+            session.execute(
+                update(IdempotencyKeyModel)
+                .where(IdempotencyKeyModel.id == id, IdempotencyKeyModel.status_code.is_(None),
+                       IdempotencyKeyModel.applied.is_(False))
+                .values(expires_at=utcnow() + timedelta(seconds=timeout))
+            )
+
+        def beat():
+            with app.app_context():
+                while not stop.wait(timeout / 3):
+                    try:
+                        writer.write(extend)
+                    except Exception:
+                        pass  # e.g. the database is busy; the next beat tries again
+        threading.Thread(target=beat, name='idempotency-heartbeat', daemon=True).start()
+        return stop
+
+    def _mark_applied(self, id):
+        ttl = self._state().ttl
+
+        def mark(session):
+            session.execute(
+                update(IdempotencyKeyModel)
+                .where(IdempotencyKeyModel.id == id)
+                .values(applied=True, expires_at=utcnow() + timedelta(seconds=ttl))
+            )
+        return mark
+
+    def _store(self, id, code, body, headers):
+        ttl = self._state().ttl
+        writer.write(lambda session: session.execute(
+            update(IdempotencyKeyModel)
+            .where(IdempotencyKeyModel.id == id)
+            .values(status_code=code, body=zlib.compress(body), headers=json.dumps(headers) if headers else None,
+                    expires_at=utcnow() + timedelta(seconds=ttl))
+        ))
+
+    def _release(self, id):
+        # the handler's failed transaction, if it didn't roll back itself
+        db.session.rollback()
+        writer.write(lambda session: session.execute(
+            delete(IdempotencyKeyModel).where(IdempotencyKeyModel.id == id, IdempotencyKeyModel.status_code.is_(None),
+                                              IdempotencyKeyModel.applied.is_(False))
+        ))
+
+    def metrics(self):
+        return self._state().metrics()
+
+
+idempotency = IdempotencyKeys()
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request performance instrumentation.
+#
+# Every request records its wall time, the number of SQL statements and the
+# time spent in them (SQLAlchemy before/after_cursor_execute), the rows it
+# serialized and the response size. The numbers are sent back as a
+# ``Server-Timing`` header and aggregated per route into latency histograms
+# served in Prometheus text format at /metrics. A streamed body (the NDJSON
+# exports) is counted as it is sent and recorded when the server closes it,
+# so /metrics has its full time, queries, rows and bytes; its Server-Timing
+# header can only carry what was known before the first byte.
+#
+# The aggregates live in the worker process; scrape each worker (or run a
+# single process per scrape target) to get the full picture. Each app keeps
+# its own aggregates and collectors in app.extensions['metrics'].
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def record_rows(count):
+    """Count rows serialized for the current request."""
+    perf = g.get('perf') if has_app_context() else None
+    if perf is not None:
+        perf['rows'] += count
+
+
+class _RouteStats:
+    def __init__(self, buckets):
+        self.buckets = [0] * len(buckets)
+        self.count = 0
+        self.duration = 0.0
+        self.sql_queries = 0
+        self.sql_duration = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+
+class _CountingBody:
+    """Wraps a streamed response body, counting bytes until it is closed."""
+
+    def __init__(self, body, on_close):
+        self.body = body
+        self.on_close = on_close
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self.body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.body, 'close'):
+                self.body.close()
+        finally:
+            self.on_close(self.size)
+
+
+class _AppMetrics:
+    """The per-route aggregates and extra collectors of one app."""
+
+    def __init__(self, app):
+        self.buckets = tuple(app.config.get('METRICS_BUCKETS', DEFAULT_BUCKETS))
+        self.routes = defaultdict(lambda: _RouteStats(self.buckets))
+        self.extra = []
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        g.perf = {'start': time.perf_counter(), 'sql_queries': 0, 'sql_duration': 0.0, 'rows': 0}
+
+    def after_request(self, response):
+        perf = g.get('perf')
+        if perf is None:
+            return response
+        duration = time.perf_counter() - perf['start']
+
+        response.headers.add(
+            'Server-Timing',
+            f'app;dur={duration * 1000:.2f}, '
+            f'db;dur={perf["sql_duration"] * 1000:.2f};desc="{perf["sql_queries"]} queries", '
+            f'rows;desc="{perf["rows"]}"'
+        )
+
+        key = (request.method, request.url_rule.rule if request.url_rule else 'unmatched', response.status_code)
+        if response.is_streamed:
+            # the body runs after this hook (stream_with_context keeps g, so
+            # its queries and rows still land in perf); record once the
+            # server has sent it all and closes it
+            response.response = _CountingBody(response.response, lambda size: self.record(key, perf, size))
+        else:
+            del g.perf
+            self.record(key, perf, response.calculate_content_length() or 0)
+        return response
+
+    def record(self, key, perf, size):
+        duration = time.perf_counter() - perf['start']
+        with self._lock:
+            stats = self.routes[key]
+            stats.count += 1
+            stats.duration += duration
+            stats.sql_queries += perf['sql_queries']
+            stats.sql_duration += perf['sql_duration']
+            stats.rows += perf['rows']
+            stats.bytes += size
+            for index, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    stats.buckets[index] += 1
+
+    def render(self):
+        lines = [
+            '# HELP http_request_duration_seconds Request wall time',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            routes = sorted(self.routes.items())
+            for (method, route, status), stats in routes:
+                labels = f'method="{method}",route="{route}",status="{status}"'
+                for bound, count in zip(self.buckets, stats.buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {stats.duration}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {stats.count}')
+
+            counters = (
+                ('http_request_sql_queries_total', 'SQL statements executed', 'sql_queries'),
+                ('http_request_sql_duration_seconds_total', 'Time spent executing SQL', 'sql_duration'),
+                ('http_response_rows_total', 'Rows serialized into list responses', 'rows'),
+                ('http_response_bytes_total', 'Response body bytes', 'bytes'),
+            )
+            for name, help_text, attribute in counters:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (method, route, status), stats in routes:
+                    labels = f'method="{method}",route="{route}",status="{status}"'
+                    lines.append(f'{name}{{{labels}}} {getattr(stats, attribute)}')
+
+        for collect in self.extra:
+            lines.extend(collect())
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+
+class Metrics:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        state = app.extensions['metrics'] = _AppMetrics(app)
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        app.before_request(state.before_request)
+        app.after_request(state.after_request)
+        app.add_url_rule('/metrics', 'metrics', state.render)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def add_collector(self, app, collect):
+        """Register ``collect()`` returning extra exposition lines for ``app``'s /metrics."""
+        app.extensions['metrics'].extra.append(collect)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'perf' in g:
+        conn.info.setdefault('perf_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('perf_start')
+    if not starts or not has_app_context():
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    perf = g.get('perf')
+    if perf is not None:
+        perf['sql_queries'] += 1
+        perf['sql_duration'] += elapsed
@@ -4,6 +4,8 @@ from app.models.course import CourseModel
 from app.models.enrollment import EnrollmentModel
 from app.models.fee import FeeModel
 from app.models.users import UserModel
+from app.models.idempotency import IdempotencyKeyModel
+from app.models.versioned import TombstoneModel
 
 
 
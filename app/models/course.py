@@ -1,14 +1,21 @@
 from app.extension import db
+from app.models.versioned import Versioned
 from app.models.enrollment import EnrollmentModel
 
 
-class CourseModel(db.Model):
+class CourseModel(Versioned, db.Model):
     __tablename__ ='courses'
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String, unique=True, nullable=False)
     name = db.Column(db.String(20), unique=True, nullable=False)
     credits = db.Column(db.Integer, nullable=False)
-    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id'))
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id'), index=True)
+    capacity = db.Column(db.Integer)  # NULL: no limit
+    enrolled_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # see app/seats.py
+    # seats left (NULL: no limit), computed by the database and only selected when asked for
+    available = db.column_property(
+        db.case((capacity.is_(None), None), (enrolled_count >= capacity, 0), else_=capacity - enrolled_count),
+        deferred=True)
     enrolments = db.relationship('EnrollmentModel', backref='course', lazy=True)
     
     def __repr__(self):
@@ -1,9 +1,14 @@
 from app.extension import db
+from app.models.versioned import Versioned
 from datetime import datetime, timezone
 
 
-class EnrollmentModel(db.Model):
+class EnrollmentModel(Versioned, db.Model):
     __tablename__ = 'enrollments'
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'course_id', name='uq_enrollments_student_id_course_id'),
+        db.Index('ix_enrollments_course_id_status', 'course_id', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
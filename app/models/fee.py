@@ -1,16 +1,20 @@
 from app.extension import db
+from app.models.versioned import Versioned
 from datetime import datetime, timezone
 
 
-class FeeModel(db.Model):
+class FeeModel(Versioned, db.Model):
     __tablename__='fees'
+    __table_args__ = (
+        db.Index('ix_fees_student_id_status', 'student_id', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     fee_type = db.Column(db.String(50), nullable=False) #tuition, accomodation, graduation
-    semester = db.Column(db.String(20))
+    semester = db.Column(db.String(20), index=True)
     payment_date = db.Column(db.DateTime, default=datetime.now(timezone.utc))
-    status = db.Column(db.String(20), default='pending')#paid, overdue
+    status = db.Column(db.String(20), default='pending', index=True)#paid, overdue
     
     def __repr__(self):
         return f"Fee {self.id - {self.fee_type}}"
\ No newline at end of file
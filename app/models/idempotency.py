@@ -0,0 +1,15 @@
+from app.extension import db
+
+
+class IdempotencyKeyModel(db.Model):
+    __tablename__ = 'idempotency_keys'
+    id = db.Column(db.String(64), primary_key=True)  # sha256 of method, path and Idempotency-Key
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of the request body
+    status_code = db.Column(db.Integer)  # NULL while the first request is running
+    applied = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # the request committed a write
+    body = db.Column(db.LargeBinary)  # zlib-compressed JSON
+    headers = db.Column(db.Text)  # JSON object, e.g. Location
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"IdempotencyKey {self.id} {self.status_code}"
@@ -1,9 +1,10 @@
 from app.extension import db
+from app.models.versioned import Versioned
 from datetime import datetime,timezone
 from app.models.enrollment import EnrollmentModel
 from app.models.fee import FeeModel 
 
-class StudentModel(db.Model):
+class StudentModel(Versioned, db.Model):
     __tablename__ = 'students'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -1,16 +1,17 @@
 
 from app.extension import db
+from app.models.versioned import Versioned
 from datetime import datetime, timezone
 from app.models.course import  CourseModel
 
-class TeacherModel(db.Model):
+class TeacherModel(Versioned, db.Model):
     __tablename__ ='teachers'
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(80), nullable=False)
     last_name = db.Column(db.String(80), nullable=False)
     email = db.Column(db.String(120), nullable=False, unique=True)
     phone = db.Column(db.String(20))
-    department = db.Column(db.String(100))
+    department = db.Column(db.String(100), index=True)
     credits = db.Column(db.Integer, default=0)
     hire_date = db.Column(db.DateTime, default=datetime.now(timezone.utc))
     courses = db.relationship('CourseModel', backref='teacher', lazy=True)
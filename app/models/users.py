@@ -1,10 +1,11 @@
 from app.extension import db
+from app.models.versioned import Versioned
 #Database model
-class UserModel(db.Model):
+class UserModel(Versioned, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80),unique=True,nullable=False)
     email = db.Column(db.String(80),unique=True,nullable=False)
-    password = db.Column(db.String(80),nullable=True)
+    password = db.Column(db.String(255),nullable=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
     def __repr__(self):
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import event, insert, inspect, literal_column
+
+from app.extension import db
+
+# Row versioning for the change feed (app/changes.py).
+#
+#     class StudentModel(Versioned, db.Model): ...
+#     record_deletes(session, EnrollmentModel, [(id, version), ...])   after a Core DELETE
+#
+# updated_at and version are column default/onupdate values, so they are set
+# by every INSERT and UPDATE SQLAlchemy emits for the table: ORM flushes, the
+# bulk endpoints' executemany INSERTs and Core UPDATEs such as the seat
+# counters alike. Timestamps are naive UTC with microseconds, taken from the
+# clock of the process doing the write.
+#
+# Deleting a versioned object through the session leaves a tombstone row with
+# its table, id and last version; a DELETE statement has to record its
+# tombstones itself with record_deletes().
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Versioned:
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=literal_column('version') + 1)
+
+
+class TombstoneModel(db.Model):
+    __tablename__ = 'tombstones'
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=utcnow, index=True)
+
+    def __repr__(self):
+        return f"Tombstone {self.table_name} {self.row_id}"
+
+
+def record_deletes(session, model, rows):
+    """Add tombstones for ``rows`` of ``(id, version)`` deleted from ``model``."""
+    if rows:
+        session.execute(insert(TombstoneModel), [
+            {'table_name': model.__tablename__, 'row_id': id, 'version': version} for id, version in rows])
+
+
+@event.listens_for(Versioned, 'after_delete', propagate=True)
+def _tombstone(mapper, connection, target):
+    # the object may be expired by now, so don't trigger a load
+    state = inspect(target)
+    connection.execute(insert(TombstoneModel).values(
+        table_name=mapper.local_table.name, row_id=state.identity[0], version=state.dict.get('version')))
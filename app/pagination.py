@@ -0,0 +1,119 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import request
+from flask_restful import abort
+from sqlalchemy import and_, false, or_
+
+from app.filtering import coerce, nullable, order_clauses
+from app.serializers import Serializer
+
+# Keyset (cursor) pagination for the collection endpoints.
+#
+# A page is requested with ``?limit=`` and continued with ``?after=<cursor>``.
+# The cursor is an opaque, url-safe token holding the sort key of the last
+# row served, so the next page is a plain ``WHERE id > :last ORDER BY id
+# LIMIT n`` (or the equivalent row comparison for a ``?sort=``) that walks an
+# index and is not shifted by concurrent inserts the way OFFSET paging is.
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        abort(400, message="Invalid cursor")
+    if not isinstance(values, list) or not values:
+        abort(400, message="Invalid cursor")
+    return values
+
+
+def is_paginated(args=None):
+    args = request.args if args is None else args
+    return 'limit' in args or 'after' in args
+
+
+def page_limit(args=None):
+    args = request.args if args is None else args
+    limit = args.get('limit', DEFAULT_LIMIT)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        abort(400, message="limit must be an integer")
+    if limit < 1 or limit > MAX_LIMIT:
+        abort(400, message=f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def paginate(query, model, order, fields):
+    """Return one page of ``query`` as ``{'items': [...], 'next': cursor}``.
+
+    ``order`` is the ``(column, descending)`` list from ``filter_query``; the
+    cursor holds the last row's value for each of those columns. ``next`` is
+    ``None`` on the last page.
+    """
+    limit, after = page_window(order)
+    if after is not None:
+        query = query.filter(after)
+
+    serializer = Serializer(model, fields)
+    keys = [column for column, _ in order]
+    rows = serializer.select(query, *keys).order_by(*order_clauses(order)).limit(limit + 1).all()
+    return page_of(serializer, rows, limit, len(keys))
+
+
+def page_window(order, args=None):
+    """``(limit, clause)`` for the requested page; ``clause`` is ``None`` on the first page."""
+    args = request.args if args is None else args
+    limit = page_limit(args)
+    after = args.get('after')
+    if not after:
+        return limit, None
+    values = decode_cursor(after)
+    if len(values) != len(order):
+        abort(400, message="Invalid cursor")
+    values = [coerce(column, 'after', value) for (column, _), value in zip(order, values)]
+    return limit, after_row(order, values)
+
+
+def page_of(serializer, rows, limit, keys):
+    """The page body for ``limit + 1`` fetched ``rows`` ending in ``keys`` sort key columns."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([_cursor_value(value) for value in rows[-1][-keys:]])
+    return {'items': serializer.dump_all(rows), 'next': next_cursor}
+
+
+def after_row(order, values):
+    """WHERE clause selecting the rows that sort strictly after ``values``.
+
+    Expands the row comparison column by column so mixed ASC/DESC orders work:
+    ``c1 > v1 OR (c1 = v1 AND (c2 > v2 OR (c2 = v2 AND ...)))``. NULLs sort
+    last, matching ``order_clauses``.
+    """
+    clause = false()
+    for (column, descending), value in reversed(list(zip(order, values))):
+        if value is None:
+            clause = and_(column.is_(None), clause)
+            continue
+        greater = column < value if descending else column > value
+        if nullable(column):
+            greater = or_(greater, column.is_(None))
+        clause = or_(greater, and_(column == value, clause))
+    return clause
+
+
+def _cursor_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
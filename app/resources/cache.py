@@ -0,0 +1,38 @@
+from flask_restful import Resource
+from app.extension import cache
+
+
+class CacheStats(Resource):
+    def get(self):
+        """Response cache counters
+        ---
+        tags:
+            - Monitoring
+        summary: Retrieve response cache statistics
+        description: Hit, miss, 304 and invalidation counters of the response cache in this worker process.
+        responses:
+            200:
+                description: Cache statistics
+                schema:
+                    type: object
+                    properties:
+                        hits:
+                            type: integer
+                            description: Requests answered from the cache
+                        misses:
+                            type: integer
+                            description: Requests that had to run the handler
+                        not_modified:
+                            type: integer
+                            description: Requests answered with 304 Not Modified
+                        invalidations:
+                            type: integer
+                            description: Number of namespace invalidations
+                        hit_ratio:
+                            type: number
+                            description: hits / (hits + misses)
+                        entries:
+                            type: integer
+                            description: Entries currently held by the in-process cache
+        """
+        return cache.stats()
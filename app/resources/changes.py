@@ -0,0 +1,89 @@
+from flask import current_app, request
+from flask_restful import Resource
+from app.changes import ChangeFeed, SETTLE_SECONDS
+from app.models.course import CourseModel
+from app.models.enrollment import EnrollmentModel
+from app.models.fee import FeeModel
+from app.models.student import StudentModel
+from app.models.teacher import TeacherModel
+from app.models.users import UserModel
+from app.resources.course import course_fields
+from app.resources.enrollment import enrollment_fields
+from app.resources.fee import fee_fields
+from app.resources.student import student_fields
+from app.resources.teacher import teacher_fields
+from app.resources.user import user_fields
+
+# rows are shown as the collection endpoints show them
+change_feed = ChangeFeed([
+    ('students', StudentModel, student_fields),
+    ('teachers', TeacherModel, teacher_fields),
+    ('courses', CourseModel, course_fields),
+    ('enrollments', EnrollmentModel, enrollment_fields),
+    ('fees', FeeModel, fee_fields),
+    ('users', UserModel, user_fields),
+])
+
+
+class Changes(Resource):
+    def get(self):
+        """Rows created, changed or deleted since a cursor
+        ---
+        tags:
+            - Sync
+        summary: Incremental change feed
+        description: Returns the rows of every table (students, teachers, courses, enrollments, fees, users) that changed after ``since``, oldest first, each once at its latest version, and a tombstone for each deleted row. Pass the returned ``next`` as ``since`` to get the following batch; when ``has_more`` is false the client is up to date and can poll again later with the same ``next``. Changes from the last few seconds (CHANGES_SETTLE_SECONDS) are held back until they are settled.
+        parameters:
+            - in: query
+              name: since
+              type: string
+              required: false
+              description: The ``next`` cursor of the previous batch, or an ISO 8601 timestamp (UTC unless it has an offset). Omit to start from the beginning.
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Changes per batch (1-500, default 50)
+            - in: query
+              name: tables
+              type: string
+              required: false
+              description: Comma-separated table names to include, e.g. ``students,fees``
+        responses:
+            200:
+                description: One batch of changes
+                schema:
+                    type: object
+                    properties:
+                        changes:
+                            type: array
+                            items:
+                                type: object
+                                properties:
+                                    table:
+                                        type: string
+                                        example: students
+                                    id:
+                                        type: integer
+                                    version:
+                                        type: integer
+                                        description: Incremented by every update of the row
+                                    updated_at:
+                                        type: string
+                                        format: date-time
+                                        description: When the row was last written or deleted (UTC)
+                                    deleted:
+                                        type: boolean
+                                    data:
+                                        type: object
+                                        description: The row as its collection endpoint returns it; null for deleted rows
+                        next:
+                            type: string
+                            description: Cursor to pass as ``since`` next time
+                        has_more:
+                            type: boolean
+                            description: Whether more changes are ready right away
+            400:
+                description: Invalid cursor, limit, table name or query parameter
+        """
+        return change_feed.page(request.args, current_app.config.get('CHANGES_SETTLE_SECONDS', SETTLE_SECONDS))
@@ -1,6 +1,12 @@
-from flask_restful import Resource, abort, marshal_with, fields, reqparse
-from app.extension import db
+from flask_restful import Resource, abort, marshal_with, fields, reqparse, marshal
+from app.extension import db, cache, writer
+from app.idempotency import idempotency
+from app.filtering import filter_query, order_clauses
+from app.serializers import dump_first, dump_query, project
+from app.pagination import is_paginated, paginate
+from sqlalchemy.orm import selectinload
 from app.models.course import CourseModel
+from app.models.enrollment import EnrollmentModel
 
 
 
@@ -10,6 +16,7 @@ course_args.add_argument('code', type=int, required=True, help="Course code cann
 course_args.add_argument('name', type=str, required=True, help="Course name cannot be empty")
 course_args.add_argument('credits', type=int, default=0, help="Credits must be an integer")
 course_args.add_argument('teacher_id', type=int, required=True, help="Teacher ID is required")
+course_args.add_argument('capacity', type=int, help="Capacity must be an integer")  # omitted: no limit
 
 
 # COURSE FIELDS
@@ -18,13 +25,53 @@ course_fields = {
     'code': fields.String,
     'name': fields.String,
     'credits': fields.Integer,
-    'teacher_id': fields.Integer
+    'teacher_id': fields.Integer,
+    'capacity': fields.Integer(default=None),
+    'enrolled_count': fields.Integer
 }
 
+course_filters = ('teacher_id', 'code', 'credits')
+course_sort = ('id', 'code', 'name', 'credits')
+
+# ROSTER FIELDS
+roster_student_fields = {
+    'id': fields.Integer,
+    'first_name': fields.String,
+    'last_name': fields.String,
+    'student_id': fields.String,
+    'email': fields.String
+}
+
+roster_enrollment_fields = {
+    'id': fields.Integer,
+    'enrollment_date': fields.String,
+    'status': fields.String,
+    'student': fields.Nested(roster_student_fields)
+}
+
+roster_fields = {
+    **course_fields,
+    'enrollments': fields.List(fields.Nested(roster_enrollment_fields), attribute='enrolments')
+}
+
+roster_loader = selectinload(CourseModel.enrolments).joinedload(EnrollmentModel.student)
+
+# AVAILABILITY FIELDS
+availability_fields = {
+    'id': fields.Integer,
+    'code': fields.String,
+    'name': fields.String,
+    'capacity': fields.Integer(default=None),
+    'enrolled_count': fields.Integer,
+    'available': fields.Integer(default=None)
+}
+
+availability_filters = ('id', 'teacher_id', 'code')
+
 # Resources
 class Courses(Resource):
     # Get all students
-    @marshal_with(course_fields)
+    @cache.cached('courses')
     def get(self):
         """Get all courses
         ---
@@ -32,6 +79,42 @@ class Courses(Resource):
             - Courses
         summary: Retrieve all courses
         description: This endpoint retrieves all courses from the system.
+        parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,code,name`` (default all)
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Page size. Enables cursor pagination and wraps the response as {items, next}
+            - in: query
+              name: after
+              type: string
+              required: false
+              description: Opaque cursor taken from the next value of the previous page
+            - in: query
+              name: teacher_id
+              type: integer
+              required: false
+              description: Only return rows with this teacher_id. Repeat the parameter to match any of several values
+            - in: query
+              name: code
+              type: string
+              required: false
+              description: Only return rows with this code. Repeat the parameter to match any of several values
+            - in: query
+              name: credits
+              type: integer
+              required: false
+              description: Only return rows with this credits. Repeat the parameter to match any of several values
+            - in: query
+              name: sort
+              type: string
+              required: false
+              description: Comma separated sort fields, prefix with - for descending (e.g. -id)
         responses:
             200:
                 description: List of all courses retrieved successfully
@@ -55,6 +138,12 @@ class Courses(Resource):
                             teacher_id:
                                 type: integer
                                 description: The ID of the assigned teacher
+                            capacity:
+                                type: integer
+                                description: Maximum number of seats, null for no limit
+                            enrolled_count:
+                                type: integer
+                                description: Enrollments currently holding a seat
             404:
                 description: No courses found
                 schema:
@@ -68,7 +157,11 @@ class Courses(Resource):
         
         
         
-        courses = CourseModel.query.all()
+        query, order = filter_query(CourseModel, course_filters, course_sort)
+        shown = project(course_fields)
+        if is_paginated():
+            return paginate(query, CourseModel, order, shown)
+        courses = dump_query(query.order_by(*order_clauses(order)), CourseModel, shown)
         if not courses:
             abort(404, message="Courses not found")
         return courses
@@ -77,6 +170,8 @@ class Courses(Resource):
 # COURSE RESOURCE
 
     
+    @idempotency.idempotent
+    @cache.invalidates('courses')
     @marshal_with(course_fields)
     def post(self):
         """Create a new course
@@ -86,6 +181,11 @@ class Courses(Resource):
         summary: Create a new course
         description: This endpoint creates a new course in the system.
         parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
             - in: body
               name: course
               description: Course data
@@ -109,6 +209,9 @@ class Courses(Resource):
                       teacher_id:
                           type: integer
                           description: The ID of the assigned teacher
+                      capacity:
+                          type: integer
+                          description: Maximum number of seats (omit for no limit). Lowering it below the current enrollments refuses new ones without removing any
         responses:
             201:
                 description: Course created successfully
@@ -130,6 +233,12 @@ class Courses(Resource):
                         teacher_id:
                             type: integer
                             description: The ID of the assigned teacher
+                        capacity:
+                            type: integer
+                            description: Maximum number of seats, null for no limit
+                        enrolled_count:
+                            type: integer
+                            description: Enrollments currently holding a seat
             400:
                 description: Bad request - validation error
                 schema:
@@ -145,10 +254,10 @@ class Courses(Resource):
                 code=args['code'],
                 name=args['name'],
                 credits=args['credits'],
-                teacher_id=args['teacher_id']
+                teacher_id=args['teacher_id'],
+                capacity=args['capacity']
             )
-            db.session.add(course)
-            db.session.commit()
+            writer.save(course)
             return course, 201
         except Exception as e:
             db.session.rollback()
@@ -159,17 +268,165 @@ class Courses(Resource):
                 code=args['code'],
                 name=args['name'],
                 credits=args['credits'],
-                teacher_id=args['teacher_id']
+                teacher_id=args['teacher_id'],
+                capacity=args['capacity']
             )
-            db.session.add(course)
-            db.session.commit()
+            writer.save(course)
             return course,201
         except Exception as e:
             db.session.rollback()
             abort(400, message=f"Error. could not create course {str(e)}")
         
+class CourseAvailability(Resource):
+    def get(self):
+        """Get the seats left in courses
+        ---
+        tags:
+            - Courses
+        summary: Retrieve course availability
+        description: Capacity, enrolled count and seats left per course, read from the counters kept on the course rows (no enrollments are counted), so it stays cheap to poll on registration day. Not cached.
+        parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,available`` (default all)
+            - in: query
+              name: id
+              type: integer
+              required: false
+              description: Only return this course. Repeat the parameter to match any of several values
+            - in: query
+              name: teacher_id
+              type: integer
+              required: false
+              description: Only return rows with this teacher_id. Repeat the parameter to match any of several values
+            - in: query
+              name: code
+              type: string
+              required: false
+              description: Only return rows with this code. Repeat the parameter to match any of several values
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Page size. Enables cursor pagination and wraps the response as {items, next}
+            - in: query
+              name: after
+              type: string
+              required: false
+              description: Opaque cursor taken from the next value of the previous page
+            - in: query
+              name: sort
+              type: string
+              required: false
+              description: Comma separated sort fields, prefix with - for descending (e.g. -id)
+        responses:
+            200:
+                description: Availability of the matching courses
+                schema:
+                    type: array
+                    items:
+                        type: object
+                        properties:
+                            id:
+                                type: integer
+                                description: The unique identifier of the course
+                            code:
+                                type: string
+                                description: The course code
+                            name:
+                                type: string
+                                description: The name of the course
+                            capacity:
+                                type: integer
+                                description: Maximum number of seats, null for no limit
+                            enrolled_count:
+                                type: integer
+                                description: Enrollments currently holding a seat
+                            available:
+                                type: integer
+                                description: Seats left, null for no limit
+            404:
+                description: No courses found
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Courses not found!
+        """
+        query, order = filter_query(CourseModel, availability_filters, course_sort)
+        shown = project(availability_fields)
+        if is_paginated():
+            return paginate(query, CourseModel, order, shown)
+        courses = dump_query(query.order_by(*order_clauses(order)), CourseModel, shown)
+        if not courses:
+            abort(404, message="Courses not found")
+        return courses
+
+class CourseRoster(Resource):
+    def get(self, id):
+        """Get a course with its enrolled students
+        ---
+        tags:
+            - Courses
+        summary: Retrieve a course roster
+        description: Returns the course with every enrollment and its student. The roster is loaded in two queries however many students are enrolled.
+        parameters:
+            - in: path
+              name: id
+              type: integer
+              required: true
+              description: The unique identifier of the course
+        responses:
+            200:
+                description: Course roster retrieved successfully
+                schema:
+                    type: object
+                    properties:
+                        id:
+                            type: integer
+                            description: The unique identifier of the course
+                        code:
+                            type: string
+                            description: The course code
+                        name:
+                            type: string
+                            description: The name of the course
+                        credits:
+                            type: integer
+                            description: The number of credits for the course
+                        teacher_id:
+                            type: integer
+                            description: The ID of the assigned teacher
+                        capacity:
+                            type: integer
+                            description: Maximum number of seats, null for no limit
+                        enrolled_count:
+                            type: integer
+                            description: Enrollments currently holding a seat
+                        enrollments:
+                            type: array
+                            description: Enrollments in the course, each with its student
+                            items:
+                                type: object
+            404:
+                description: Course not found
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Course not found!
+        """
+        course = CourseModel.query.options(roster_loader).filter_by(id=id).first()
+        if not course:
+            abort(404, message="Course not found")
+        return marshal(course, roster_fields)
+
 class Course(Resource):
-    @marshal_with(course_fields)
+    @cache.cached('courses')
     def get(self, id):
         """Get a specific course by ID
         ---
@@ -178,6 +435,11 @@ class Course(Resource):
         summary: Retrieve a course by ID
         description: This endpoint retrieves a specific course by its ID.
         parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,code,name`` (default all)
             - in: path
               name: id
               type: integer
@@ -204,6 +466,12 @@ class Course(Resource):
                         teacher_id:
                             type: integer
                             description: The ID of the assigned teacher
+                        capacity:
+                            type: integer
+                            description: Maximum number of seats, null for no limit
+                        enrolled_count:
+                            type: integer
+                            description: Enrollments currently holding a seat
             404:
                 description: Course not found
                 schema:
@@ -213,7 +481,7 @@ class Course(Resource):
                             type: string
                             description: Course not found!
         """
-        course = CourseModel.query.filter_by(id=id).first()
+        course = dump_first(CourseModel.query.filter_by(id=id), CourseModel, project(course_fields))
         if not course:
             abort(404, message="Course not found")
         return course
@@ -222,6 +490,7 @@ class Course(Resource):
         
         
 
+    @cache.invalidates('courses')
     @marshal_with(course_fields)
     def put(self, id):
         """Update a course by ID
@@ -259,6 +528,9 @@ class Course(Resource):
                       teacher_id:
                           type: integer
                           description: The ID of the assigned teacher
+                      capacity:
+                          type: integer
+                          description: Maximum number of seats (omit for no limit). Lowering it below the current enrollments refuses new ones without removing any
         responses:
             200:
                 description: Course updated successfully
@@ -280,6 +552,12 @@ class Course(Resource):
                         teacher_id:
                             type: integer
                             description: The ID of the assigned teacher
+                        capacity:
+                            type: integer
+                            description: Maximum number of seats, null for no limit
+                        enrolled_count:
+                            type: integer
+                            description: Enrollments currently holding a seat
             404:
                 description: Course not found
                 schema:
@@ -306,7 +584,8 @@ class Course(Resource):
             course.name = args['name']
             course.credits = args['credits']
             course.teacher_id = args['teacher_id']
-            db.session.commit()
+            course.capacity = args['capacity']
+            writer.save(course)
             return course
         except Exception as e:
             db.session.rollback()
@@ -321,15 +600,17 @@ class Course(Resource):
             course.name = args['name']
             course.credits = args['credits']
             course.teacher_id = args['teacher_id']
+            course.capacity = args['capacity']
             
             
-            db.session.commit()
+            writer.save(course)
             return course,200
         except Exception as e:
             db.session.rollback()
             abort(400, message=f"Error. could not update a course {str(e)}")
         
         
+    @cache.invalidates('courses')
     @marshal_with(course_fields)
     def patch(self, id):
         args = course_args.parse_args()
@@ -345,13 +626,15 @@ class Course(Resource):
             course.credits = args['credits']
             
             course.teacher_id = args['teacher_id']
+            course.capacity = args['capacity']
             
-            db.session.commit()
+            writer.save(course)
             return course,200
         except Exception as e:
             db.session.rollback()
             abort(400, message=f"Error. could not update a course {str(e)}")
             
+    @cache.invalidates('courses')
     @marshal_with(course_fields)
     def delete(self, id):
         """Delete a course by ID
@@ -390,8 +673,7 @@ class Course(Resource):
         if not course:
             abort(404, message="Course not found")
         try:
-            db.session.delete(course)
-            db.session.commit()
+            writer.remove(course)
             return '', 204
         except Exception as e:
             db.session.rollback()
@@ -0,0 +1,58 @@
+from flask_restful import Resource
+from app.extension import db
+
+
+class PoolStats(Resource):
+    def get(self):
+        """Database connection pool state
+        ---
+        tags:
+            - Monitoring
+        summary: Retrieve connection pool statistics
+        description: Live state of the connection pool of every database engine in this worker process, with the time requests spent waiting for a connection.
+        responses:
+            200:
+                description: Pool statistics keyed by bind ("default" for the main database)
+                schema:
+                    type: object
+                    additionalProperties:
+                        type: object
+                        properties:
+                            pool:
+                                type: string
+                                description: Pool implementation
+                            size:
+                                type: integer
+                                description: Connections the pool keeps open
+                            checked_out:
+                                type: integer
+                                description: Connections currently in use
+                            checked_in:
+                                type: integer
+                                description: Idle connections in the pool
+                            overflow:
+                                type: integer
+                                description: Connections open beyond the pool size
+                            max_overflow:
+                                type: integer
+                                description: Most connections that may be opened beyond the pool size (null when left at the SQLAlchemy default)
+                            timeout:
+                                type: number
+                                description: Seconds a checkout waits before failing
+                            checkouts:
+                                type: integer
+                                description: Connections handed out so far
+                            timeouts:
+                                type: integer
+                                description: Checkouts that gave up waiting
+                            wait_seconds_total:
+                                type: number
+                                description: Total time spent waiting for a connection
+                            wait_seconds_max:
+                                type: number
+                                description: Longest wait for a connection
+                            wait_seconds_avg:
+                                type: number
+                                description: Average wait per checkout
+        """
+        return db.pool_stats()
@@ -1,13 +1,23 @@
 from flask_restful import Resource, abort, marshal_with, fields, reqparse
-from app.extension import db
+from sqlalchemy import delete, select
+from werkzeug.exceptions import HTTPException
+from app.extension import db, cache, writer
+from app.idempotency import idempotency
+from app.filtering import filter_query, order_clauses
+from app.serializers import dump_first, dump_query, project
+from app.pagination import is_paginated, paginate
+from app.bulk import bulk_create, read_rows, value
+from app.export import stream_ndjson, wants_ndjson
 from app.models.enrollment import EnrollmentModel
+from app.models.versioned import record_deletes
+from app.seats import holds_seat, move_seat, release_seat, reserve_seats, take_seat
 from datetime import datetime
-from dateutil import parser as date_parser 
+from app.dates import parse_date
 
 #Request Parser
 enrollment_args = reqparse.RequestParser()
 enrollment_args.add_argument('student_id', type=int, help="Student ID cannot be empty")
-enrollment_args.add_argument('course_id', type=str, help="Course ID cannot be empty")
+enrollment_args.add_argument('course_id', type=int, help="Course ID cannot be empty")
 enrollment_args.add_argument('enrollment_date', type=str)
 enrollment_args.add_argument('status', type=str, default='active') #if the client does not provide a status value it'll be set to active by default
 
@@ -20,10 +30,24 @@ enrollment_fields = {
     'status' : fields.String
 }
 
+enrollment_filters = ('student_id', 'course_id', 'status')
+enrollment_sort = ('id', 'student_id', 'course_id', 'enrollment_date', 'status')
+
+
+
+def parse_enrollment_row(row):
+    enrollment_date = value(row, 'enrollment_date')
+    values = {
+        'student_id': value(row, 'student_id', int, required=True),
+        'course_id': value(row, 'course_id', int, required=True),
+        'enrollment_date': parse_date(enrollment_date) if enrollment_date else None,
+        'status': value(row, 'status', default='active'),
+    }
+    return {key: val for key, val in values.items() if val is not None}
+
 
 # Enrollments Resource
 class Enrollments(Resource):
-    @marshal_with(enrollment_fields)
     def get(self):
         """Get all enrollments
         ---
@@ -31,6 +55,42 @@ class Enrollments(Resource):
             - Enrollments
         summary: Retrieve all enrollments
         description: This endpoint retrieves all enrollments from the system.
+        parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,student_id,status`` (default all)
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Page size. Enables cursor pagination and wraps the response as {items, next}
+            - in: query
+              name: after
+              type: string
+              required: false
+              description: Opaque cursor taken from the next value of the previous page
+            - in: query
+              name: student_id
+              type: integer
+              required: false
+              description: Only return rows with this student_id. Repeat the parameter to match any of several values
+            - in: query
+              name: course_id
+              type: integer
+              required: false
+              description: Only return rows with this course_id. Repeat the parameter to match any of several values
+            - in: query
+              name: status
+              type: string
+              required: false
+              description: Only return rows with this status. Repeat the parameter to match any of several values
+            - in: query
+              name: sort
+              type: string
+              required: false
+              description: Comma separated sort fields, prefix with - for descending (e.g. -id)
         responses:
             200:
                 description: List of all enrollments retrieved successfully
@@ -67,7 +127,13 @@ class Enrollments(Resource):
                             type: string
                             description: Enrollments not found!
         """
-        enrollments = EnrollmentModel.query.all()
+        query, order = filter_query(EnrollmentModel, enrollment_filters, enrollment_sort)
+        shown = project(enrollment_fields)
+        if wants_ndjson():
+            return stream_ndjson(query, EnrollmentModel, shown, order)
+        if is_paginated():
+            return paginate(query, EnrollmentModel, order, shown)
+        enrollments = dump_query(query.order_by(*order_clauses(order)), EnrollmentModel, shown)
         if not enrollments:
             abort(404, message="Enrollments not found")
         return enrollments
@@ -75,6 +141,8 @@ class Enrollments(Resource):
         
         
     
+    @idempotency.idempotent
+    @cache.invalidates('courses')
     @marshal_with(enrollment_fields)
     def post(self):
         """Create a new enrollment
@@ -82,8 +150,13 @@ class Enrollments(Resource):
         tags:
             - Enrollments
         summary: Create a new enrollment
-        description: This endpoint creates a new enrollment in the system.
+        description: This endpoint creates a new enrollment in the system. Unless its status is dropped, the enrollment takes a seat in the course and is refused once the course is at capacity.
         parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
             - in: body
               name: enrollment
               description: Enrollment data
@@ -135,6 +208,22 @@ class Enrollments(Resource):
                         status:
                             type: string
                             description: The enrollment status
+            404:
+                description: Course not found
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Course not found
+            409:
+                description: The course is full
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Course is full
             400:
                 description: Bad request - validation error
                 schema:
@@ -147,25 +236,111 @@ class Enrollments(Resource):
         args = enrollment_args.parse_args()
        
         
-        # parse enrollment date manually
-        enrollment_date = date_parser.parse(args['enrollment_date']).date() if args['enrollment_date'] else None
         try:
+            # parse enrollment date manually
+            enrollment_date = parse_date(args['enrollment_date']) if args['enrollment_date'] else None
             enrollment = EnrollmentModel(
                 student_id=args['student_id'],
                 course_id=args['course_id'],
                 enrollment_date=enrollment_date,
                 status=args['status']
             )
-            db.session.add(enrollment)
-            db.session.commit()
+            seat = (lambda session: take_seat(session, enrollment.course_id)) if holds_seat(enrollment.status) else None
+            writer.save(enrollment, before=seat)
             return enrollment, 201
+        except HTTPException:
+            raise
         except Exception as e:
             db.session.rollback()
             abort(400, message=f"Error: Could not create an enrollment. {str(e)}")
                 
             
+class EnrollmentsExport(Resource):
+    def get(self):
+        """Stream all enrollments as NDJSON
+        ---
+        tags:
+            - Enrollments
+        summary: Export all enrollments
+        description: Streams every enrollment as newline-delimited JSON, one object per line, reading rows from the database in batches.
+        produces:
+            - application/x-ndjson
+        parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,student_id,status`` (default all)
+            - in: query
+              name: sort
+              type: string
+              required: false
+              description: Comma separated sort fields, prefix with - for descending (e.g. -id)
+        responses:
+            200:
+                description: Newline-delimited JSON stream of enrollments
+        """
+        query, order = filter_query(EnrollmentModel, enrollment_filters, enrollment_sort)
+        return stream_ndjson(query, EnrollmentModel, project(enrollment_fields), order)
+
+class EnrollmentsBulk(Resource):
+    @idempotency.idempotent
+    @cache.invalidates('courses')
+    def post(self):
+        """Create many enrollments in one request
+        ---
+        tags:
+            - Enrollments
+        summary: Bulk create enrollments
+        description: Accepts a JSON array (or application/x-ndjson, one object per line) of enrollments using the same fields as the single create endpoint. Rows are validated together and inserted in chunked transactions. Each chunk takes its course seats in the same transaction, so rows for a course that is full (or unknown) are rejected in results with "Course is full" (or "Course not found") and the rest are created.
+        consumes:
+            - application/json
+            - application/x-ndjson
+        parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
+            - in: body
+              name: enrollments
+              description: Array of enrollments
+              required: true
+              schema:
+                  type: array
+                  items:
+                      type: object
+        responses:
+            201:
+                description: All rows created
+                schema:
+                    type: object
+                    properties:
+                        created:
+                            type: integer
+                            description: Number of rows created
+                        failed:
+                            type: integer
+                            description: Number of rows rejected
+                        results:
+                            type: array
+                            description: Per-row result in request order (index, status, id or message)
+                            items:
+                                type: object
+            207:
+                description: Some rows were rejected, see results
+            400:
+                description: Bad request - body is not an array of objects
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Error message
+        """
+        return bulk_create(EnrollmentModel, read_rows(), parse_enrollment_row, before_insert=reserve_seats)
+
 class Enrollment(Resource):
-    @marshal_with(enrollment_fields)
     def get(self, id):
         """Get a specific enrollment by ID
         ---
@@ -174,6 +349,11 @@ class Enrollment(Resource):
         summary: Retrieve an enrollment by ID
         description: This endpoint retrieves a specific enrollment by its ID.
         parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,student_id,status`` (default all)
             - in: path
               name: id
               type: integer
@@ -213,12 +393,13 @@ class Enrollment(Resource):
                             type: string
                             description: Enrollment not found!
         """
-        enrollment = EnrollmentModel.query.filter_by(id=id).first()
+        enrollment = dump_first(EnrollmentModel.query.filter_by(id=id), EnrollmentModel, project(enrollment_fields))
         if not enrollment:
             abort(404, message="Enrollment not found")
         return enrollment
        
             
+    @cache.invalidates('courses')
     @marshal_with(enrollment_fields)
     def put(self, id):
         """Update an enrollment by ID
@@ -226,7 +407,7 @@ class Enrollment(Resource):
         tags:
             - Enrollments
         summary: Update an enrollment
-        description: This endpoint updates an existing enrollment's information.
+        description: This endpoint updates an existing enrollment's information. Moving it to another course, or out of the dropped status, takes a seat there and is refused once that course is at capacity; the seat it held before is given back.
         parameters:
             - in: path
               name: id
@@ -292,6 +473,14 @@ class Enrollment(Resource):
                         message:
                             type: string
                             description: Enrollment not found!
+            409:
+                description: The new course is full
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Course is full
             400:
                 description: Bad request - validation error
                 schema:
@@ -310,15 +499,24 @@ class Enrollment(Resource):
        
             enrollment.course_id = args['course_id']
 
-            enrollment.enrollment_date = args['enrollment_date']
+            enrollment.enrollment_date = parse_date(args['enrollment_date']) if args['enrollment_date'] else None
        
             enrollment.status = args['status']
-            db.session.commit()
+
+            def seat(session):
+                # the stored course and status, locked until the UPDATE commits
+                old = session.execute(select(EnrollmentModel.course_id, EnrollmentModel.status)
+                                      .where(EnrollmentModel.id == id).with_for_update()).one()
+                move_seat(session, tuple(old), (enrollment.course_id, enrollment.status))
+            writer.save(enrollment, before=seat)
             return enrollment, 200
+        except HTTPException:
+            raise
         except Exception as e:
              db.session.rollback()
              abort(400, message=f"could not update the enrollment. {str(e)}")
              
+    @cache.invalidates('courses')
     @marshal_with(enrollment_fields)
     def delete(self, id):
         """Delete an enrollment by ID
@@ -326,7 +524,7 @@ class Enrollment(Resource):
         tags:
             - Enrollments
         summary: Delete an enrollment
-        description: This endpoint deletes an enrollment from the system.
+        description: This endpoint deletes an enrollment from the system and gives its seat in the course back.
         parameters:
             - in: path
               name: id
@@ -353,13 +551,21 @@ class Enrollment(Resource):
                             type: string
                             description: Error message
         """
-        enrollment = EnrollmentModel.query.filter_by(id=id).first
-        if not enrollment:
-            abort(400, message="enrollment not found")
+        def remove(session):
+            # whoever deletes the row gives its seat back, exactly once
+            removed = session.execute(delete(EnrollmentModel).where(EnrollmentModel.id == id)
+                                      .returning(EnrollmentModel.course_id, EnrollmentModel.status,
+                                                 EnrollmentModel.version)).first()
+            if removed is None:
+                abort(404, message="Enrollment not found")
+            record_deletes(session, EnrollmentModel, [(id, removed.version)])
+            if holds_seat(removed.status):
+                release_seat(session, removed.course_id)
         try:
-            db.session.delete(enrollment)
-            db.session.commit()
+            writer.write(remove)
             return '', 204
+        except HTTPException:
+            raise
         except Exception as e:
             db.session.rollback()
             abort(400, message=f"Error: Could not delete the enrollment. {str(e)}")
@@ -1,8 +1,17 @@
-from flask_restful import Resource, marshal_with, fields, reqparse, abort
+from flask import request
+from flask_restful import Resource, marshal_with, fields, reqparse, abort, marshal
+from sqlalchemy import case, func, select
 from app.models.fee import FeeModel
-from app.extension import db
+from app.models.student import StudentModel
+from app.extension import db, writer
+from app.idempotency import idempotency
+from app.filtering import coerce, filter_query, order_clauses
+from app.serializers import dump_first, dump_query, project
+from app.pagination import after_row, decode_cursor, encode_cursor, is_paginated, page_limit, paginate
+from app.bulk import bulk_create, read_rows, value
+from app.export import stream_ndjson, wants_ndjson
 from datetime import datetime
-from dateutil import parser as date_parser
+from app.dates import parse_datetime
 
 # Request Parser
 fee_args = reqparse.RequestParser()
@@ -24,8 +33,90 @@ fee_fields = {
     'fee_type': fields.String
 }
 
+fee_filters = ('student_id', 'status', 'semester', 'fee_type')
+fee_sort = ('id', 'amount', 'payment_date', 'semester', 'status')
+
+# Ledger totals, computed in SQL with SUM(CASE ...) over the fees table
+ledger_fields = {
+    'fee_count': fields.Integer,
+    'billed': fields.Float,
+    'paid': fields.Float,
+    'pending': fields.Float,
+    'overdue': fields.Float
+}
+
+balance_fields = {'student_id': fields.Integer(attribute='id'), **ledger_fields}
+
+summary_groups = {
+    'student': FeeModel.student_id,
+    'semester': FeeModel.semester,
+    'fee_type': FeeModel.fee_type
+}
+
+
+def ledger_columns():
+    def total(amount):
+        return func.coalesce(func.sum(amount), 0)
+
+    return [
+        func.count(FeeModel.id).label('fee_count'),
+        total(FeeModel.amount).label('billed'),
+        *(total(case((FeeModel.status == status, FeeModel.amount), else_=0)).label(status)
+          for status in ('paid', 'pending', 'overdue'))
+    ]
+
+
+def summary_statement(args):
+    """``(statement, column, limit)`` for one page of the fee summary asked for by ``args``."""
+    unknown = set(args) - {'group_by', 'limit', 'after'}
+    if unknown:
+        abort(400, message=f"Unknown query parameter(s): {', '.join(sorted(unknown))}")
+    group_by = args.get('group_by', 'student')
+    if group_by not in summary_groups:
+        abort(400, message=f"group_by must be one of: {', '.join(summary_groups)}")
+
+    column = summary_groups[group_by]
+    order = [(column, False)]
+    limit = page_limit(args)
+    statement = select(column, *ledger_columns()).group_by(column)
+    if args.get('after'):
+        values = decode_cursor(args['after'])
+        if len(values) != 1:
+            abort(400, message="Invalid cursor")
+        statement = statement.where(after_row(order, [coerce(column, 'after', values[0])]))
+    return statement.order_by(*order_clauses(order)).limit(limit + 1), column, limit
+
+
+def summary_page(rows, column, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][0]])
+
+    group_fields = {column.key: fields.Raw, **ledger_fields}
+    return {'items': marshal([row._mapping for row in rows], group_fields), 'next': next_cursor}
+
+
+def balance_statement(id):
+    return (select(StudentModel.id, *ledger_columns())
+            .outerjoin(FeeModel, FeeModel.student_id == StudentModel.id)
+            .where(StudentModel.id == id)
+            .group_by(StudentModel.id))
+
+
+def parse_fee_row(row):
+    payment_date = value(row, 'payment_date')
+    values = {
+        'student_id': value(row, 'student_id', int, required=True),
+        'amount': value(row, 'amount', float, required=True),
+        'payment_date': parse_datetime(payment_date) if payment_date else None,
+        'status': value(row, 'status', default='pending'),
+        'semester': value(row, 'semester'),
+        'fee_type': value(row, 'fee_type', required=True),
+    }
+    return {key: val for key, val in values.items() if val is not None}
+
 class Fees(Resource):
-    @marshal_with(fee_fields)
     def get(self):
         """Get all fees
         ---
@@ -33,6 +124,47 @@ class Fees(Resource):
             - Fees
         summary: Retrieve all fees
         description: This endpoint retrieves all fees from the system.
+        parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,amount,status`` (default all)
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Page size. Enables cursor pagination and wraps the response as {items, next}
+            - in: query
+              name: after
+              type: string
+              required: false
+              description: Opaque cursor taken from the next value of the previous page
+            - in: query
+              name: student_id
+              type: integer
+              required: false
+              description: Only return rows with this student_id. Repeat the parameter to match any of several values
+            - in: query
+              name: status
+              type: string
+              required: false
+              description: Only return rows with this status. Repeat the parameter to match any of several values
+            - in: query
+              name: semester
+              type: string
+              required: false
+              description: Only return rows with this semester. Repeat the parameter to match any of several values
+            - in: query
+              name: fee_type
+              type: string
+              required: false
+              description: Only return rows with this fee_type. Repeat the parameter to match any of several values
+            - in: query
+              name: sort
+              type: string
+              required: false
+              description: Comma separated sort fields, prefix with - for descending (e.g. -id)
         responses:
             200:
                 description: List of all fees retrieved successfully
@@ -73,12 +205,19 @@ class Fees(Resource):
                             type: string
                             description: Fees not found!
         """
-        fees = FeeModel.query.all()
+        query, order = filter_query(FeeModel, fee_filters, fee_sort)
+        shown = project(fee_fields)
+        if wants_ndjson():
+            return stream_ndjson(query, FeeModel, shown, order)
+        if is_paginated():
+            return paginate(query, FeeModel, order, shown)
+        fees = dump_query(query.order_by(*order_clauses(order)), FeeModel, shown)
         if not fees:
             abort(404, message="Fees not found")
         return fees
        
 
+    @idempotency.idempotent
     @marshal_with(fee_fields)
     def post(self):
         """Create a new fee
@@ -88,6 +227,11 @@ class Fees(Resource):
         summary: Create a new fee
         description: This endpoint creates a new fee in the system.
         parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
             - in: body
               name: fee
               description: Fee data
@@ -160,9 +304,9 @@ class Fees(Resource):
         args = fee_args.parse_args()
      
       
-        # Parse payment_date manually
-        payment_date = date_parser.parse(args['payment_date']).date() if args['payment_date'] else None
         try:
+            # Parse payment_date manually
+            payment_date = parse_datetime(args['payment_date']) if args['payment_date'] else None
             fee = FeeModel(
                 student_id=args.student_id,
                 amount=args.amount,
@@ -171,15 +315,217 @@ class Fees(Resource):
                 semester=args.semester,
                 fee_type=args.fee_type
             )
-            db.session.add(fee)
-            db.session.commit()
+            writer.save(fee)
             return fee, 201
         except Exception as e:
             db.session.rollback()
             abort(400, message=f"Error: Could not create fee. {str(e)}")
 
+class FeesExport(Resource):
+    def get(self):
+        """Stream all fees as NDJSON
+        ---
+        tags:
+            - Fees
+        summary: Export all fees
+        description: Streams every fee as newline-delimited JSON, one object per line, reading rows from the database in batches.
+        produces:
+            - application/x-ndjson
+        parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,amount,status`` (default all)
+            - in: query
+              name: sort
+              type: string
+              required: false
+              description: Comma separated sort fields, prefix with - for descending (e.g. -id)
+        responses:
+            200:
+                description: Newline-delimited JSON stream of fees
+        """
+        query, order = filter_query(FeeModel, fee_filters, fee_sort)
+        return stream_ndjson(query, FeeModel, project(fee_fields), order)
+
+class FeesBulk(Resource):
+    @idempotency.idempotent
+    def post(self):
+        """Create many fees in one request
+        ---
+        tags:
+            - Fees
+        summary: Bulk create fees
+        description: Accepts a JSON array (or application/x-ndjson, one object per line) of fees using the same fields as the single create endpoint. Rows are validated together and inserted in chunked transactions.
+        consumes:
+            - application/json
+            - application/x-ndjson
+        parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
+            - in: body
+              name: fees
+              description: Array of fees
+              required: true
+              schema:
+                  type: array
+                  items:
+                      type: object
+        responses:
+            201:
+                description: All rows created
+                schema:
+                    type: object
+                    properties:
+                        created:
+                            type: integer
+                            description: Number of rows created
+                        failed:
+                            type: integer
+                            description: Number of rows rejected
+                        results:
+                            type: array
+                            description: Per-row result in request order (index, status, id or message)
+                            items:
+                                type: object
+            207:
+                description: Some rows were rejected, see results
+            400:
+                description: Bad request - body is not an array of objects
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Error message
+        """
+        return bulk_create(FeeModel, read_rows(), parse_fee_row)
+
+class FeeSummary(Resource):
+    def get(self):
+        """Fee totals grouped by student, semester or fee type
+        ---
+        tags:
+            - Fees
+        summary: Summarise fees
+        description: Returns billed, paid, pending and overdue totals per group, computed in the database with GROUP BY. Results are ordered by the group key and paginated with a cursor.
+        parameters:
+            - in: query
+              name: group_by
+              type: string
+              enum: [student, semester, fee_type]
+              required: false
+              description: Grouping key (default student)
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Page size
+            - in: query
+              name: after
+              type: string
+              required: false
+              description: Opaque cursor taken from the next value of the previous page
+        responses:
+            200:
+                description: One page of fee totals
+                schema:
+                    type: object
+                    properties:
+                        items:
+                            type: array
+                            items:
+                                type: object
+                                properties:
+                                    fee_count:
+                                        type: integer
+                                        description: Number of fees in the group
+                                    billed:
+                                        type: number
+                                        description: Sum of all fee amounts
+                                    paid:
+                                        type: number
+                                        description: Sum of paid fees
+                                    pending:
+                                        type: number
+                                        description: Sum of pending fees
+                                    overdue:
+                                        type: number
+                                        description: Sum of overdue fees
+                        next:
+                            type: string
+                            description: Cursor for the next page, null on the last page
+            400:
+                description: Bad request - unknown group or parameter
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Error message
+        """
+        statement, column, limit = summary_statement(request.args)
+        rows = db.session.execute(statement).all()
+        return summary_page(rows, column, limit)
+
+
+class StudentBalance(Resource):
+    def get(self, id):
+        """Fee balance of a student
+        ---
+        tags:
+            - Fees
+        summary: Retrieve a student's fee balance
+        description: Returns the student's billed, paid, pending and overdue totals in a single aggregate query.
+        parameters:
+            - in: path
+              name: id
+              type: integer
+              required: true
+              description: The unique identifier of the student
+        responses:
+            200:
+                description: Balance retrieved successfully
+                schema:
+                    type: object
+                    properties:
+                        student_id:
+                            type: integer
+                            description: The unique identifier of the student
+                        fee_count:
+                            type: integer
+                            description: Number of fees billed to the student
+                        billed:
+                            type: number
+                            description: Sum of all fee amounts
+                        paid:
+                            type: number
+                            description: Sum of paid fees
+                        pending:
+                            type: number
+                            description: Sum of pending fees
+                        overdue:
+                            type: number
+                            description: Sum of overdue fees
+            404:
+                description: Student not found
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Student not found!
+        """
+        row = db.session.execute(balance_statement(id)).first()
+        if not row:
+            abort(404, message='Student not found')
+        return marshal(row._mapping, balance_fields)
+
 class Fee(Resource):
-    @marshal_with(fee_fields)
     def get(self, id):
         """Get a specific fee by ID
         ---
@@ -188,6 +534,11 @@ class Fee(Resource):
         summary: Retrieve a fee by ID
         description: This endpoint retrieves a specific fee by its ID.
         parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,amount,status`` (default all)
             - in: path
               name: id
               type: integer
@@ -231,7 +582,7 @@ class Fee(Resource):
                             type: string
                             description: Fee not found!
         """
-        fee = FeeModel.query.filter_by(id=id).first()
+        fee = dump_first(FeeModel.query.filter_by(id=id), FeeModel, project(fee_fields))
         if not fee:
             abort(404, message='Fee not found')
         return fee
@@ -334,11 +685,11 @@ class Fee(Resource):
         try:
             fee.student_id = args['student_id']
             fee.amount = args['amount']
-            fee.payment_date = args['payment_date']
+            fee.payment_date = parse_datetime(args['payment_date']) if args['payment_date'] else None
             fee.status = args['status']
             fee.semester = args['semester']
             fee.fee_type = args['fee_type']
-            db.session.commit()
+            writer.save(fee)
             return fee, 200
         except Exception as e:
             db.session.rollback()
@@ -382,8 +733,7 @@ class Fee(Resource):
         if not fee:
             abort(404, message='Fee not found')
         try:
-            db.session.delete(fee)
-            db.session.commit()
+            writer.remove(fee)
             return '', 204
         except Exception as e:
             db.session.rollback()
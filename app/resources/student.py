@@ -1,7 +1,18 @@
-from flask_restful import Resource, marshal_with, fields, reqparse, abort
+from flask import request
+from flask_restful import Resource, marshal_with, fields, reqparse, abort, marshal
+from sqlalchemy.orm import selectinload
 from app.models.student import StudentModel
-from app.extension import db
-from dateutil import parser as date_parser
+from app.models.course import CourseModel
+from app.models.enrollment import EnrollmentModel
+from app.extension import db, writer
+from app.idempotency import idempotency
+from app.filtering import filter_query, order_clauses
+from app.serializers import dump_first, dump_query, project
+from app.pagination import is_paginated, paginate
+from app.bulk import bulk_create, read_rows, value
+from app.search import SearchIndex
+from app.autocomplete import Autocomplete, autocomplete_args
+from app.dates import parse_date, parse_datetime
 
 # Request parser
 student_args = reqparse.RequestParser()
@@ -23,9 +34,63 @@ student_fields = {
     'enrollment_date': fields.String,
 }
 
+student_filters = ('student_id', 'email')
+student_sort = ('id', 'first_name', 'last_name', 'student_id', 'date_of_birth', 'enrollment_date')
+
+# Transcript fields
+transcript_teacher_fields = {
+    'id': fields.Integer,
+    'first_name': fields.String,
+    'last_name': fields.String,
+    'department': fields.String
+}
+
+transcript_course_fields = {
+    'id': fields.Integer,
+    'code': fields.String,
+    'name': fields.String,
+    'credits': fields.Integer,
+    'teacher': fields.Nested(transcript_teacher_fields, allow_null=True)
+}
+
+transcript_enrollment_fields = {
+    'id': fields.Integer,
+    'enrollment_date': fields.String,
+    'status': fields.String,
+    'course': fields.Nested(transcript_course_fields)
+}
+
+transcript_fields = {
+    **student_fields,
+    'enrollments': fields.List(fields.Nested(transcript_enrollment_fields))
+}
+
+student_search = SearchIndex(StudentModel, student_fields,
+                             {'last_name': 10.0, 'first_name': 10.0, 'student_id': 5.0, 'email': 2.0})
+student_autocomplete = Autocomplete(StudentModel, ('first_name', 'last_name', 'student_id', 'email'))
+
+# everything transcript_fields reads, in two queries
+transcript_loader = (selectinload(StudentModel.enrollments)
+                     .joinedload(EnrollmentModel.course)
+                     .joinedload(CourseModel.teacher))
+
+
+
+def parse_student_row(row):
+    dob = value(row, 'date_of_birth')
+    enroll_date = value(row, 'enrollment_date')
+    values = {
+        'first_name': value(row, 'first_name', required=True),
+        'last_name': value(row, 'last_name', required=True),
+        'student_id': value(row, 'student_id', required=True),
+        'email': value(row, 'email', required=True),
+        'date_of_birth': parse_date(dob) if dob else None,
+        'enrollment_date': parse_datetime(enroll_date) if enroll_date else None,
+    }
+    return {key: val for key, val in values.items() if val is not None}
+
 # Student Resource
 class Students(Resource):
-    @marshal_with(student_fields)
     def get(self):
         """Get all students
         ---
@@ -33,6 +98,37 @@ class Students(Resource):
             - Students
         summary: Retrieve all students
         description: This endpoint retrieves all students from the system.
+        parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,first_name,last_name`` (default all)
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Page size. Enables cursor pagination and wraps the response as {items, next}
+            - in: query
+              name: after
+              type: string
+              required: false
+              description: Opaque cursor taken from the next value of the previous page
+            - in: query
+              name: student_id
+              type: string
+              required: false
+              description: Only return rows with this student_id. Repeat the parameter to match any of several values
+            - in: query
+              name: email
+              type: string
+              required: false
+              description: Only return rows with this email. Repeat the parameter to match any of several values
+            - in: query
+              name: sort
+              type: string
+              required: false
+              description: Comma separated sort fields, prefix with - for descending (e.g. -id)
         responses:
             200:
                 description: List of all students retrieved successfully
@@ -73,12 +169,17 @@ class Students(Resource):
                             type: string
                             description: Students not found!
         """
-        students = StudentModel.query.all()
+        query, order = filter_query(StudentModel, student_filters, student_sort)
+        shown = project(student_fields)
+        if is_paginated():
+            return paginate(query, StudentModel, order, shown)
+        students = dump_query(query.order_by(*order_clauses(order)), StudentModel, shown)
         if not students:
             abort(404, message="Students not found")
         return students
        
 
+    @idempotency.idempotent
     @marshal_with(student_fields)
     def post(self):
         """Create a new student
@@ -88,6 +189,11 @@ class Students(Resource):
         summary: Create a new student
         description: This endpoint creates a new student in the system.
         parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
             - in: body
               name: student
               description: Student data
@@ -161,8 +267,8 @@ class Students(Resource):
         args = student_args.parse_args()
         try:
             # Parse dates manually
-            dob = date_parser.parse(args['date_of_birth']).date() if args['date_of_birth'] else None
-            enroll_date = date_parser.parse(args['enrollment_date']) if args['enrollment_date'] else None
+            dob = parse_date(args['date_of_birth']) if args['date_of_birth'] else None
+            enroll_date = parse_datetime(args['enrollment_date']) if args['enrollment_date'] else None
             
             student = StudentModel(
                 first_name=args['first_name'],
@@ -172,15 +278,254 @@ class Students(Resource):
                 date_of_birth=dob,
                 enrollment_date=enroll_date
             )
-            db.session.add(student)
-            db.session.commit()
+            writer.save(student)
+            student_autocomplete.add(student)
             return student, 201
         except Exception as e:
             db.session.rollback()
             abort(400, message=f"Error could not create a student: {str(e)}")
 
+class StudentsBulk(Resource):
+    @idempotency.idempotent
+    def post(self):
+        """Create many students in one request
+        ---
+        tags:
+            - Students
+        summary: Bulk create students
+        description: Accepts a JSON array (or application/x-ndjson, one object per line) of students using the same fields as the single create endpoint. Rows are validated together and inserted in chunked transactions.
+        consumes:
+            - application/json
+            - application/x-ndjson
+        parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
+            - in: body
+              name: students
+              description: Array of students
+              required: true
+              schema:
+                  type: array
+                  items:
+                      type: object
+        responses:
+            201:
+                description: All rows created
+                schema:
+                    type: object
+                    properties:
+                        created:
+                            type: integer
+                            description: Number of rows created
+                        failed:
+                            type: integer
+                            description: Number of rows rejected
+                        results:
+                            type: array
+                            description: Per-row result in request order (index, status, id or message)
+                            items:
+                                type: object
+            207:
+                description: Some rows were rejected, see results
+            400:
+                description: Bad request - body is not an array of objects
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Error message
+        """
+        summary, status = bulk_create(StudentModel, read_rows(), parse_student_row)
+        student_autocomplete.refresh(result['id'] for result in summary['results'] if result['status'] == 'created')
+        return summary, status
+
+class StudentSearch(Resource):
+    def get(self):
+        """Search students
+        ---
+        tags:
+            - Students
+        summary: Search students by name, email or student ID
+        description: Ranked prefix search over the full-text index. Every word of q must start a word of the student's first name, last name, email or student ID; the best matches come first. Results are paginated with a cursor.
+        parameters:
+            - in: query
+              name: q
+              type: string
+              required: true
+              description: Words to search for (at least 2 characters each), e.g. "ami ach"
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Page size (default 50)
+            - in: query
+              name: after
+              type: string
+              required: false
+              description: Opaque cursor taken from the next value of the previous page
+        responses:
+            200:
+                description: One page of matching students, best match first
+                schema:
+                    type: object
+                    properties:
+                        items:
+                            type: array
+                            items:
+                                type: object
+                                properties:
+                                    id:
+                                        type: integer
+                                        description: The unique identifier of the student
+                                    first_name:
+                                        type: string
+                                        description: The first name of the student
+                                    last_name:
+                                        type: string
+                                        description: The last name of the student
+                                    student_id:
+                                        type: string
+                                        description: The student ID
+                                    email:
+                                        type: string
+                                        description: The email address of the student
+                                    date_of_birth:
+                                        type: string
+                                        format: date-time
+                                        description: The date of birth of the student
+                                    enrollment_date:
+                                        type: string
+                                        format: date-time
+                                        description: The enrollment date of the student
+                        next:
+                            type: string
+                            description: Cursor for the next page, null on the last page
+            400:
+                description: Missing or invalid q, or an unknown parameter
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Error message
+        """
+        statement, limit = student_search.statement(request.args, db.engine.dialect.name)
+        return student_search.page(db.session.execute(statement).all(), limit)
+
+class StudentAutocomplete(Resource):
+    def get(self):
+        """Suggest students as a name, email or student ID is typed
+        ---
+        tags:
+            - Students
+        summary: Autocomplete students
+        description: Type-ahead suggestions served from an in-memory index, without a database query. Every word of prefix must start the student's first name, last name, student ID or email (case-insensitive). Suggestions come in alphabetical order of the matched value.
+        parameters:
+            - in: query
+              name: prefix
+              type: string
+              required: true
+              description: What has been typed so far, e.g. "ami" or "ami ach"
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Maximum number of suggestions (default 10, at most 50)
+        responses:
+            200:
+                description: Matching students, possibly none
+                schema:
+                    type: array
+                    items:
+                        type: object
+                        properties:
+                            id:
+                                type: integer
+                                description: The unique identifier of the student
+                            first_name:
+                                type: string
+                                description: The first name of the student
+                            last_name:
+                                type: string
+                                description: The last name of the student
+                            student_id:
+                                type: string
+                                description: The student ID
+                            email:
+                                type: string
+                                description: The email address of the student
+            400:
+                description: Missing prefix, invalid limit or an unknown parameter
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Error message
+        """
+        words, limit = autocomplete_args(request.args)
+        keys = ('id', *student_autocomplete.columns)
+        return [dict(zip(keys, row)) for row in student_autocomplete.complete(words, limit)]
+
+class StudentTranscript(Resource):
+    def get(self, id):
+        """Get a student with their courses
+        ---
+        tags:
+            - Students
+        summary: Retrieve a student transcript
+        description: Returns the student with every enrollment, its course and the course teacher. The transcript is loaded in two queries however many courses the student takes.
+        parameters:
+            - in: path
+              name: id
+              type: integer
+              required: true
+              description: The unique identifier of the student
+        responses:
+            200:
+                description: Transcript retrieved successfully
+                schema:
+                    type: object
+                    properties:
+                        id:
+                            type: integer
+                            description: The unique identifier of the student
+                        first_name:
+                            type: string
+                            description: The first name of the student
+                        last_name:
+                            type: string
+                            description: The last name of the student
+                        student_id:
+                            type: string
+                            description: The student ID
+                        email:
+                            type: string
+                            description: The email of the student
+                        enrollments:
+                            type: array
+                            description: Enrollments of the student, each with its course and teacher
+                            items:
+                                type: object
+            404:
+                description: Student not found
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Student not found!
+        """
+        student = StudentModel.query.options(transcript_loader).filter_by(id=id).first()
+        if not student:
+            abort(404, message='Student not found')
+        return marshal(student, transcript_fields)
+
 class Student(Resource):
-    @marshal_with(student_fields)
     def get(self, id):
         """Get a specific student by ID
         ---
@@ -189,6 +534,11 @@ class Student(Resource):
         summary: Retrieve a student by ID
         description: This endpoint retrieves a specific student by their ID.
         parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,first_name,last_name`` (default all)
             - in: path
               name: id
               type: integer
@@ -232,7 +582,7 @@ class Student(Resource):
                             type: string
                             description: Student not found!
         """
-        student = StudentModel.query.filter_by(id=id).first()
+        student = dump_first(StudentModel.query.filter_by(id=id), StudentModel, project(student_fields))
         if not student:
             abort(404, message='Student not found')
         return student
@@ -326,8 +676,8 @@ class Student(Resource):
         if not student:
             abort(404, message='Student not found')
         try:
-            dob = date_parser.parse(args['date_of_birth']).date() if args['date_of_birth'] else None
-            enroll_date = date_parser.parse(args['enrollment_date']) if args['enrollment_date'] else None
+            dob = parse_date(args['date_of_birth']) if args['date_of_birth'] else None
+            enroll_date = parse_datetime(args['enrollment_date']) if args['enrollment_date'] else None
 
             student.first_name = args['first_name']
             student.last_name = args['last_name']
@@ -336,7 +686,8 @@ class Student(Resource):
             student.date_of_birth = dob
             student.enrollment_date = enroll_date
             
-            db.session.commit()
+            writer.save(student)
+            student_autocomplete.add(student)
             return student, 200
         except Exception as e:
             db.session.rollback()
@@ -358,11 +709,12 @@ class Student(Resource):
             
             student.email = args['email']
             
-            student.date_of_birth = date_parser.parse(args['date_of_birth']).date()
+            student.date_of_birth = parse_date(args['date_of_birth'])
             
-            student.enrollment_date = date_parser.parse(args['enrollment_date'])
+            student.enrollment_date = parse_datetime(args['enrollment_date'])
             
-            db.session.commit()
+            writer.save(student)
+            student_autocomplete.add(student)
             return student, 200
         except Exception as e:
             db.session.rollback()
@@ -396,6 +748,6 @@ class Student(Resource):
         student = StudentModel.query.filter_by(id=id).first()
         if not student:
             abort(404, message='Student not found')
-        db.session.delete(student)
-        db.session.commit()
+        writer.remove(student)
+        student_autocomplete.remove(id)
         return '', 204
@@ -1,6 +1,12 @@
+from flask import request
 from flask_restful import Resource,marshal_with,fields,reqparse,abort
 from app.models.teacher import TeacherModel
-from app.extension import db
+from app.extension import db, cache, writer
+from app.idempotency import idempotency
+from app.filtering import filter_query, order_clauses
+from app.serializers import dump_first, dump_query, project
+from app.pagination import is_paginated, paginate
+from app.search import SearchIndex
  
 teacher_args = reqparse.RequestParser()
 teacher_args.add_argument('first_name', type=str, required=True, help="First name is required")
@@ -22,7 +28,88 @@ teacher_fields = {
     'hire_date' : fields.DateTime
 }
 
+teacher_filters = ('department', 'email')
+teacher_sort = ('id', 'first_name', 'last_name', 'department', 'hire_date')
 
+teacher_search = SearchIndex(TeacherModel, teacher_fields,
+                             {'last_name': 10.0, 'first_name': 10.0, 'department': 3.0, 'email': 2.0})
+
+
+
+class TeacherSearch(Resource):
+    def get(self):
+        """Search teachers
+        ---
+        tags:
+            - Teachers
+        summary: Search teachers by name, email or department
+        description: Ranked prefix search over the full-text index. Every word of q must start a word of the teacher's first name, last name, email or department; the best matches come first. Results are paginated with a cursor.
+        parameters:
+            - in: query
+              name: q
+              type: string
+              required: true
+              description: Words to search for (at least 2 characters each), e.g. "ami ach"
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Page size (default 50)
+            - in: query
+              name: after
+              type: string
+              required: false
+              description: Opaque cursor taken from the next value of the previous page
+        responses:
+            200:
+                description: One page of matching teachers, best match first
+                schema:
+                    type: object
+                    properties:
+                        items:
+                            type: array
+                            items:
+                                type: object
+                                properties:
+                                    id:
+                                        type: integer
+                                        description: The unique identifier of the teacher
+                                    first_name:
+                                        type: string
+                                        description: The first name of the teacher
+                                    last_name:
+                                        type: string
+                                        description: The last name of the teacher
+                                    email:
+                                        type: string
+                                        description: The email address of the teacher
+                                    phone:
+                                        type: string
+                                        description: The phone number of the teacher
+                                    department:
+                                        type: string
+                                        description: The department of the teacher
+                                    credits:
+                                        type: integer
+                                        description: The credits of the teacher
+                                    hire_date:
+                                        type: string
+                                        format: date-time
+                                        description: The hire date of the teacher
+                        next:
+                            type: string
+                            description: Cursor for the next page, null on the last page
+            400:
+                description: Missing or invalid q, or an unknown parameter
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Error message
+        """
+        statement, limit = teacher_search.statement(request.args, db.engine.dialect.name)
+        return teacher_search.page(db.session.execute(statement).all(), limit)
 
 class Teachers(Resource):
     @marshal_with(teacher_fields)
@@ -41,12 +128,11 @@ class Teachers(Resource):
             credits=args['credits']
         )
 
-        db.session.add(new_teacher)
-        db.session.commit()
+        writer.save(new_teacher)
         return new_teacher, 201
 
 class Teachers(Resource):
-    @marshal_with(teacher_fields)
+    @cache.cached('teachers')
     def get(self):
         """Get all teachers
         ---
@@ -54,6 +140,37 @@ class Teachers(Resource):
             - Teachers
         summary: Retrieve all teachers
         description: This endpoint retrieves all teachers from the system.
+        parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,first_name,last_name`` (default all)
+            - in: query
+              name: limit
+              type: integer
+              required: false
+              description: Page size. Enables cursor pagination and wraps the response as {items, next}
+            - in: query
+              name: after
+              type: string
+              required: false
+              description: Opaque cursor taken from the next value of the previous page
+            - in: query
+              name: department
+              type: string
+              required: false
+              description: Only return rows with this department. Repeat the parameter to match any of several values
+            - in: query
+              name: email
+              type: string
+              required: false
+              description: Only return rows with this email. Repeat the parameter to match any of several values
+            - in: query
+              name: sort
+              type: string
+              required: false
+              description: Comma separated sort fields, prefix with - for descending (e.g. -id)
         responses:
             200:
                 description: List of all teachers retrieved successfully
@@ -99,13 +216,19 @@ class Teachers(Resource):
                             type: string
                             description: Teachers not found!
         """
-        teachers = TeacherModel.query.all()
+        query, order = filter_query(TeacherModel, teacher_filters, teacher_sort)
+        shown = project(teacher_fields)
+        if is_paginated():
+            return paginate(query, TeacherModel, order, shown)
+        teachers = dump_query(query.order_by(*order_clauses(order)), TeacherModel, shown)
         if not teachers:
             abort(404, message="Teachers not found")
         return teachers
 
 
 
+    @idempotency.idempotent
+    @cache.invalidates('teachers')
     @marshal_with(teacher_fields)
     def post(self):
         """Create a new teacher
@@ -115,6 +238,11 @@ class Teachers(Resource):
         summary: Create a new teacher
         description: This endpoint creates a new teacher in the system.
         parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
             - in: body
               name: teacher
               description: Teacher data
@@ -202,8 +330,7 @@ class Teachers(Resource):
                 department=args['department'],
                 credits=args['credits']
                 )
-            db.session.add(new_teacher)
-            db.session.commit()
+            writer.save(new_teacher)
             return new_teacher, 201
             
         except Exception as e:
@@ -214,7 +341,7 @@ class Teachers(Resource):
 # Get a teacher by id    
 
 class Teacher(Resource):
-    @marshal_with(teacher_fields)
+    @cache.cached('teachers')
     def get(self, id):
         """Get a specific teacher by ID
         ---
@@ -223,6 +350,11 @@ class Teacher(Resource):
         summary: Retrieve a teacher by ID
         description: This endpoint retrieves a specific teacher by their ID.
         parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,first_name,last_name`` (default all)
             - in: path
               name: id
               type: integer
@@ -271,12 +403,13 @@ class Teacher(Resource):
                             type: string
                             description: Teacher not found!
         """
-        teacher = TeacherModel.query.filter_by(id=id).first()
+        teacher = dump_first(TeacherModel.query.filter_by(id=id), TeacherModel, project(teacher_fields))
         if not teacher:
             abort(404, message="Teacher not found")
         return teacher 
         
 # edit a teacher
+    @cache.invalidates('teachers')
     @marshal_with(teacher_fields)
     def patch(self, id):
         """Update a teacher by ID
@@ -383,11 +516,12 @@ class Teacher(Resource):
         teacher.department = args['department']
         teacher.credits = args['credits']
 
-        db.session.commit()
+        writer.save(teacher)
         return teacher, 200
 
 
 # delete teacher
+    @cache.invalidates('teachers', 'courses')
     def delete(self, id):
         """Delete a teacher by ID
         ---
@@ -425,6 +559,5 @@ class Teacher(Resource):
         if not teacher:
             abort(404, message="Teacher not found")
 
-        db.session.delete(teacher)
-        db.session.commit()
+        writer.remove(teacher)
         return {'message': 'Teacher deleted'}, 204
\ No newline at end of file
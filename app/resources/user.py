@@ -1,5 +1,13 @@
+from flask import url_for
 from flask_restful import Resource,marshal_with,fields,reqparse,abort
-from app.extension import db
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.extension import db, credentials, writer
+from app.idempotency import idempotency
+from app.bulk import BULK_CHUNK_SIZE, bulk_create_ignoring_conflicts, read_rows, value
+from app.filtering import filter_query, order_clauses
+from app.serializers import dump_first, dump_query, project
+from app.pagination import is_paginated, paginate
 from app.models.users import UserModel
  # request Parser   
 user_args = reqparse.RequestParser()
@@ -10,13 +18,54 @@ user_args.add_argument('password',type=str, required=True,help='username cannot
 user_fields = {
     'id': fields.Integer,
     'username': fields.String,
-    'email': fields.String,
-    'password':fields.String
+    'email': fields.String
 }
+
+user_filters = ('username', 'email')
+user_sort = ('id', 'username', 'created_at')
+
+def parse_user_row(row):
+    return {
+        'username': value(row, 'username', required=True),
+        'email': value(row, 'email', required=True),
+        'password': value(row, 'password', required=True),
+    }
+
+
+def prepare_user_rows(rows):
+    """Skip users whose username or email is taken, then hash the rest's passwords.
+
+    Done before the insert so rows that would be skipped don't spend a
+    password hash; a conflict that appears in between is still skipped by
+    ON CONFLICT DO NOTHING.
+    """
+    usernames, emails = set(), set()
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = [values for _, values in rows[start:start + BULK_CHUNK_SIZE]]
+        for username, email in db.session.execute(
+                select(UserModel.username, UserModel.email)
+                .where(UserModel.username.in_([values['username'] for values in chunk])
+                       | UserModel.email.in_([values['email'] for values in chunk]))):
+            usernames.add(username)
+            emails.add(email)
+    # end the read so SQLite doesn't hold its snapshot while hashing
+    db.session.rollback()
+
+    skipped, fresh, seen = {}, [], set()
+    for index, values in rows:
+        if values['username'] in usernames or values['email'] in emails:
+            skipped[index] = "Already exists"
+        elif values['email'] in seen:
+            skipped[index] = "Duplicate email in request"
+        else:
+            seen.add(values['email'])
+            fresh.append(values)
+    for values, hashed in zip(fresh, credentials.hash_many([values['password'] for values in fresh])):
+        values['password'] = hashed
+    return skipped
 #resource for all users
 
 class Users(Resource):
-    @marshal_with(user_fields)
     #get all users
     def get(self):
         """Get all users
@@ -25,6 +74,37 @@ class Users(Resource):
           - Users
         summary: Retrieve all users
         description: This endpoint retrieves all users from the database.
+        parameters:
+          - in: query
+            name: fields
+            type: string
+            required: false
+            description: Comma-separated names of the fields to return, e.g. ``id,username`` (default all)
+          - in: query
+            name: limit
+            type: integer
+            required: false
+            description: Page size. Enables cursor pagination and wraps the response as {items, next}
+          - in: query
+            name: after
+            type: string
+            required: false
+            description: Opaque cursor taken from the next value of the previous page
+          - in: query
+            name: username
+            type: string
+            required: false
+            description: Only return rows with this username. Repeat the parameter to match any of several values
+          - in: query
+            name: email
+            type: string
+            required: false
+            description: Only return rows with this email. Repeat the parameter to match any of several values
+          - in: query
+            name: sort
+            type: string
+            required: false
+            description: Comma separated sort fields, prefix with - for descending (e.g. -id)
         responses:
           200:
             description: A list of users
@@ -59,11 +139,16 @@ class Users(Resource):
         
         
         
-        users = UserModel.query.all()
+        query, order = filter_query(UserModel, user_filters, user_sort)
+        shown = project(user_fields)
+        if is_paginated():
+            return paginate(query, UserModel, order, shown)
+        users = dump_query(query.order_by(*order_clauses(order)), UserModel, shown)
         if not users:
             abort(404,message='Users not found')
         return users
     #create a user
+    @idempotency.idempotent
     @marshal_with(user_fields)
     def post(self):
         """Create a new user
@@ -73,6 +158,11 @@ class Users(Resource):
         summary: Create a new user
         description: This endpoint creates a new user in the system.
         parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
             - in: body
               name: user
               description: User data
@@ -108,11 +198,12 @@ class Users(Resource):
                         email:
                             type: string
                             description: The email address of the user
-                        password:
-                            type: string
-                            description: The password of the user
+                headers:
+                    Location:
+                        type: string
+                        description: URL of the created user
             400:
-                description: Bad request - validation error
+                description: Bad request - validation error, or the username or email is taken
                 schema:
                     type: object
                     properties:
@@ -121,22 +212,80 @@ class Users(Resource):
                             description: Error message
         """
         args = user_args.parse_args()
+        # the unique constraints reject duplicates; no need to look them up first
+        new_user = UserModel(username=args['username'], email=args['email'],password=credentials.hash(args['password']))
         try:
-            existing_user = UserModel.query.filter_by(username=args['username']).first()
-            if existing_user:
-                abort(400, message="User with this username already exists")
-            new_user = UserModel(username=args['username'], email=args['email'],password=args['password'])
-            db.session.add(new_user)
-            db.session.commit()
+            writer.save(new_user)
+        except IntegrityError:
+            db.session.rollback()
+            abort(400, message="User with this username or email already exists")
         except Exception as e:
             db.session.rollback()
             abort(400, message=f"There was an error creating the user: {e}")
 
-        users = UserModel.query.all()
-        return users, 201
+        return new_user, 201, {'Location': url_for('user', id=new_user.id)}
+
+class UsersBulk(Resource):
+    @idempotency.idempotent
+    def post(self):
+        """Provision many users in one request
+        ---
+        tags:
+            - Users
+        summary: Bulk create users
+        description: Accepts a JSON array (or application/x-ndjson, one object per line) of users using the same fields as the single create endpoint. Users whose username or email already exists are reported as skipped without hashing their password (and any that appear concurrently are skipped by INSERT ... ON CONFLICT DO NOTHING), so an import can be re-run safely. Invalid rows are rejected before any hashing.
+        consumes:
+            - application/json
+            - application/x-ndjson
+        parameters:
+            - in: header
+              name: Idempotency-Key
+              type: string
+              required: false
+              description: Any unique value (e.g. a UUID). Retrying with the same key and body returns the original response instead of creating again.
+            - in: body
+              name: users
+              description: Array of users
+              required: true
+              schema:
+                  type: array
+                  items:
+                      type: object
+        responses:
+            201:
+                description: All rows created
+                schema:
+                    type: object
+                    properties:
+                        created:
+                            type: integer
+                            description: Number of rows created
+                        skipped:
+                            type: integer
+                            description: Number of rows that already existed
+                        failed:
+                            type: integer
+                            description: Number of rows rejected
+                        results:
+                            type: array
+                            description: Per-row result in request order (index, status, id or message)
+                            items:
+                                type: object
+            207:
+                description: Some rows were skipped or rejected, see results
+            400:
+                description: Bad request - body is not an array of objects
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Error message
+        """
+        return bulk_create_ignoring_conflicts(UserModel, read_rows(), parse_user_row, UserModel.username,
+                                              prepare=prepare_user_rows)
     
 class User(Resource):
-    @marshal_with(user_fields)
     def get(self,id):
         """Get a specific user by ID
         ---
@@ -145,6 +294,11 @@ class User(Resource):
         summary: Retrieve a user by ID
         description: This endpoint retrieves a specific user by their ID.
         parameters:
+            - in: query
+              name: fields
+              type: string
+              required: false
+              description: Comma-separated names of the fields to return, e.g. ``id,username`` (default all)
             - in: path
               name: id
               type: integer
@@ -165,9 +319,6 @@ class User(Resource):
                         email:
                             type: string
                             description: The email address of the user
-                        password:
-                            type: string
-                            description: The password of the user
             404:
                 description: User not found
                 schema:
@@ -177,7 +328,7 @@ class User(Resource):
                             type: string
                             description: User not found!
         """
-        user = UserModel.query.filter_by(id=id).first()
+        user = dump_first(UserModel.query.filter_by(id=id), UserModel, project(user_fields))
         if not user:
             abort (404,message='User not found')
         return user
@@ -231,9 +382,6 @@ class User(Resource):
                         email:
                             type: string
                             description: The email address of the user
-                        password:
-                            type: string
-                            description: The password of the user
             404:
                 description: User not found
                 schema:
@@ -249,8 +397,8 @@ class User(Resource):
             abort(404,message='no user with that id')
         user.username = args['username']
         user.email = args['email']
-        user.password = args['password']
-        db.session.commit()
+        user.password = credentials.hash(args['password'])
+        writer.save(user)
         return user  
 
     @marshal_with(user_fields) 
@@ -284,9 +432,6 @@ class User(Resource):
                             email:
                                 type: string
                                 description: The email address of the user
-                            password:
-                                type: string
-                                description: The password of the user
             404:
                 description: User not found
                 schema:
@@ -299,12 +444,74 @@ class User(Resource):
         user = UserModel.query.filter_by(id=id).first()
         if not user:
             abort(404,message="cannot delete a non existing user")
-        db.session.delete(user)
-        db.session.commit()
+        writer.remove(user)
         return f'user deleted successfully'
-   
-
-
-
 
+login_args = reqparse.RequestParser()
+login_args.add_argument('username',type=str, required=True,help='username cannot be blank')
+login_args.add_argument('password',type=str, required=True,help='password cannot be blank')
 
+class Login(Resource):
+    @marshal_with(user_fields)
+    def post(self):
+        """Verify a username and password
+        ---
+        tags:
+            - Users
+        summary: Log in
+        description: Checks the password against the stored hash on the credential worker pool. Hashes made with older cost parameters (or stored in plain text) are replaced with a fresh hash on a successful login.
+        parameters:
+            - in: body
+              name: credentials
+              description: Username and password
+              required: true
+              schema:
+                  type: object
+                  required:
+                      - username
+                      - password
+                  properties:
+                      username:
+                          type: string
+                          description: The username of the user
+                      password:
+                          type: string
+                          description: The password of the user
+        responses:
+            200:
+                description: Credentials are valid
+                schema:
+                    type: object
+                    properties:
+                        id:
+                            type: integer
+                            description: The unique identifier of the user
+                        username:
+                            type: string
+                            description: The username of the user
+                        email:
+                            type: string
+                            description: The email address of the user
+            401:
+                description: Invalid username or password
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            description: Invalid username or password
+            503:
+                description: The credential pool is saturated, retry after the Retry-After header
+        """
+        args = login_args.parse_args()
+        user = UserModel.query.filter_by(username=args['username']).first()
+        if user is None or not user.password:
+            ok, rehashed = credentials.verify_missing(args['password'])
+        else:
+            ok, rehashed = credentials.verify(user.password, args['password'])
+        if not ok:
+            abort(401, message='Invalid username or password')
+        if rehashed:
+            user.password = rehashed
+            writer.save(user)
+        return user
@@ -0,0 +1,130 @@
+import re
+
+import sqlalchemy as sa
+from flask_restful import abort
+from sqlalchemy import DDL, event, func, select
+
+from app.filtering import order_clauses
+from app.pagination import page_of, page_window
+from app.serializers import Serializer
+
+# Ranked prefix search over a table's text columns.
+#
+#     student_search = SearchIndex(StudentModel, student_fields,
+#                                  {'last_name': 10, 'first_name': 10, 'student_id': 5, 'email': 5})
+#     statement, limit = student_search.statement(request.args, db.engine.dialect.name)
+#
+# ``?q=ami ach`` matches rows where some word of the indexed columns starts
+# with ``ami`` and another with ``ach`` (names, the parts of an email or of a
+# student_id like ``STU-000123``), best match first.
+#
+# SQLite keeps an FTS5 external-content table ``<table>_fts`` with 2 and 3
+# character prefix indexes, filled by AFTER INSERT/UPDATE/DELETE triggers,
+# and ranks with bm25() using the column weights. PostgreSQL uses a GIN
+# index on the table's to_tsvector('simple', ...) document and ranks with
+# ts_rank() (column weights are SQLite only). Either way the database keeps
+# the index current, so rows written through the bulk endpoints or the write
+# queue are searchable too. The DDL runs with ``db.create_all()`` and in the
+# matching migration. Words shorter than MIN_TERM characters are ignored.
+#
+# Every match is ranked, but only the MAX_CANDIDATES best (by rank, then id)
+# are joined back to the table and paged through, so a one-word query that
+# matches half the school shows its best matches and stops there; typing
+# another word narrows it down. The cut is on the same (rank, id) order the
+# results are keyset-paginated on, so it is the same set on every request
+# and ``after`` pages neither skip nor repeat rows.
+
+MIN_TERM = 2
+MAX_TERMS = 8
+MAX_CANDIDATES = 1000
+SEARCH_ARGS = {'q', 'limit', 'after'}
+
+
+def search_terms(args):
+    unknown = set(args) - SEARCH_ARGS
+    if unknown:
+        abort(400, message=f"Unknown query parameter(s): {', '.join(sorted(unknown))}")
+    terms = [term.lower() for term in re.findall(r'\w+', args.get('q', '')) if len(term) >= MIN_TERM]
+    terms = terms[:MAX_TERMS]
+    if not terms:
+        abort(400, message=f"q must contain a word of at least {MIN_TERM} characters")
+    return terms
+
+
+def include_name(name, type_, parent_names):
+    """Alembic ``include_name`` hook: the full-text tables are not in the models."""
+    return not (type_ == 'table' and re.fullmatch(r'\w+_fts(_\w+)?', name or ''))
+
+
+class SearchIndex:
+    def __init__(self, model, fields, weights):
+        self.model = model
+        self.table = model.__table__
+        self.fields = fields
+        self.columns = list(weights)
+        self.weights = [weights[name] for name in self.columns]
+        self.fts = f'{self.table.name}_fts'
+        for statement in self.sqlite_ddl():
+            event.listen(self.table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+        for statement in self.postgres_ddl():
+            event.listen(self.table, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+    def document(self):
+        """The text PostgreSQL indexes; must match the index expression exactly."""
+        parts = [f"coalesce({name}, '')" if self.table.c[name].nullable else name for name in self.columns]
+        text = " || ' ' || ".join(parts)
+        return f"to_tsvector('simple', {text})"
+
+    def sqlite_ddl(self):
+        table, fts = self.table.name, self.fts
+        columns = ', '.join(self.columns)
+        new = ', '.join(f'new.{name}' for name in self.columns)
+        old = ', '.join(f'old.{name}' for name in self.columns)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+        ]
+
+    def postgres_ddl(self):
+        return [f"CREATE INDEX IF NOT EXISTS ix_{self.table.name}_search ON {self.table.name} "
+                f"USING gin ({self.document()})"]
+
+    def statement(self, args, dialect):
+        """``(statement, limit)`` for one page of results for ``args`` on ``dialect``."""
+        terms = search_terms(args)
+        if dialect == 'sqlite':
+            # quoted, so words like AND/NOT/NEAR are searched for, not parsed
+            match = ' '.join(f'"{term}"*' for term in terms)
+            fts = sa.table(self.fts, sa.column('rowid', sa.Integer))
+            rank = func.bm25(sa.literal_column(self.fts), *self.weights, type_=sa.Float)
+            candidates = (select(fts.c.rowid.label('id'), rank.label('rank'))
+                          .where(sa.literal_column(self.fts).op('MATCH')(match))
+                          .order_by(rank, fts.c.rowid))
+        else:
+            # the index expression is written out literally so the planner can match it
+            document = sa.literal_column(self.document())
+            query = func.to_tsquery(sa.literal_column("'simple'"), ' & '.join(f'{term}:*' for term in terms))
+            rank = -func.ts_rank(document, query, type_=sa.Float)
+            candidates = (select(self.model.id, rank.label('rank')).where(document.op('@@')(query))
+                          .order_by(rank, self.model.id))
+        candidates = candidates.limit(MAX_CANDIDATES).subquery()
+
+        serializer = Serializer(self.model, self.fields)
+        order = [(candidates.c.rank, False), (candidates.c.id, False)]
+        limit, after = page_window(order, args)
+        statement = (select(*serializer.columns, candidates.c.rank, candidates.c.id)
+                     .join_from(candidates, self.model, self.model.id == candidates.c.id))
+        if after is not None:
+            statement = statement.where(after)
+        return statement.order_by(*order_clauses(order)).limit(limit + 1), limit
+
+    def page(self, rows, limit):
+        """The ``{'items', 'next'}`` body for rows fetched with ``statement``."""
+        return page_of(Serializer(self.model, self.fields), rows, limit, 2)
@@ -0,0 +1,132 @@
+from collections import Counter
+
+from flask_restful import abort
+from sqlalchemy import func, or_, select, update
+
+from app.models.course import CourseModel
+from app.models.enrollment import EnrollmentModel
+
+# Course seat accounting.
+#
+#     take_seat(session, course_id)        in the transaction adding an enrollment
+#     release_seat(session, course_id)     in the one removing it
+#     reserve_seats(session, rows)         before a bulk INSERT of enrollments
+#     recount_seats(session, course_ids)   after writes that skip the ones above
+#
+# courses.enrolled_count is the number of the course's enrollments that hold
+# a seat (any status but 'dropped'), and courses.capacity caps it (NULL for
+# no limit). take_seat and release_seat are one conditional UPDATE of the
+# course row each, with no count read first: the database serialises the
+# UPDATEs on a row, so when two registrations race for the last seat the
+# second one re-checks ``enrolled_count < capacity`` against the first's
+# count, matches nothing and gets a 409. Run them in the same write job as
+# the enrollment INSERT/UPDATE/DELETE so a failing write gives the seat back.
+#
+# The bulk endpoint takes the seats of a whole chunk with one such UPDATE
+# per course (enrolled_count + n <= capacity). A course without room for
+# all n gets its row locked and filled with what is left, in request order;
+# the remaining rows are rejected as full, the same as a single POST's 409.
+
+SEATLESS_STATUSES = ('dropped',)
+
+
+def holds_seat(status):
+    return status not in SEATLESS_STATUSES
+
+
+def take_seat(session, course_id):
+    taken = session.execute(
+        update(CourseModel)
+        .where(CourseModel.id == course_id,
+               or_(CourseModel.capacity.is_(None), CourseModel.enrolled_count < CourseModel.capacity))
+        .values(enrolled_count=CourseModel.enrolled_count + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not taken:
+        if session.scalar(select(CourseModel.id).where(CourseModel.id == course_id)) is None:
+            abort(404, message="Course not found")
+        abort(409, message="Course is full")
+
+
+def release_seat(session, course_id):
+    session.execute(
+        update(CourseModel)
+        .where(CourseModel.id == course_id, CourseModel.enrolled_count > 0)
+        .values(enrolled_count=CourseModel.enrolled_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def move_seat(session, old, new):
+    """Go from ``old`` to ``new`` ``(course_id, status)``, taking before releasing."""
+    old_seat = old[0] if holds_seat(old[1]) else None
+    new_seat = new[0] if holds_seat(new[1]) else None
+    if new_seat == old_seat:
+        return
+    if new_seat is not None:
+        take_seat(session, new_seat)
+    if old_seat is not None:
+        release_seat(session, old_seat)
+
+
+def reserve_seats(session, rows):
+    """Take seats for ``rows`` of ``(index, values)``; return ``{index: message}`` for rows that get none."""
+    wanted = Counter(values['course_id'] for _, values in rows if holds_seat(values.get('status')))
+    free = {}
+    for course_id, count in wanted.items():
+        taken = session.execute(
+            update(CourseModel)
+            .where(CourseModel.id == course_id,
+                   or_(CourseModel.capacity.is_(None), CourseModel.enrolled_count + count <= CourseModel.capacity))
+            .values(enrolled_count=CourseModel.enrolled_count + count)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if taken:
+            free[course_id] = count
+            continue
+        course = session.execute(
+            select(CourseModel.capacity, CourseModel.enrolled_count)
+            .where(CourseModel.id == course_id)
+            .with_for_update()
+        ).first()
+        if course is None:
+            continue
+        left = count if course.capacity is None else course.capacity - course.enrolled_count
+        free[course_id] = min(max(left, 0), count)
+        if free[course_id]:
+            session.execute(
+                update(CourseModel)
+                .where(CourseModel.id == course_id)
+                .values(enrolled_count=CourseModel.enrolled_count + free[course_id])
+                .execution_options(synchronize_session=False)
+            )
+
+    rejected = {}
+    for index, values in rows:
+        course_id = values['course_id']
+        if not holds_seat(values.get('status')):
+            continue
+        if course_id not in free:
+            rejected[index] = "Course not found"
+        elif free[course_id]:
+            free[course_id] -= 1
+        else:
+            rejected[index] = "Course is full"
+    return rejected
+
+
+def seat_count(course_id):
+    return (select(func.count()).select_from(EnrollmentModel)
+            .where(EnrollmentModel.course_id == course_id,
+                   EnrollmentModel.status.is_(None) | EnrollmentModel.status.notin_(SEATLESS_STATUSES))
+            .scalar_subquery())
+
+
+def recount_seats(session, course_ids=None):
+    """Set enrolled_count from the enrollments table, for ``course_ids`` or every course."""
+    statement = update(CourseModel).values(enrolled_count=seat_count(CourseModel.id))
+    if course_ids is not None:
+        if not course_ids:
+            return
+        statement = statement.where(CourseModel.id.in_(course_ids))
+    session.execute(statement.execution_options(synchronize_session=False))
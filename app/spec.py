@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import os
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+from werkzeug.wrappers import Response
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# Prebuilt OpenAPI spec.
+#
+#     flask spec build                  render the spec to SWAGGER_SPEC_FILE
+#     flask spec build -o apispec.json  ... or anywhere else
+#
+# Flasgger builds /apispec_1.json by walking every view and parsing the YAML
+# docstrings of each resource. ``flask spec build`` does that once and writes
+# the JSON next to a gzip (and, with the ``brotli`` module installed, brotli)
+# copy. When SWAGGER_SPEC_FILE (default: instance/apispec.json) exists at
+# startup, /apispec_1.json serves those bytes from memory instead: the
+# encoding is picked from Accept-Encoding, each variant has its own strong
+# ETag so gateways polling with If-None-Match get a 304, and responses are
+# cacheable for SWAGGER_SPEC_MAX_AGE seconds. The route keeps its URL, so the
+# max-age is a day rather than ``immutable``; rebuild the file and restart
+# the workers after changing a resource docstring.
+#
+# Without the file (or with SWAGGER_SPEC_PREBUILT = False) Flasgger serves
+# the spec itself as before.
+
+SPEC_ENDPOINT = 'apispec_1'
+SPEC_ROUTE = '/apispec_1.json'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+spec_cli = AppGroup('spec', help='Build the OpenAPI spec.')
+
+
+def spec_path(app):
+    return app.config.get('SWAGGER_SPEC_FILE') or os.path.join(app.instance_path, 'apispec.json')
+
+
+def render_spec(app):
+    """The spec Flasgger would serve at /apispec_1.json, as JSON bytes."""
+    swag = getattr(app, 'swag', None)
+    if swag is None:
+        raise click.ClickException('Flasgger is not set up (SWAGGER_ENABLED = False)')
+    with app.test_request_context(SPEC_ROUTE):
+        spec = swag.get_apispecs(SPEC_ENDPOINT)
+    return json.dumps(spec, sort_keys=True, separators=(',', ':'), default=str).encode()
+
+
+def compress(body):
+    variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+def write_spec(body, path):
+    """Write ``body`` and its compressed copies; returns ``[(path, size)]``."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    files = [(path, body)]
+    variants = compress(body)
+    for encoding, suffix in ENCODINGS:
+        if encoding in variants:
+            files.append((path + suffix, variants[encoding]))
+        elif os.path.exists(path + suffix):
+            # left over from a build with brotli installed; it no longer
+            # matches the JSON
+            os.remove(path + suffix)
+    for target, data in files:
+        with open(target + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(target + '.tmp', target)
+    return [(target, len(data)) for target, data in files]
+
+
+@spec_cli.command('build')
+@click.option('--output', '-o', type=click.Path(dir_okay=False),
+              help='Where to write the spec (default: SWAGGER_SPEC_FILE).')
+def build_command(output):
+    """Render the OpenAPI spec to a file served as /apispec_1.json."""
+    app = current_app._get_current_object()
+    for path, size in write_spec(render_spec(app), output or spec_path(app)):
+        click.echo(f'{path} ({size} bytes)')
+
+
+class _AppSpec:
+    """The prebuilt spec variants one app serves."""
+
+    def __init__(self, variants, max_age):
+        self.variants = variants
+        self.max_age = max_age
+
+    def negotiate(self):
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and request.accept_encodings[encoding] > 0:
+                return encoding
+        return 'identity'
+
+    def serve(self):
+        encoding = self.negotiate()
+        body, etag = self.variants[encoding]
+        response = Response(body, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+
+class PrebuiltSpec:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.cli.add_command(spec_cli)
+        if not app.config.get('SWAGGER_SPEC_PREBUILT', True):
+            return
+        variants = self.load(spec_path(app))
+        if not variants:
+            return
+        spec = app.extensions['prebuilt_spec'] = _AppSpec(variants, app.config.get('SWAGGER_SPEC_MAX_AGE', 86400))
+
+        # take over Flasgger's view so /apidocs/ keeps pointing at the same URL
+        endpoint = f'flasgger.{SPEC_ENDPOINT}'
+        if endpoint in app.view_functions:
+            app.view_functions[endpoint] = spec.serve
+        else:
+            app.add_url_rule(SPEC_ROUTE, SPEC_ENDPOINT, spec.serve)
+
+    @staticmethod
+    def load(path):
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'rb') as f:
+            body = f.read()
+        variants = {'identity': (body, hashlib.sha256(body).hexdigest())}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                with open(path + suffix, 'rb') as f:
+                    data = f.read()
+                # the representations differ byte for byte, so do their ETags
+                variants[encoding] = (data, f'{variants["identity"][1]}-{encoding}')
+        return variants
@@ -0,0 +1,239 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from flask import current_app, g
+from sqlalchemy.orm import Session
+
+# Single-writer queue for SQLite deployments.
+#
+#     writer.save(student)              INSERT or UPDATE one object
+#     writer.remove(student)            DELETE it
+#     writer.write(lambda session: ...) anything else, run against ``session``
+#     writer.save(obj, before=job)      job(session), then save obj in the same transaction
+#     with writer.also(job): ...        job(session) after every write in the block, same transaction
+#
+# With DATABASE_WRITE_QUEUE enabled every write is handed to one writer
+# thread, which runs whatever jobs are waiting (up to DATABASE_WRITE_BATCH,
+# optionally lingering DATABASE_WRITE_BATCH_WAIT seconds for more) each in
+# its own SAVEPOINT and commits them together. SQLite allows one writer at a
+# time, so this turns N competing ``database is locked`` retries into one
+# fsync per batch, while readers keep using their own connections (WAL).
+# A job that raises is rolled back to its savepoint and the exception is
+# re-raised in the request that submitted it; the rest of the batch commits.
+#
+# Objects are moved out of the request session into the writer session and
+# come back detached with their attributes loaded (expire_on_commit=False),
+# so handlers can still marshal them.
+#
+# With the queue disabled (the default) the same helpers run the job on
+# db.session and commit inline.
+#
+# Each app gets its own queue, writer thread and counters in
+# app.extensions['write_queue']; the writer thread runs inside that app's
+# context and writes through its engine, so two apps built by create_app
+# (tests, the ASGI wrapper) never commit into each other's database.
+
+
+class _AppQueue:
+    """The writer thread, job queue and counters of one app."""
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = app.config.get('DATABASE_WRITE_QUEUE', False)
+        self.max_batch = app.config.get('DATABASE_WRITE_BATCH', 64)
+        self.batch_wait = app.config.get('DATABASE_WRITE_BATCH_WAIT', 0.0)
+        self.batches = 0
+        self.jobs = 0
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        self._start()
+        future = Future()
+        self.queue.put((job, future))
+        return future.result()
+
+    def _start(self):
+        # started on first use so forking servers get a writer per process
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                batch.append(self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            engine = self.app.extensions['sqlalchemy'].engine
+            while True:
+                batch = self._next_batch()
+                try:
+                    outcomes = self._commit_batch(engine, batch)
+                except Exception as e:
+                    outcomes = [(future, False, e) for _, future in batch]
+                with self._lock:
+                    self.batches += 1
+                    self.jobs += len(batch)
+                for future, ok, result in outcomes:
+                    if ok:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(result)
+
+    @staticmethod
+    def _commit_batch(engine, batch):
+        with Session(engine, expire_on_commit=False) as session:
+            if session.get_bind().dialect.name == 'sqlite':
+                # pysqlite would only BEGIN at the first INSERT, and a SAVEPOINT
+                # outside a transaction commits on its own; take the write lock
+                # once for the whole batch instead
+                session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+            outcomes = []
+            for job, future in batch:
+                try:
+                    # releasing the savepoint flushes, so a failing INSERT
+                    # only undoes its own job
+                    with session.begin_nested():
+                        result = job(session)
+                except Exception as e:
+                    outcomes.append((future, False, e))
+                else:
+                    outcomes.append((future, True, result))
+            try:
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                outcomes = [(future, False, e) for future, _, _ in outcomes]
+            session.expunge_all()
+        return outcomes
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'queued': self.queue.qsize(),
+            'batches': self.batches,
+            'jobs': self.jobs,
+            'jobs_per_batch': self.jobs / self.batches if self.batches else 0.0,
+        }
+
+    def metrics(self):
+        return [
+            '# HELP db_write_queue_depth Write jobs waiting for the writer thread',
+            '# TYPE db_write_queue_depth gauge',
+            f'db_write_queue_depth {self.queue.qsize()}',
+            '# HELP db_write_batches_total Transactions committed by the writer thread',
+            '# TYPE db_write_batches_total counter',
+            f'db_write_batches_total {self.batches}',
+            '# HELP db_write_jobs_total Write jobs run by the writer thread',
+            '# TYPE db_write_jobs_total counter',
+            f'db_write_jobs_total {self.jobs}',
+        ]
+
+
+class WriteQueue:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['write_queue'] = _AppQueue(app)
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['write_queue']
+
+    def write(self, job):
+        """Run ``job(session)`` in a write transaction and return its result."""
+        state = self._state()
+        also = g.get('write_also')
+        if also:
+            job = self._joined(job, list(also))
+        if state.enabled:
+            return state.submit(job)
+
+        session = current_app.extensions['sqlalchemy'].session
+        try:
+            result = job(session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return result
+
+    @staticmethod
+    def _joined(job, also):
+        def joined(session):
+            result = job(session)
+            for each in also:
+                each(session)
+            return result
+        return joined
+
+    @contextmanager
+    def also(self, job):
+        """Run ``job(session)`` after every write made inside the block.
+
+        It shares the write's transaction (and savepoint, on the queue), so
+        it commits exactly when that write does.
+        """
+        jobs = g.setdefault('write_also', [])
+        jobs.append(job)
+        try:
+            yield
+        finally:
+            jobs.remove(job)
+
+    def _detach(self, obj):
+        if self._state().enabled:
+            session = current_app.extensions['sqlalchemy'].session
+            if obj in session:
+                session.expunge(obj)
+
+    def save(self, obj, before=None):
+        """Insert or update ``obj`` and return it.
+
+        ``before(session)`` runs first in the same transaction, seeing the
+        stored row rather than ``obj``'s pending changes.
+        """
+        self._detach(obj)
+
+        def job(session):
+            if before is not None:
+                with session.no_autoflush:
+                    before(session)
+            session.add(obj)
+            session.flush()
+            # reload what the database stored (server defaults, type
+            # coercion), as an expired object would after a normal commit
+            session.refresh(obj)
+            return obj
+        return self.write(job)
+
+    def remove(self, obj):
+        """Delete ``obj``."""
+        self._detach(obj)
+
+        def job(session):
+            session.add(obj)
+            session.delete(obj)
+        self.write(job)
+
+    def stats(self):
+        return self._state().stats()
+
+    def metrics(self):
+        return self._state().metrics()
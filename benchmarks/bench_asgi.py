@@ -0,0 +1,173 @@
+"""Concurrent read throughput of the WSGI app vs the ASGI mode.
+
+Seeds a scratch database (or ``--database-url``, which must be empty) with
+``benchmarks.synthetic`` and serves it twice: the Flask app from a WSGI
+server with a fixed pool of ``--threads`` request threads (like gunicorn's
+gthread worker), and ``app.asgi`` from uvicorn on one event loop. Each is
+hit with a mix of report reads (transcripts, rosters, balances, fee
+summaries, keyset pages) from each ``--concurrency`` level of client
+threads; throughput, p50/p95 latency and errors are reported per level.
+
+SQLite queries run in-process, so the async views mostly save threads
+there; the gap to expect in production shows up with ``--database-url``
+pointing at PostgreSQL, where requests spend their time waiting on the
+network.
+
+    python -m benchmarks.bench_asgi --students 2000 --threads 8 --concurrency 8 32 128
+"""
+import argparse
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import uvicorn
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from app.asgi import create_asgi_app
+from app.extension import db
+from benchmarks.load import percentile, scratch_config
+from benchmarks.synthetic import SchoolSpec, seed_school
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server handling requests on a fixed number of threads."""
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app, handler=QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def report_paths(counts, requests, rng):
+    def pick(table):
+        return rng.randint(1, counts[table])
+
+    choices = [
+        lambda: f"/api/students/{pick('students')}/transcript",
+        lambda: f"/api/students/{pick('students')}/balance",
+        lambda: f"/api/courses/{pick('courses')}/roster",
+        lambda: '/api/fees/summary?group_by=' + rng.choice(['student', 'semester', 'fee_type']),
+        lambda: '/api/fees?limit=50&status=' + rng.choice(['paid', 'pending', 'overdue']),
+        lambda: f"/api/enrollments?limit=50&student_id={pick('students')}",
+    ]
+    return [rng.choice(choices)() for _ in range(requests)]
+
+
+def get(url, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except OSError:
+        status = 599
+    return (time.perf_counter() - start) * 1000, status
+
+
+def hammer(mode, base, paths, concurrency, timeout):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda path: get(base + path, timeout), paths))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(ms for ms, status in outcomes if status == 200)
+    statuses = Counter(status for _, status in outcomes)
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    print(f"{mode:5} concurrency {concurrency:4}  {len(outcomes) / elapsed:8.1f} req/s  "
+          f"p50 {percentile(latencies, 0.5) or 0:8.1f} ms  p95 {percentile(latencies, 0.95) or 0:8.1f} ms  "
+          f"errors {errors}")
+
+
+def serve_wsgi(flask_app, threads):
+    server = PooledWSGIServer('127.0.0.1', 0, flask_app, threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server.shutdown
+
+
+def serve_asgi(asgi_app):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host='127.0.0.1', port=port, log_level='warning',
+                                           access_log=False, backlog=4096))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+    return f'http://127.0.0.1:{port}', stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=1000, help="requests per concurrency level")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--threads', type=int, default=8, help="WSGI request threads")
+    parser.add_argument('--database-url', help="empty database to seed instead of a scratch SQLite file")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = args.database_url or f"sqlite:///{os.path.join(tmp, 'asgi.db')}"
+        # room for every WSGI thread and a connection per waiting coroutine
+        asgi_app = create_asgi_app(scratch_config(uri, DATABASE_POOL_SIZE=args.threads,
+                                                  DATABASE_MAX_OVERFLOW=max(args.concurrency),
+                                                  METRICS_ENABLED=False))
+        flask_app = asgi_app.flask_app
+        spec = SchoolSpec(students=args.students, teachers=max(args.students // 40, 1),
+                          courses=max(args.students // 20, 1), seed=args.seed)
+        with flask_app.app_context():
+            counts = seed_school(spec)
+        print(f"seeded {counts}")
+
+        rng = random.Random(args.seed)
+        levels = [(concurrency, report_paths(counts, args.requests, rng)) for concurrency in args.concurrency]
+        for mode, serve in (('wsgi', lambda: serve_wsgi(flask_app, args.threads)),
+                            ('asgi', lambda: serve_asgi(asgi_app))):
+            base, stop = serve()
+            try:
+                for path in levels[0][1][:20]:  # warm up
+                    get(base + path, args.timeout)
+                for concurrency, paths in levels:
+                    hammer(mode, base, paths, concurrency, args.timeout)
+            finally:
+                stop()
+        with flask_app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
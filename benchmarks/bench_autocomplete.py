@@ -0,0 +1,115 @@
+"""Memory and latency of the in-process student autocomplete index.
+
+Seeds a scratch database with each ``--students`` count, loads the index the
+way the app does at startup and reports the load time and the memory it
+holds (tracemalloc, after the fetched rows are dropped) in total and per
+100k students. Then times ``--requests`` lookups per kind of prefix a user
+types (one letter, a first name prefix, first + last name, a first name and
+an initial, a student_id, an email) directly on the index and through
+GET /api/students/autocomplete, and the incremental add/remove that the
+write handlers do.
+
+    python -m benchmarks.bench_autocomplete --students 100000 500000
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from app import create_app
+from app.autocomplete import PrefixIndex
+from app.extension import db
+from app.resources.student import student_autocomplete
+from benchmarks.load import percentile, scratch_config
+from benchmarks.synthetic import FIRST_NAMES, LAST_NAMES, SchoolSpec, seed_school
+
+
+def prefixes(kind, students, rng):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    if kind == 'one letter':
+        return first[0]
+    if kind == 'first name':
+        return first[:3]
+    if kind == 'first + last':
+        return f'{first[:3]} {last[:2]}'
+    if kind == 'first + initial':
+        return f'{first} {last[0]}'
+    if kind == 'student_id':
+        return f'STU{rng.randrange(students):07d}'[:8]
+    return f'{first.lower()}.{last.lower()[:3]}'
+
+
+def timed(call, requests):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+def line(label, latencies):
+    print(f"  {label:24} p50 {percentile(latencies, 0.5):8.4f} ms  p95 {percentile(latencies, 0.95):8.4f} ms")
+
+
+def run(students, requests, seed):
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'autocomplete.db')}"
+        app = create_app(scratch_config(uri, METRICS_ENABLED=False, AUTOCOMPLETE_PRELOAD=False))
+        spec = SchoolSpec(students=students, teachers=max(students // 500, 1), courses=max(students // 250, 1),
+                          enrollments_per_student=1, semesters=1, fees_per_semester=1, seed=seed)
+        with app.app_context():
+            seed_school(spec)
+
+            started = time.perf_counter()
+            student_autocomplete.init_app(app)
+            student_autocomplete.complete(['a'], 1)
+            elapsed = time.perf_counter() - started
+            student_autocomplete.init_app(app)
+
+            # again with allocations traced, which is several times slower
+            gc.collect()
+            tracemalloc.start()
+            rows = db.session.execute(student_autocomplete.statement()).all()
+            index = PrefixIndex()
+            index.load(rows)
+            del rows
+            gc.collect()
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            db.engine.dispose()
+        print(f"{students} students: loaded in {elapsed:.2f}s, {len(index.keys)} keys, "
+              f"{size / 2**20:.1f} MiB ({size / 2**20 / students * 100000:.1f} MiB per 100k students)")
+
+        rng = random.Random(seed)
+        kinds = ('one letter', 'first name', 'first + last', 'first + initial', 'student_id', 'email')
+        for kind in kinds:
+            line(f"index, {kind}", timed(lambda: index.complete(
+                prefixes(kind, students, rng).lower().split(), 10), requests))
+
+        values = ('Zadie', 'Quartermaine', 'TMP0000001', 'zadie.q@school.test')
+        line('index, add + remove', timed(lambda: (index.add(students + 1, values), index.remove(students + 1)),
+                                         requests))
+        del index
+
+        client = create_app(scratch_config(uri, METRICS_ENABLED=False)).test_client()
+        for kind in kinds:
+            line(f"http, {kind}", timed(lambda: client.get(
+                '/api/students/autocomplete', query_string={'prefix': prefixes(kind, students, rng)}), requests))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='+', default=[100000])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    for students in args.students:
+        run(students, args.requests, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Cold start: import, app creation, first request and first spec request.
+
+Each sample is a fresh interpreter. ``--repo`` points at another checkout
+(e.g. a ``git worktree`` of an older revision) to compare before/after; trees
+that build the app at import time are measured the same way, with the
+creation folded into the import.
+
+    python -m benchmarks.bench_boot --samples 10
+    git worktree add /tmp/before <rev> && python -m benchmarks.bench_boot --repo /tmp/before
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CONFIG = '''
+class Config:
+    SQLALCHEMY_DATABASE_URI = {uri!r}
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SWAGGER_ENABLED = {swagger!r}
+'''
+
+PROBE = '''
+import json, time
+start = time.perf_counter()
+import app as package
+imported = time.perf_counter()
+app = package.create_app() if 'create_app' in vars(package) else package.app
+created = time.perf_counter()
+client = app.test_client()
+client.get('/api/cache/stats')
+first_request = time.perf_counter()
+spec = client.get('/apispec_1.json').status_code
+first_spec = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'create_app': created - imported,
+    'first_request': first_request - created,
+    'first_spec': first_spec - first_request if spec == 200 else None,
+}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repo', default=os.getcwd(), help="checkout to measure (default: this one)")
+    parser.add_argument('--samples', type=int, default=10)
+    parser.add_argument('--no-swagger', action='store_true', help="boot with SWAGGER_ENABLED = False")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'config.py'), 'w') as f:
+            f.write(CONFIG.format(uri=f"sqlite:///{os.path.join(tmp, 'boot.db')}", swagger=not args.no_swagger))
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join([tmp, args.repo])}
+
+        samples = []
+        for _ in range(args.samples):
+            out = subprocess.run([sys.executable, '-c', PROBE], cwd=args.repo, env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"{args.repo}  ({args.samples} cold starts, median)")
+    for phase in ('import', 'create_app', 'first_request', 'first_spec'):
+        values = [sample[phase] for sample in samples if sample[phase] is not None]
+        print(f"  {phase:14} {statistics.median(values) * 1000:8.1f} ms" if values else f"  {phase:14}      n/a")
+    boot = [sample['import'] + sample['create_app'] for sample in samples]
+    print(f"  {'boot total':14} {statistics.median(boot) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Bytes and time to resync after a few writes: change feed vs full download.
+
+Seeds a scratch database with ``--students`` students (and their
+enrollments and fees), takes a full sync through GET /api/changes, then
+makes ``--writes`` changes (updates, creates and deletes spread over
+students, enrollments and fees) and compares catching up through the feed
+from the saved cursor with re-downloading the collections the way a client
+without the feed has to.
+
+    python -m benchmarks.bench_changes --students 20000 --writes 100
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app import create_app
+from app.extension import db
+from benchmarks.load import scratch_config
+from benchmarks.synthetic import SchoolSpec, seed_school
+
+COLLECTIONS = ('/api/students', '/api/teachers', '/api/courses', '/api/enrollments', '/api/fees', '/api/users/')
+
+
+def sync(client, since, limit):
+    """``(changes, next cursor, bytes, requests)`` following ``next`` until caught up."""
+    changes, size, requests = 0, 0, 0
+    while True:
+        response = client.get('/api/changes', query_string={'limit': limit, **({'since': since} if since else {})})
+        body = response.get_json()
+        size += len(response.get_data())
+        requests += 1
+        changes += len(body['changes'])
+        since = body['next']
+        if not body['has_more']:
+            return changes, since, size, requests
+
+
+def write(client, rng, students, writes):
+    for number in range(writes):
+        kind = number % 4
+        if kind == 0:
+            id = rng.randrange(1, students + 1)
+            student = client.get(f'/api/students/{id}').get_json()
+            client.put(f'/api/students/{id}', json=dict(student, first_name=f'Renamed{number}'))
+        elif kind == 1:
+            client.post('/api/fees', json={'student_id': rng.randrange(1, students + 1), 'amount': 100.0,
+                                           'fee_type': 'library', 'semester': '2024-2', 'status': 'pending',
+                                           'payment_date': '2024-09-01'})
+        elif kind == 2:
+            client.delete(f'/api/fees/{rng.randrange(1, students * 2)}')
+        else:
+            client.delete(f'/api/enrollments/{rng.randrange(1, students * 2)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--writes', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=500, help="changes per feed request")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(scratch_config(f"sqlite:///{os.path.join(tmp, 'changes.db')}", METRICS_ENABLED=False,
+                                        AUTOCOMPLETE_PRELOAD=False, CHANGES_SETTLE_SECONDS=0))
+        with app.app_context():
+            seed_school(SchoolSpec(students=args.students, teachers=max(args.students // 500, 1),
+                                   courses=max(args.students // 250, 1), enrollments_per_student=2,
+                                   semesters=1, fees_per_semester=2, seed=args.seed))
+        client = app.test_client()
+
+        start = time.perf_counter()
+        changes, cursor, size, requests = sync(client, None, args.limit)
+        print(f"initial sync: {changes} rows in {requests} requests, {size / 2**20:.1f} MiB, "
+              f"{time.perf_counter() - start:.2f}s")
+
+        write(client, random.Random(args.seed), args.students, args.writes)
+
+        start = time.perf_counter()
+        changes, cursor, size, requests = sync(client, cursor, args.limit)
+        print(f"feed catch-up: {changes} changes in {requests} requests, {size / 2**10:.1f} KiB, "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        size = sum(len(client.get(url).get_data()) for url in COLLECTIONS)
+        print(f"full download: {len(COLLECTIONS)} requests, {size / 2**20:.1f} MiB, "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
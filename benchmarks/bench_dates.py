@@ -0,0 +1,49 @@
+"""Date parsing: dateutil.parser.parse vs app.dates.
+
+Times ``--values`` parses per kind of input the write endpoints receive (a
+repeated ISO date as in a bulk import, distinct ISO dates, ISO datetimes,
+a non-ISO format that takes the fallback) with the dateutil call the
+handlers used to make and with app.dates, cold (cache cleared first) and
+warm, and reports microseconds per value.
+
+    python -m benchmarks.bench_dates --values 100000
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from dateutil import parser as dateutil_parser
+
+from app.dates import parse_datetime
+
+
+def per_value(parse, values):
+    start = time.perf_counter()
+    for value in values:
+        parse(value)
+    return (time.perf_counter() - start) / len(values) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--values', type=int, default=100000)
+    args = parser.parse_args()
+
+    days = [date(2000, 1, 1) + timedelta(days=day) for day in range(args.values)]
+    kinds = {
+        'repeated ISO date': ['2024-09-01'] * args.values,
+        'distinct ISO dates': [day.isoformat() for day in days],
+        'ISO datetimes': [f'{day.isoformat()}T08:30:00' for day in days],
+        'fallback (13 Feb 2024)': [f'{day.day} {day:%b %Y}' for day in days],
+    }
+    print(f"{'':24} {'dateutil':>10} {'cold':>10} {'warm':>10}  (µs per value)")
+    for label, values in kinds.items():
+        before = per_value(dateutil_parser.parse, values)
+        parse_datetime.cache_clear()
+        cold = per_value(parse_datetime, values)
+        warm = per_value(parse_datetime, values)
+        print(f"{label:24} {before:10.2f} {cold:10.2f} {warm:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
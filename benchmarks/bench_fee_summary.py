@@ -0,0 +1,112 @@
+"""Student balances computed in SQL versus summed on the client.
+
+Seeds a SQLite database with ``--fees`` fee rows, then compares
+  * client side: GET /api/fees, parse the JSON and sum per student in Python
+  * SQL: GET /api/fees/summary?group_by=student, paging through every group
+  * SQL: GET /api/students/<id>/balance for a sample of students
+
+    python -m benchmarks.bench_fee_summary --fees 1000000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from flask import Flask
+from flask_restful import Api
+from sqlalchemy import insert
+
+from app.extension import db
+from app.models.fee import FeeModel
+from app.models.student import StudentModel
+from app.resources.fee import Fees, FeeSummary, StudentBalance
+
+CHUNK = 50000
+
+
+def make_app(path):
+    bench_app = Flask(__name__)
+    bench_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(bench_app)
+    api = Api(bench_app)
+    api.add_resource(Fees, '/api/fees')
+    api.add_resource(FeeSummary, '/api/fees/summary')
+    api.add_resource(StudentBalance, '/api/students/<int:id>/balance')
+    return bench_app
+
+
+def seed(args):
+    rng = random.Random(args.seed)
+    db.create_all()
+    db.session.execute(insert(StudentModel), [
+        {'first_name': f'S{i}', 'last_name': 'Student', 'student_id': f'STU{i:07d}',
+         'email': f's{i}@school.test'} for i in range(args.students)])
+    statuses = ['paid', 'pending', 'overdue']
+    for start in range(0, args.fees, CHUNK):
+        db.session.execute(insert(FeeModel), [
+            {'student_id': rng.randint(1, args.students), 'amount': float(rng.randint(50, 5000)),
+             'fee_type': 'tuition', 'semester': f'2024-S{rng.randint(1, 2)}',
+             'payment_date': datetime(2024, 1, 1), 'status': rng.choice(statuses)}
+            for _ in range(start, min(start + CHUNK, args.fees))])
+    db.session.commit()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def client_side(client):
+    response = client.get('/api/fees')
+    totals = defaultdict(lambda: {'billed': 0.0, 'paid': 0.0, 'pending': 0.0, 'overdue': 0.0})
+    for fee in json.loads(response.data):
+        entry = totals[fee['student_id']]
+        entry['billed'] += fee['amount']
+        entry[fee['status']] += fee['amount']
+    return len(totals), len(response.data)
+
+
+def sql_summary(client):
+    groups, size, url = 0, 0, '/api/fees/summary?group_by=student&limit=500'
+    while url:
+        response = client.get(url)
+        size += len(response.data)
+        page = json.loads(response.data)
+        groups += len(page['items'])
+        url = page['next'] and f"/api/fees/summary?group_by=student&limit=500&after={page['next']}"
+    return groups, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fees', type=int, default=1000000)
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--balances', type=int, default=1000, help="single-student balance lookups")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_app = make_app(os.path.join(tmp, 'fees.db'))
+        with bench_app.app_context():
+            _, seconds = timed(lambda: seed(args))
+            print(f"seeded {args.fees} fees for {args.students} students in {seconds:.1f}s")
+        client = bench_app.test_client()
+
+        (groups, size), seconds = timed(lambda: client_side(client))
+        print(f"client side     {seconds * 1000:10.1f} ms  {size / 1e6:8.1f} MB  {groups} students")
+        (groups, size), seconds = timed(lambda: sql_summary(client))
+        print(f"SQL summary     {seconds * 1000:10.1f} ms  {size / 1e6:8.1f} MB  {groups} students")
+
+        rng = random.Random(args.seed)
+        ids = [rng.randint(1, args.students) for _ in range(args.balances)]
+        _, seconds = timed(lambda: [client.get(f'/api/students/{id}/balance') for id in ids])
+        print(f"SQL balance     {seconds * 1000 / args.balances:10.3f} ms per student")
+
+
+if __name__ == '__main__':
+    main()
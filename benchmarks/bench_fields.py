@@ -0,0 +1,61 @@
+"""Latency and payload of GET /api/students with and without ?fields=.
+
+Seeds a scratch database with ``--students`` students and times
+``--requests`` calls of the full list, a keyset page (``--limit``) and a
+single student, each with every field and with only
+``id,first_name,last_name`` (the mobile client's projection), reporting
+p50/p95 and the response size.
+
+    python -m benchmarks.bench_fields --students 50000 --requests 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app import create_app
+from app.extension import db
+from benchmarks.load import percentile, scratch_config
+from benchmarks.synthetic import SchoolSpec, seed_school
+
+PROJECTION = 'id,first_name,last_name'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=500, help="page size of the paginated case")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(scratch_config(f"sqlite:///{os.path.join(tmp, 'fields.db')}", METRICS_ENABLED=False,
+                                        AUTOCOMPLETE_PRELOAD=False))
+        with app.app_context():
+            seed_school(SchoolSpec(students=args.students, teachers=max(args.students // 500, 1),
+                                   courses=max(args.students // 250, 1), enrollments_per_student=1,
+                                   semesters=1, fees_per_semester=1, seed=args.seed))
+        client = app.test_client()
+
+        cases = (('list', '/api/students', {}),
+                 ('page', '/api/students', {'limit': args.limit}),
+                 ('one', '/api/students/1', {}))
+        for label, url, query in cases:
+            for fields in (None, PROJECTION):
+                query_string = dict(query, **({'fields': fields} if fields else {}))
+                latencies = []
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    response = client.get(url, query_string=query_string)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    assert response.status_code == 200, response.get_json()
+                latencies.sort()
+                print(f"{label:5} {fields or 'all fields':24} p50 {percentile(latencies, 0.5):9.2f} ms  "
+                      f"p95 {percentile(latencies, 0.95):9.2f} ms  {len(response.get_data()) / 1024:9.1f} KiB")
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Cost of a retried POST with and without an Idempotency-Key.
+
+Seeds a scratch database and, for POST /api/fees and POST /api/fees/bulk
+(``--rows`` fees per request), times ``--requests`` calls each of: a plain
+POST (no key), a first POST with a fresh key (the handler plus claiming and
+storing the key), and a retry of that POST with the same key (replayed from
+idempotency_keys). Reports p50/p95 per kind and the stored bytes per
+response.
+
+    python -m benchmarks.bench_idempotency --requests 500 --rows 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import func, select
+
+from app import create_app
+from app.extension import db
+from app.models import IdempotencyKeyModel
+from benchmarks.load import percentile, scratch_config
+from benchmarks.synthetic import SchoolSpec, seed_school
+
+
+def line(label, latencies):
+    latencies = sorted(latencies)
+    print(f"  {label:24} p50 {percentile(latencies, 0.5):8.3f} ms  p95 {percentile(latencies, 0.95):8.3f} ms")
+
+
+def timed(client, url, body, headers):
+    start = time.perf_counter()
+    response = client.post(url, json=body, headers=headers)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code < 300, response.get_json()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=1000, help="fees per bulk request")
+    parser.add_argument('--database', help="empty database URL (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    fee = {'student_id': 1, 'amount': 1250.0, 'fee_type': 'tuition', 'semester': '2024-1',
+           'payment_date': '2024-01-15', 'status': 'paid'}
+    cases = (('/api/fees', fee, args.requests),
+             ('/api/fees/bulk', [dict(fee, student_id=1 + i % 100) for i in range(args.rows)],
+              max(args.requests // 10, 1)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(scratch_config(args.database or f"sqlite:///{os.path.join(tmp, 'idempotency.db')}",
+                                        METRICS_ENABLED=False))
+        with app.app_context():
+            seed_school(SchoolSpec(students=100, teachers=2, courses=4))
+        client = app.test_client()
+
+        for url, body, requests in cases:
+            print(f"POST {url} ({requests} requests)")
+            line('no key', [timed(client, url, body, {}) for _ in range(requests)])
+            keys = [str(uuid.uuid4()) for _ in range(requests)]
+            line('first, with key', [timed(client, url, body, {'Idempotency-Key': key}) for key in keys])
+            line('retry, replayed', [timed(client, url, body, {'Idempotency-Key': key}) for key in keys])
+            with app.app_context():
+                stored = db.session.scalar(select(func.avg(func.length(IdempotencyKeyModel.body))))
+                db.session.execute(IdempotencyKeyModel.__table__.delete())
+                db.session.commit()
+            print(f"  stored {stored:.0f} bytes per response")
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Query plans and latencies for the relationship/filter queries, with and
+without the indexes added in migration 368cb5ee397c.
+
+Two SQLite databases are seeded with the same synthetic data, one from the
+schema without the new indexes and one from the current models, and the same
+queries are run against both.
+
+    python -m benchmarks.bench_indexes --students 20000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime
+
+from sqlalchemy import MetaData, UniqueConstraint, create_engine, insert, text
+
+from app.extension import db
+import app.models  # noqa: F401  registers the tables on db.metadata
+
+NEW_CONSTRAINTS = {'uq_enrollments_student_id_course_id'}
+
+QUERIES = {
+    'StudentModel.fees': "SELECT * FROM fees WHERE student_id = :student",
+    'fees by student and status': "SELECT * FROM fees WHERE student_id = :student AND status = 'overdue'",
+    'overdue fees': "SELECT id FROM fees WHERE status = 'overdue' LIMIT 50",
+    'StudentModel.enrollments': "SELECT * FROM enrollments WHERE student_id = :student",
+    'CourseModel.enrolments': "SELECT * FROM enrollments WHERE course_id = :course",
+    'enrollments by course and status': "SELECT * FROM enrollments WHERE course_id = :course AND status = 'active'",
+    'TeacherModel.courses': "SELECT * FROM courses WHERE teacher_id = :teacher",
+}
+
+
+def build_metadata(with_indexes):
+    metadata = MetaData()
+    for table in db.metadata.sorted_tables:
+        copy = table.to_metadata(metadata)
+        if not with_indexes:
+            for index in list(copy.indexes):
+                copy.indexes.discard(index)
+            for constraint in list(copy.constraints):
+                if isinstance(constraint, UniqueConstraint) and constraint.name in NEW_CONSTRAINTS:
+                    copy.constraints.discard(constraint)
+    return metadata
+
+
+def seed(engine, metadata, args):
+    rng = random.Random(args.seed)
+    tables = metadata.tables
+    statuses = ['paid', 'pending', 'overdue']
+    with engine.begin() as conn:
+        conn.execute(insert(tables['teachers']), [
+            {'first_name': f'T{i}', 'last_name': 'Teacher', 'email': f't{i}@school.test',
+             'department': f'Dept {i % 12}', 'credits': 0, 'hire_date': datetime(2020, 1, 1)}
+            for i in range(args.teachers)])
+        conn.execute(insert(tables['courses']), [
+            {'code': f'C{i}', 'name': f'Course {i}', 'credits': 3, 'teacher_id': rng.randint(1, args.teachers)}
+            for i in range(args.courses)])
+        conn.execute(insert(tables['students']), [
+            {'first_name': f'S{i}', 'last_name': 'Student', 'student_id': f'STU{i:07d}',
+             'email': f's{i}@school.test', 'date_of_birth': date(2005, 1, 1),
+             'enrollment_date': datetime(2023, 9, 1)}
+            for i in range(args.students)])
+        enrollments, fees = [], []
+        for student in range(1, args.students + 1):
+            for course in rng.sample(range(1, args.courses + 1), args.enrollments):
+                enrollments.append({'student_id': student, 'course_id': course,
+                                    'enrollment_date': date(2023, 9, 1), 'status': 'active'})
+            for n in range(args.fees):
+                fees.append({'student_id': student, 'amount': 500.0, 'fee_type': 'tuition',
+                             'semester': f'2023-S{n}', 'payment_date': datetime(2023, 9, 1),
+                             'status': rng.choice(statuses)})
+        conn.execute(insert(tables['enrollments']), enrollments)
+        conn.execute(insert(tables['fees']), fees)
+
+
+def run(engine, args):
+    rng = random.Random(args.seed)
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = conn.execute(text('EXPLAIN QUERY PLAN ' + sql),
+                                {'student': 1, 'course': 1, 'teacher': 1}).all()
+            timings = []
+            for _ in range(args.repeat):
+                params = {'student': rng.randint(1, args.students),
+                          'course': rng.randint(1, args.courses),
+                          'teacher': rng.randint(1, args.teachers)}
+                start = time.perf_counter()
+                conn.execute(text(sql), params).all()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                'plan': '; '.join(row[-1] for row in plan),
+                'mean_ms': statistics.fmean(timings),
+                'p95_ms': timings[int(len(timings) * 0.95) - 1],
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--teachers', type=int, default=200)
+    parser.add_argument('--courses', type=int, default=1000)
+    parser.add_argument('--enrollments', type=int, default=5, help="enrollments per student")
+    parser.add_argument('--fees', type=int, default=6, help="fees per student")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = {}
+        for label, with_indexes in (('before', False), ('after', True)):
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, label + '.db')}")
+            metadata = build_metadata(with_indexes)
+            metadata.create_all(engine)
+            seed(engine, metadata, args)
+            report[label] = run(engine, args)
+            engine.dispose()
+
+    for name in QUERIES:
+        before, after = report['before'][name], report['after'][name]
+        print(name)
+        for label, result in (('before', before), ('after', after)):
+            print(f"  {label:6} mean {result['mean_ms']:8.3f} ms  p95 {result['p95_ms']:8.3f} ms  {result['plan']}")
+
+
+if __name__ == '__main__':
+    main()
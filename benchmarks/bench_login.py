@@ -0,0 +1,103 @@
+"""Login throughput under concurrent load.
+
+Creates ``--users`` users through the bulk endpoint (hashed on the credential
+pool), then fires ``--requests`` POST /api/login requests at a threaded WSGI
+server for each ``--concurrency`` level and reports throughput, p50/p95
+latency and how many requests were turned away with 503.
+
+    python -m benchmarks.bench_login --method scrypt:32768:8:1 --concurrency 1 8 32 --workers 4
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app
+from app.extension import credentials, db
+from benchmarks.load import percentile, scratch_config
+
+
+def login(base, username, password, timeout):
+    data = json.dumps({'username': username, 'password': password}).encode()
+    request = urllib.request.Request(base + '/api/login', data=data, method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return (time.perf_counter() - start) * 1000, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--method', default='scrypt:32768:8:1', help="PASSWORD_HASH_METHOD")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="PASSWORD_HASH_WORKERS")
+    parser.add_argument('--queue', type=int, help="PASSWORD_HASH_QUEUE (default: 4 per worker)")
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(scratch_config(f"sqlite:///{os.path.join(tmp, 'login.db')}"))
+        app.config.update(PASSWORD_HASH_METHOD=args.method, PASSWORD_HASH_WORKERS=args.workers,
+                          PASSWORD_HASH_EXECUTOR=args.executor)
+        if args.queue is not None:
+            app.config['PASSWORD_HASH_QUEUE'] = args.queue
+        credentials.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post('/api/users/bulk', json=[
+            {'username': f'user{i}', 'email': f'user{i}@school.test', 'password': f'secret-{i}'}
+            for i in range(args.users)])
+        assert response.json['created'] == args.users, response.json
+        print(f"created {args.users} users ({args.method}, {args.workers} {args.executor} workers) "
+              f"in {time.perf_counter() - started:.2f}s")
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        app.logger.disabled = True  # 503s are logged as errors by flask-restful
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_port}'
+        rng = random.Random(args.seed)
+        try:
+            for concurrency in args.concurrency:
+                users = [rng.randrange(args.users) for _ in range(args.requests)]
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    outcomes = list(pool.map(
+                        lambda i: login(base, f'user{i}', f'secret-{i}', args.timeout), users))
+                elapsed = time.perf_counter() - started
+                latencies = sorted(ms for ms, status in outcomes if status == 200)
+                statuses = Counter(status for _, status in outcomes)
+                print(f"concurrency {concurrency:4}  {statuses[200] / elapsed:8.1f} logins/s  "
+                      f"p50 {percentile(latencies, 0.5) or 0:8.1f} ms  p95 {percentile(latencies, 0.95) or 0:8.1f} ms  "
+                      f"503 {statuses[503]:5}  other {sum(statuses.values()) - statuses[200] - statuses[503]}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Latency of /api/students/search on a large synthetic school.
+
+Seeds a scratch database with ``--students`` students (the search index is
+filled by its triggers as the rows go in), then sends ``--requests`` GET
+/api/students/search requests for each kind of query a front desk types:
+a first name prefix, first + last name prefixes, a student_id, and an email
+prefix, plus a second page through the cursor. p50/p95/max latency and the
+number of matches on the first page are reported per kind.
+
+    python -m benchmarks.bench_search --students 500000 --requests 200
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app import create_app
+from app.extension import db
+from benchmarks.load import percentile, scratch_config
+from benchmarks.synthetic import FIRST_NAMES, LAST_NAMES, SchoolSpec, seed_school
+
+
+def queries(kind, students, rng):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    if kind == 'first name':
+        return first[:3]
+    if kind == 'first + last':
+        return f'{first[:3]} {last[:4]}'
+    if kind == 'student_id':
+        return f'STU{rng.randrange(students):07d}'
+    return f'{first.lower()}.{last.lower()[:3]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(scratch_config(f"sqlite:///{os.path.join(tmp, 'search.db')}", METRICS_ENABLED=False))
+        spec = SchoolSpec(students=args.students, teachers=max(args.students // 500, 1),
+                          courses=max(args.students // 250, 1), enrollments_per_student=1, semesters=1,
+                          fees_per_semester=1, seed=args.seed)
+        started = time.perf_counter()
+        with app.app_context():
+            seed_school(spec)
+            db.engine.dispose()
+        print(f"seeded {args.students} students in {time.perf_counter() - started:.1f}s")
+
+        client = app.test_client()
+        rng = random.Random(args.seed)
+        for kind in ('first name', 'first + last', 'student_id', 'email', 'next page'):
+            latencies, hits = [], []
+            for _ in range(args.requests):
+                q = queries('first name' if kind == 'next page' else kind, args.students, rng)
+                url = f'/api/students/search?q={q}&limit={args.limit}'
+                if kind == 'next page':
+                    url += '&after=' + (client.get(url).json['next'] or '')
+                start = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, (url, response.json)
+                hits.append(len(response.json['items']))
+            latencies.sort()
+            print(f"{kind:13} p50 {percentile(latencies, 0.5):7.2f} ms  p95 {percentile(latencies, 0.95):7.2f} ms  "
+                  f"max {latencies[-1]:7.2f} ms  items/page {statistics.fmean(hits):5.1f}")
+
+
+if __name__ == '__main__':
+    main()
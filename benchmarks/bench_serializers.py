@@ -0,0 +1,89 @@
+"""marshal() over ORM rows versus the column-only serializer.
+
+Seeds ``--students`` students and ``--fees`` fees, then renders the full
+/api/students and /api/fees bodies both ways, checks the bytes are
+identical and reports the time of each.
+
+    python -m benchmarks.bench_serializers --students 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime
+
+from flask import Flask
+from flask_restful import marshal
+from flask_restful.representations.json import output_json
+from sqlalchemy import insert
+
+from app.extension import db
+from app.models.fee import FeeModel
+from app.models.student import StudentModel
+from app.resources.fee import fee_fields
+from app.resources.student import student_fields
+from app.serializers import dump_query
+
+CHUNK = 50000
+
+
+def seed(args):
+    rng = random.Random(args.seed)
+    db.create_all()
+    for start in range(0, args.students, CHUNK):
+        db.session.execute(insert(StudentModel), [
+            {'first_name': f'S{i}', 'last_name': 'Student', 'student_id': f'STU{i:07d}',
+             'email': f's{i}@school.test', 'date_of_birth': date(2000 + i % 8, 1 + i % 12, 1 + i % 28),
+             'enrollment_date': datetime(2023, 9, 1)}
+            for i in range(start, min(start + CHUNK, args.students))])
+    for start in range(0, args.fees, CHUNK):
+        db.session.execute(insert(FeeModel), [
+            {'student_id': rng.randint(1, args.students), 'amount': float(rng.randint(50, 5000)),
+             'fee_type': 'tuition', 'semester': '2024-S1', 'payment_date': datetime(2024, 1, 15),
+             'status': 'pending'}
+            for _ in range(start, min(start + CHUNK, args.fees))])
+    db.session.commit()
+
+
+def best_of(repeat, fn):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=100000)
+    parser.add_argument('--fees', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_app = Flask(__name__)
+        bench_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'serializers.db')}"
+        db.init_app(bench_app)
+        with bench_app.app_context():
+            seed(args)
+            for model, fields in ((StudentModel, student_fields), (FeeModel, fee_fields)):
+                def marshalled():
+                    db.session.expunge_all()
+                    return output_json(marshal(model.query.order_by(model.id).all(), fields), 200).get_data()
+
+                def serialized():
+                    return output_json(dump_query(model.query.order_by(model.id), model, fields), 200).get_data()
+
+                old, old_time = best_of(args.repeat, marshalled)
+                new, new_time = best_of(args.repeat, serialized)
+                assert old == new, f"{model.__name__}: serializer output differs from marshal"
+                print(f"{model.__tablename__:10} marshal {old_time * 1000:9.1f} ms  "
+                      f"serializer {new_time * 1000:9.1f} ms  speedup {old_time / new_time:5.2f}x  "
+                      f"({len(new) / 1e6:.1f} MB, identical)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Cost of serving /apispec_1.json, generated by Flasgger vs prebuilt.
+
+Times the first (cold) and ``--requests`` warm GET /apispec_1.json on an app
+where Flasgger builds the spec, then runs ``flask spec build``'s renderer into
+a scratch file and times the prebuilt route for identity, gzip and brotli
+(when installed) responses and for If-None-Match revalidations (304).
+
+    python -m benchmarks.bench_spec --requests 500
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from app import create_app
+from app.spec import render_spec, write_spec
+from benchmarks.load import percentile, scratch_config
+
+
+def timed(client, requests, headers=None):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get('/apispec_1.json', headers=headers or {})
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies), response
+
+
+def report(label, latencies, response):
+    print(f"{label:28} {response.status_code}  {len(response.data):7} bytes  "
+          f"mean {statistics.fmean(latencies):7.3f} ms  p50 {percentile(latencies, 0.5):7.3f} ms  "
+          f"p95 {percentile(latencies, 0.95):7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'spec.db')}"
+        spec_file = os.path.join(tmp, 'apispec.json')
+
+        app = create_app(scratch_config(uri, SWAGGER_SPEC_FILE=spec_file))
+        client = app.test_client()
+        report('flasgger (cold)', *timed(client, 1))
+        report('flasgger', *timed(client, args.requests))
+
+        started = time.perf_counter()
+        written = write_spec(render_spec(app), spec_file)
+        print(f"built {', '.join(f'{os.path.basename(path)} {size}' for path, size in written)} bytes "
+              f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        client = create_app(scratch_config(uri, SWAGGER_SPEC_FILE=spec_file)).test_client()
+        report('prebuilt identity', *timed(client, args.requests))
+        latencies, response = timed(client, args.requests, {'Accept-Encoding': 'gzip'})
+        report('prebuilt gzip', latencies, response)
+        report('prebuilt gzip, If-None-Match', *timed(
+            client, args.requests, {'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']}))
+        if os.path.exists(spec_file + '.br'):
+            report('prebuilt br', *timed(client, args.requests, {'Accept-Encoding': 'br, gzip'}))
+
+
+if __name__ == '__main__':
+    main()
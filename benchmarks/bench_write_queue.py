@@ -0,0 +1,96 @@
+"""Concurrent writes on SQLite with and without the single-writer queue.
+
+Serves the app from a threaded WSGI server on a scratch SQLite database and
+POSTs ``--requests`` new students from ``--threads`` client threads, first
+committing inline in each request and then through DATABASE_WRITE_QUEUE.
+Reports throughput, p95 latency, failed writes (``database is locked``) and
+how many requests the writer committed per transaction.
+
+    python -m benchmarks.bench_write_queue --threads 32 --requests 2000
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app
+from app.extension import db, writer
+from benchmarks.load import percentile, scratch_config
+
+
+def post(url, body, timeout):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+            message = ''
+    except urllib.error.HTTPError as e:
+        status = e.code
+        message = e.read().decode(errors='replace')
+    return (time.perf_counter() - start) * 1000, status, message
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--busy-timeout', type=int, default=5000, help="DATABASE_STATEMENT_TIMEOUT in ms")
+    parser.add_argument('--batch-wait', type=float, default=0.0, help="DATABASE_WRITE_BATCH_WAIT in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(scratch_config(f"sqlite:///{os.path.join(tmp, 'writes.db')}",
+                                        DATABASE_STATEMENT_TIMEOUT=args.busy_timeout,
+                                        DATABASE_POOL_SIZE=args.threads, DATABASE_WRITE_BATCH_WAIT=args.batch_wait))
+        with app.app_context():
+            db.create_all()
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/api/students'
+        serial = itertools.count()
+        try:
+            for enabled in (False, True):
+                app.config['DATABASE_WRITE_QUEUE'] = enabled
+                writer.init_app(app)
+                state = app.extensions['write_queue']
+
+                def create(_):
+                    n = next(serial)
+                    return post(url, {'first_name': 'Bench', 'last_name': 'Writer', 'student_id': f'W{n:08d}',
+                                      'email': f'w{n}@school.test'}, 60)
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                    outcomes = list(pool.map(create, range(args.requests)))
+                elapsed = time.perf_counter() - started
+
+                latencies = sorted(ms for ms, status, _ in outcomes if status == 201)
+                statuses = Counter(status for _, status, _ in outcomes)
+                locked = sum(1 for _, _, message in outcomes if 'locked' in message)
+                per_batch = state.jobs / state.batches if state.batches else 1.0
+                print(f"{'write queue' if enabled else 'inline commit':13}  {statuses[201] / elapsed:7.1f} writes/s  "
+                      f"p95 {percentile(latencies, 0.95) or 0:8.1f} ms  failed {args.requests - statuses[201]:5} "
+                      f"(locked {locked})  requests per commit {per_batch:5.1f}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
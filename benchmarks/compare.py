@@ -0,0 +1,62 @@
+"""Compare two result files written by ``benchmarks.load``.
+
+Prints the p50/p95/p99 latency and throughput change for every route present
+in both runs, largest p95 regression first.
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as f:
+        run = json.load(f)
+    return run['meta'], {(r['mode'], r['method'], r['route']): r for r in run['results']}
+
+
+def change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="flag p95 regressions larger than this many percent")
+    args = parser.parse_args()
+
+    old_meta, old = load(args.baseline)
+    new_meta, new = load(args.candidate)
+    if old_meta.get('spec') != new_meta.get('spec'):
+        print("warning: the runs were seeded with different specs")
+
+    rows = []
+    for key in old.keys() & new.keys():
+        a, b = old[key], new[key]
+        rows.append((key, {metric: change(a[metric], b[metric])
+                           for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')}, b))
+
+    rows.sort(key=lambda row: -(row[1]['p95_ms'] or 0))
+    regressions = 0
+    for (mode, method, route), delta, result in rows:
+        flag = ''
+        if (delta['p95_ms'] or 0) > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{mode:11} {method:4} {route:42} " + '  '.join(
+            f"{metric.split('_')[0]} {value:+7.1f}%" if value is not None else f"{metric.split('_')[0]}     n/a"
+            for metric, value in delta.items()) + f"  errors {result['errors']}{flag}")
+
+    for key in sorted(old.keys() - new.keys()):
+        print(f"only in baseline:  {' '.join(key)}")
+    for key in sorted(new.keys() - old.keys()):
+        print(f"only in candidate: {' '.join(key)}")
+    print(f"{regressions} route(s) regressed by more than {args.threshold:g}% at p95")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""Load test every route of the app against a synthetic school.
+
+Seeds a scratch database (never the one in your config.py) with
+``benchmarks.synthetic``, then sends ``--requests`` requests to every route
+registered on the app, first through the Flask test client and then through
+a threaded WSGI server over real sockets. p50/p95/p99 latency, throughput,
+error count and peak RSS are reported per route and written as JSON so runs
+can be compared with ``python -m benchmarks.compare``.
+
+    python -m benchmarks.load --students 10000 --requests 200 --output run.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from app import create_app
+from benchmarks.synthetic import SchoolSpec, seed_school
+
+# collection routes that are also exercised as a keyset page
+PAGED_ROUTES = ('/api/students', '/api/teachers', '/api/courses', '/api/enrollments', '/api/fees', '/api/users/')
+
+# table whose ids fill the <int:id> of a route, by route prefix
+ID_TABLES = {
+    '/api/students': 'students',
+    '/api/teachers': 'teachers',
+    '/api/courses': 'courses',
+    '/api/enrollments': 'enrollments',
+    '/api/fees': 'fees',
+    '/api/users': 'user_model',
+}
+
+
+def scratch_config(uri, **settings):
+    """Config for an app on the scratch database ``uri``; keyword arguments are extra settings."""
+    return type('BenchConfig', (), {'SQLALCHEMY_DATABASE_URI': uri, 'SQLALCHEMY_TRACK_MODIFICATIONS': False, **settings})
+
+
+class Payloads:
+    """Unique request bodies for the create endpoints."""
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.serial = 0
+        self.lock = threading.Lock()
+
+    def next(self, route):
+        with self.lock:
+            self.serial += 1
+            n = self.serial
+        rng = random.Random(n)
+        if route == '/api/students':
+            return {'first_name': 'Load', 'last_name': 'Test', 'student_id': f'LOAD{n:08d}',
+                    'email': f'load{n}@school.test', 'date_of_birth': '2004-05-06'}
+        if route == '/api/teachers':
+            return {'first_name': 'Load', 'last_name': 'Test', 'email': f'load.teacher{n}@school.test',
+                    'department': 'Computing', 'credits': 3}
+        if route == '/api/courses':
+            return {'code': 900000 + n, 'name': f'Load course {n}', 'credits': 3,
+                    'teacher_id': rng.randint(1, self.counts['teachers'])}
+        if route == '/api/fees':
+            return {'student_id': rng.randint(1, self.counts['students']), 'amount': 1200.0,
+                    'fee_type': 'tuition', 'semester': '2024-S1', 'payment_date': '2024-01-15'}
+        if route == '/api/enrollments':
+            return {'student_id': rng.randint(1, self.counts['students']),
+                    'course_id': rng.randint(1, self.counts['courses']), 'enrollment_date': '2024-01-15'}
+        if route == '/api/users/':
+            return {'username': f'load{n}', 'email': f'load.user{n}@school.test', 'password': 'secret'}
+        return None
+
+
+def build_scenarios(app, counts, writes):
+    scenarios = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint == 'static' or 'static' in rule.endpoint:
+            continue
+        if set(rule.arguments) - {'id'}:
+            continue
+        prefix = next((prefix for prefix in ID_TABLES if rule.rule.startswith(prefix)), None)
+        if 'id' in rule.arguments and prefix is None:
+            continue
+        table = ID_TABLES.get(prefix)
+
+        if 'GET' in rule.methods:
+            scenarios.append({'method': 'GET', 'route': rule.rule, 'query': '', 'table': table})
+            if rule.rule in PAGED_ROUTES:
+                scenarios.append({'method': 'GET', 'route': rule.rule, 'query': '?limit=50', 'table': table})
+        if writes and 'POST' in rule.methods and not rule.arguments and not rule.rule.endswith('/bulk'):
+            scenarios.append({'method': 'POST', 'route': rule.rule, 'query': '', 'table': table})
+    return scenarios
+
+
+def make_request(scenario, counts, payloads, rng):
+    path = scenario['route']
+    if '<int:id>' in path:
+        path = path.replace('<int:id>', str(rng.randint(1, max(counts[scenario['table']], 1))))
+    body = payloads.next(scenario['route']) if scenario['method'] == 'POST' else None
+    return scenario['method'], path + scenario['query'], body
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(scenario, mode, latencies, elapsed, statuses):
+    latencies = sorted(latencies)
+    statuses = Counter(statuses)
+    return {
+        'mode': mode,
+        'method': scenario['method'],
+        'route': scenario['route'] + scenario['query'],
+        'requests': len(latencies),
+        'errors': sum(count for status, count in statuses.items() if status >= 500),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'throughput_rps': len(latencies) / elapsed if elapsed else None,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_test_client(app, scenarios, counts, payloads, args):
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    results = []
+    for scenario in scenarios:
+        latencies, statuses = [], []
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            method, path, body = make_request(scenario, counts, payloads, rng)
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            response.get_data()
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses.append(response.status_code)
+        results.append(summarize(scenario, 'test_client', latencies, time.perf_counter() - started, statuses))
+        report(results[-1])
+    return results
+
+
+def run_wsgi(app, scenarios, counts, payloads, args):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    rng = random.Random(args.seed)
+    results = []
+    try:
+        for scenario in scenarios:
+            requests = [make_request(scenario, counts, payloads, rng) for _ in range(args.requests)]
+
+            def send(request):
+                method, path, body = request
+                data = json.dumps(body).encode() if body is not None else None
+                req = urllib.request.Request(base + path, data=data, method=method,
+                                             headers={'Content-Type': 'application/json'})
+                start = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(req, timeout=args.timeout) as response:
+                        response.read()
+                        status = response.status
+                except urllib.error.HTTPError as e:
+                    e.read()
+                    status = e.code
+                except OSError:
+                    status = 599
+                return (time.perf_counter() - start) * 1000, status
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                outcomes = list(pool.map(send, requests))
+            elapsed = time.perf_counter() - started
+            results.append(summarize(scenario, 'wsgi', [ms for ms, _ in outcomes], elapsed,
+                                     [status for _, status in outcomes]))
+            report(results[-1])
+    finally:
+        server.shutdown()
+    return results
+
+
+def report(result):
+    print(f"{result['mode']:11} {result['method']:4} {result['route']:42} "
+          f"p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms  "
+          f"{result['throughput_rps']:8.1f} req/s  errors {result['errors']}  rss {result['peak_rss_kb']} kB")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--teachers', type=int, default=100)
+    parser.add_argument('--courses', type=int, default=300)
+    parser.add_argument('--enrollments-per-student', type=int, default=4)
+    parser.add_argument('--semesters', type=int, default=2)
+    parser.add_argument('--fees-per-semester', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=100, help="requests per route and mode")
+    parser.add_argument('--concurrency', type=int, default=8, help="client threads in wsgi mode")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--mode', choices=['test_client', 'wsgi', 'both'], default='both')
+    parser.add_argument('--writes', action='store_true', help="also POST to the create endpoints")
+    parser.add_argument('--database', help="scratch database URL (default: a temporary SQLite file)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(scratch_config(args.database or f"sqlite:///{os.path.join(tmp, 'load.db')}"))
+
+        spec = SchoolSpec(students=args.students, teachers=args.teachers, courses=args.courses,
+                          enrollments_per_student=args.enrollments_per_student, semesters=args.semesters,
+                          fees_per_semester=args.fees_per_semester, seed=args.seed)
+        with app.app_context():
+            started = time.perf_counter()
+            counts = seed_school(spec)
+            print(f"seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+        payloads = Payloads(counts)
+        scenarios = build_scenarios(app, counts, args.writes)
+        results = []
+        if args.mode in ('test_client', 'both'):
+            results += run_test_client(app, scenarios, counts, payloads, args)
+        if args.mode in ('wsgi', 'both'):
+            results += run_wsgi(app, scenarios, counts, payloads, args)
+
+    if args.output:
+        run = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'spec': spec.as_dict(),
+                'rows': counts,
+                'requests_per_route': args.requests,
+                'concurrency': args.concurrency,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Registration-day race: many threads enrolling into one small course.
+
+Serves the app from a threaded WSGI server and, for each ``--threads``
+level, creates a fresh course with ``--capacity`` seats and has that many
+client threads POST /api/enrollments for ``--students`` different students
+at once, then DELETE half of the enrollments that got in while new students
+keep trying to take the freed seats. Reports 201/409/other counts and
+p50/p95/max latency per phase, and checks the course's enrolled_count
+against both the capacity and the number of enrollment rows; any overbooking
+or drift is printed as FAIL (and the exit status is 1).
+
+    python -m benchmarks.stress_enrollment --capacity 50 --threads 8 32 64
+    python -m benchmarks.stress_enrollment --write-queue
+    python -m benchmarks.stress_enrollment --database postgresql://localhost/scratch
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app
+from app.extension import db
+from app.models import CourseModel, EnrollmentModel
+from app.seats import SEATLESS_STATUSES
+from benchmarks.load import percentile, scratch_config
+from benchmarks.synthetic import SchoolSpec, seed_school
+
+
+def call(method, url, body=None, timeout=60):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        payload = e.read()
+        status = e.code
+    return (time.perf_counter() - start) * 1000, status, json.loads(payload) if payload.strip() else None
+
+
+def report(phase, outcomes):
+    latencies = sorted(ms for ms, _, _ in outcomes)
+    statuses = Counter(status for _, status, _ in outcomes)
+    print(f"  {phase:8} {dict(sorted(statuses.items()))}  p50 {percentile(latencies, 0.5):7.1f} ms  "
+          f"p95 {percentile(latencies, 0.95):7.1f} ms  max {latencies[-1]:7.1f} ms")
+
+
+def check(app, course_id, capacity):
+    with app.app_context():
+        enrolled_count = db.session.scalar(select(CourseModel.enrolled_count).where(CourseModel.id == course_id))
+        rows = db.session.scalar(select(func.count()).select_from(EnrollmentModel).where(
+            EnrollmentModel.course_id == course_id, EnrollmentModel.status.notin_(SEATLESS_STATUSES)))
+        db.session.remove()
+    ok = rows == enrolled_count <= capacity
+    print(f"  {'ok' if ok else 'FAIL'}: enrolled_count {enrolled_count}, enrollment rows {rows}, capacity {capacity}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=1000, help="students trying to enroll per level")
+    parser.add_argument('--capacity', type=int, default=50)
+    parser.add_argument('--threads', type=int, nargs='+', default=[8, 32, 64])
+    parser.add_argument('--write-queue', action='store_true', help="send writes through the single-writer queue")
+    parser.add_argument('--database', help="empty database URL (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(scratch_config(args.database or f"sqlite:///{os.path.join(tmp, 'enroll.db')}",
+                                        DATABASE_WRITE_QUEUE=args.write_queue, DATABASE_POOL_SIZE=max(args.threads),
+                                        METRICS_ENABLED=False))
+        with app.app_context():
+            seed_school(SchoolSpec(students=args.students * 2, teachers=2, courses=2, enrollments_per_student=1))
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_port}'
+        print(f"capacity={args.capacity} students={args.students} write_queue={args.write_queue}")
+
+        ok = True
+        try:
+            for level, threads in enumerate(args.threads):
+                _, status, course = call('POST', base + '/api/courses', {
+                    'code': 9000 + level, 'name': f'Popular {level}', 'credits': 3, 'teacher_id': 1,
+                    'capacity': args.capacity})
+                assert status == 201, course
+                print(f"{threads} threads, course {course['id']}")
+
+                def enroll(student):
+                    return call('POST', base + '/api/enrollments',
+                                {'student_id': student, 'course_id': course['id'], 'status': 'active'})
+
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    outcomes = list(pool.map(enroll, range(1, args.students + 1)))
+                report('enroll', outcomes)
+                ok &= check(app, course['id'], args.capacity)
+
+                # drop half of those who got in while the rest of the school piles in
+                admitted = [body['id'] for _, status, body in outcomes if status == 201]
+                drops = [('DELETE', base + f'/api/enrollments/{id}', None) for id in admitted[::2]]
+                retries = [('POST', base + '/api/enrollments',
+                            {'student_id': student, 'course_id': course['id'], 'status': 'active'})
+                           for student in range(args.students + 1, 2 * args.students + 1)]
+                mixed = [job for pair in zip(retries, drops + [None] * len(retries)) for job in pair if job]
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    outcomes = list(pool.map(lambda job: call(*job), mixed))
+                report('churn', outcomes)
+                ok &= check(app, course['id'], args.capacity)
+        finally:
+            server.shutdown()
+            with app.app_context():
+                db.engine.dispose()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Connection pool behaviour when request threads outnumber connections.
+
+Serves the app from a threaded WSGI server with a deliberately small pool
+(``--pool-size`` + ``--max-overflow`` connections, ``--pool-timeout`` seconds
+to get one) and hits ``--route`` from an increasing number of client
+threads. For each level it reports throughput, p95 latency, requests that
+failed because no connection became free in time, and the pool wait time
+recorded by /api/db/pool.
+
+    python -m benchmarks.stress_pool --pool-size 2 --max-overflow 0 --threads 1 2 4 8 16
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app
+from benchmarks.load import percentile, scratch_config
+from benchmarks.synthetic import SchoolSpec, seed_school
+
+
+def get(url, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return (time.perf_counter() - start) * 1000, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--route', default='/api/students?limit=500')
+    parser.add_argument('--requests', type=int, default=200, help="requests per thread count")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--pool-size', type=int, default=2)
+    parser.add_argument('--max-overflow', type=int, default=0)
+    parser.add_argument('--pool-timeout', type=float, default=1.0)
+    parser.add_argument('--database', help="database URL (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(scratch_config(args.database or f"sqlite:///{os.path.join(tmp, 'pool.db')}",
+                                        DATABASE_POOL_SIZE=args.pool_size, DATABASE_MAX_OVERFLOW=args.max_overflow,
+                                        DATABASE_POOL_TIMEOUT=args.pool_timeout, RESPONSE_CACHE_ENABLED=False))
+
+        with app.app_context():
+            seed_school(SchoolSpec(students=args.students))
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        app.logger.disabled = True  # pool timeouts are logged as errors
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_port}'
+        print(f"pool_size={args.pool_size} max_overflow={args.max_overflow} pool_timeout={args.pool_timeout}s "
+              f"route={args.route}")
+        try:
+            for threads in args.threads:
+                before = json.loads(urllib.request.urlopen(base + '/api/db/pool').read())['default']
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    outcomes = list(pool.map(lambda _: get(base + args.route, 60), range(args.requests)))
+                elapsed = time.perf_counter() - started
+                after = json.loads(urllib.request.urlopen(base + '/api/db/pool').read())['default']
+
+                latencies = sorted(ms for ms, status in outcomes if status == 200)
+                statuses = Counter(status for _, status in outcomes)
+                checkouts = after['checkouts'] - before['checkouts'] - 1
+                waited = after['wait_seconds_total'] - before['wait_seconds_total']
+                print(f"threads {threads:3}  {statuses[200] / elapsed:7.1f} req/s  "
+                      f"p95 {percentile(latencies, 0.95) or 0:8.1f} ms  "
+                      f"failed {sum(statuses.values()) - statuses[200]:4}  "
+                      f"pool timeouts {after['timeouts'] - before['timeouts']:4}  "
+                      f"avg wait {waited / max(checkouts, 1) * 1000:7.2f} ms  max wait {after['wait_seconds_max'] * 1000:7.1f} ms")
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""add student and teacher search
+
+Revision ID: 33c61c1fd190
+Revises: 5bf54cf69ead
+Create Date: 2026-10-17 07:31:50.723361
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '33c61c1fd190'
+down_revision = '5bf54cf69ead'
+branch_labels = None
+depends_on = None
+
+# table -> indexed columns, as in app/resources (SearchIndex)
+SEARCH_COLUMNS = {
+    'students': ['last_name', 'first_name', 'student_id', 'email'],
+    'teachers': ['last_name', 'first_name', 'department', 'email'],
+}
+NULLABLE = {'department'}
+
+
+def sqlite_upgrade(table, names):
+    fts = f'{table}_fts'
+    columns = ', '.join(names)
+    new = ', '.join(f'new.{name}' for name in names)
+    old = ', '.join(f'old.{name}' for name in names)
+    op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', "
+               f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+               f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+               f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+               f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+               f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END")
+    # index the rows that are already there
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def postgres_upgrade(table, names):
+    parts = [f"coalesce({name}, '')" if name in NULLABLE else name for name in names]
+    document = " || ' ' || ".join(parts)
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} "
+               f"USING gin (to_tsvector('simple', {document}))")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, names in SEARCH_COLUMNS.items():
+        if dialect == 'sqlite':
+            sqlite_upgrade(table, names)
+        elif dialect == 'postgresql':
+            postgres_upgrade(table, names)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCH_COLUMNS:
+        if dialect == 'sqlite':
+            for trigger in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{trigger}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_search')
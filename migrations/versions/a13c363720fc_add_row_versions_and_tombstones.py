@@ -0,0 +1,59 @@
+"""add row versions and tombstones
+
+Revision ID: a13c363720fc
+Revises: 95d60efa9222
+Create Date: 2026-10-17 08:23:14.262316
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a13c363720fc'
+down_revision = '95d60efa9222'
+branch_labels = None
+depends_on = None
+
+
+# the tables with app.models.versioned.Versioned
+VERSIONED = ['courses', 'enrollments', 'fees', 'students', 'teachers', 'user_model']
+
+
+def upgrade():
+    op.create_table('tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstones', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tombstones_deleted_at'), ['deleted_at'], unique=False)
+
+    # Plain ADD COLUMNs rather than a batch table copy, which on SQLite would
+    # drop the full-text search triggers on students and teachers. A NOT NULL
+    # column added that way needs a constant default; the existing rows are
+    # then stamped with the time of the migration.
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for table in VERSIONED:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default='1970-01-01 00:00:00',
+                                       nullable=False))
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.create_index(op.f(f'ix_{table}_updated_at'), table, ['updated_at'], unique=False)
+        op.execute(sa.table(table, sa.column('updated_at', sa.DateTime())).update().values(updated_at=now))
+
+
+def downgrade():
+    for table in reversed(VERSIONED):
+        op.drop_index(op.f(f'ix_{table}_updated_at'), table_name=table)
+        op.drop_column(table, 'version')
+        op.drop_column(table, 'updated_at')
+
+    with op.batch_alter_table('tombstones', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tombstones_deleted_at'))
+
+    op.drop_table('tombstones')
@@ -0,0 +1,8 @@
+class TestConfig:
+    """Settings shared by the tests; each test adds its own SQLALCHEMY_DATABASE_URI."""
+    __test__ = False
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SWAGGER_ENABLED = False
+    METRICS_ENABLED = False
+    AUTOCOMPLETE_PRELOAD = False
+    RESPONSE_CACHE_ENABLED = False
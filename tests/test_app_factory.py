@@ -0,0 +1,52 @@
+"""create_app builds apps that share no state.
+
+The extension objects are module-level, so everything they keep per app
+has to live in app.extensions; two apps side by side must not write into
+each other's database or pick up each other's settings and collectors.
+"""
+import pytest
+
+from app import create_app
+from app.extension import db
+from app.models.student import StudentModel
+from tests import TestConfig
+
+
+@pytest.fixture
+def apps(tmp_path):
+    apps = {}
+    for name, queued in (('a', True), ('b', False)):
+        config = type('Config', (TestConfig,), {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / f'{name}.db'}",
+            'DATABASE_WRITE_QUEUE': queued,
+            'METRICS_ENABLED': True,
+        })
+        apps[name] = create_app(config)
+        with apps[name].app_context():
+            db.create_all()
+    yield apps
+    for app in apps.values():
+        with app.app_context():
+            db.engine.dispose()
+
+
+def test_writes_land_in_their_own_database(apps):
+    assert apps['a'].extensions['write_queue'].enabled
+    assert not apps['b'].extensions['write_queue'].enabled
+    for name, app in apps.items():
+        response = app.test_client().post('/api/students', json={
+            'first_name': name, 'last_name': 'Student', 'student_id': f'STU-{name}', 'email': f'{name}@school.test'})
+        assert response.status_code == 201, response.get_json()
+
+    for name, app in apps.items():
+        with app.app_context():
+            assert [student.first_name for student in StudentModel.query.all()] == [name]
+    assert apps['a'].extensions['write_queue'].jobs == 1
+    assert apps['b'].extensions['write_queue'].jobs == 0
+
+
+def test_metrics_collectors_are_registered_once_per_app(apps):
+    for app in apps.values():
+        body = app.test_client().get('/metrics').get_data(as_text=True)
+        types = [line for line in body.splitlines() if line.startswith('# TYPE')]
+        assert len(types) == len(set(types))
@@ -0,0 +1,77 @@
+"""A create retried with the same Idempotency-Key never runs twice.
+
+Neither a worker that dies between the handler's commit and the stored
+response nor a handler that outlives IDEMPOTENCY_CLAIM_TIMEOUT may let a
+retry take the key over and insert the fee again.
+"""
+import threading
+import time
+
+import pytest
+
+from app import create_app
+from app.extension import db
+from app.idempotency import idempotency
+from app.models.fee import FeeModel
+from app.resources import fee as fee_resource
+from tests import TestConfig
+
+FEE = {'student_id': 1, 'amount': 100.0, 'fee_type': 'tuition', 'semester': 'Fall 2024',
+       'payment_date': '2024-09-02', 'status': 'paid'}
+
+
+@pytest.fixture
+def app(tmp_path):
+    config = type('Config', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'school.db'}",
+        'IDEMPOTENCY_CLAIM_TIMEOUT': 1,
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    response = app.test_client().post('/api/students', json={
+        'first_name': 'Ada', 'last_name': 'Student', 'student_id': 'STU-1', 'email': 'ada@school.test'})
+    assert response.status_code == 201, response.get_json()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def fee_count(app):
+    with app.app_context():
+        return FeeModel.query.count()
+
+
+def test_lost_response_is_not_created_again(app, monkeypatch):
+    # the worker commits the fee, then dies before storing the response
+    monkeypatch.setattr(type(idempotency), '_store', lambda *args: None)
+    client = app.test_client()
+    headers = {'Idempotency-Key': 'lost-response'}
+    assert client.post('/api/fees', json=FEE, headers=headers).status_code == 201
+    time.sleep(1.2)  # past the claim timeout
+
+    response = client.post('/api/fees', json=FEE, headers=headers)
+    assert response.status_code == 409
+    assert 'applied' in response.get_json()['message']
+    assert fee_count(app) == 1
+
+
+def test_slow_request_keeps_its_claim(app, monkeypatch):
+    parse_fee_row = fee_resource.parse_fee_row
+
+    def slow_parse(row):
+        time.sleep(2)
+        return parse_fee_row(row)
+    monkeypatch.setattr(fee_resource, 'parse_fee_row', slow_parse)
+    headers = {'Idempotency-Key': 'slow-bulk'}
+    first = []
+    thread = threading.Thread(target=lambda: first.append(
+        app.test_client().post('/api/fees/bulk', json=[FEE], headers=headers).status_code))
+    thread.start()
+    time.sleep(1.5)  # the first request is past the claim timeout, still parsing
+
+    retry = app.test_client().post('/api/fees/bulk', json=[FEE], headers=headers)
+    thread.join()
+    assert retry.status_code == 409
+    assert first == [201]
+    assert fee_count(app) == 1
@@ -0,0 +1,63 @@
+"""The roster and transcript reads issue a fixed number of SQL statements.
+
+Each is one SELECT for the parent row plus one selectin load of its
+enrollments (with the student, or the course and its teacher, joined in),
+however many enrollments there are. A count that grows with the roster
+means an N+1 lazy load has crept back in.
+"""
+import pytest
+from sqlalchemy import event, insert
+
+from app import create_app
+from app.extension import db
+from app.models.course import CourseModel
+from app.models.enrollment import EnrollmentModel
+from app.models.student import StudentModel
+from app.models.teacher import TeacherModel
+from tests import TestConfig
+
+STATEMENTS = 2
+
+
+def seed(size):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(TeacherModel), [
+        {'first_name': f'T{i}', 'last_name': 'Teacher', 'email': f't{i}@school.test'} for i in range(size)])
+    db.session.execute(insert(CourseModel), [
+        {'code': f'C{i}', 'name': f'Course {i}', 'credits': 3, 'teacher_id': i + 1} for i in range(size)])
+    db.session.execute(insert(StudentModel), [
+        {'first_name': f'S{i}', 'last_name': 'Student', 'student_id': f'STU{i:07d}',
+         'email': f's{i}@school.test'} for i in range(size)])
+    # course 1 holds every student, student 1 takes every course
+    rows = [{'student_id': i + 1, 'course_id': 1, 'status': 'active'} for i in range(size)]
+    rows += [{'student_id': 1, 'course_id': i + 1, 'status': 'active'} for i in range(1, size)]
+    db.session.execute(insert(EnrollmentModel), rows)
+    db.session.commit()
+
+
+@pytest.fixture
+def app(tmp_path):
+    config = type('Config', (TestConfig,), {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'school.db'}"})
+    app = create_app(config)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.mark.parametrize('url', ['/api/courses/1/roster', '/api/students/1/transcript'])
+@pytest.mark.parametrize('size', [1, 25, 200])
+def test_statement_count_does_not_grow(app, url, size):
+    with app.app_context():
+        seed(size)
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = app.test_client().get(url)
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert response.status_code == 200, response.get_json()
+    assert len(statements) == STATEMENTS, statements